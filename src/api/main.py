@@ -5,8 +5,9 @@ Provides REST endpoints for threat detection and system management.
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 from ..detection.detection_engine import DetectionEngine
+from ..detection.signature_compiler import SignatureCompileError
 from ..alerting.alert_manager import AlertManager
 from ..utils.logger import get_logger
 
@@ -98,8 +99,8 @@ async def health_check():
 async def train_models(training_data: List[Dict]):
     """Train the machine learning models."""
     try:
-        detection_engine.train_models(training_data)
-        return {"message": "Models trained successfully"}
+        versions = detection_engine.train_models(training_data)
+        return {"message": "Models trained successfully", "versions": versions}
     except Exception as e:
         logger.error(f"Training error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -110,10 +111,86 @@ async def update_signatures(signatures: List[Dict]):
     try:
         detection_engine.update_signatures(signatures)
         return {"message": "Signatures updated successfully"}
+    except SignatureCompileError as e:
+        logger.error(f"Rejected signature update: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Signature update error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.delete("/signatures/{signature_id}")
+async def delete_signature(signature_id: str):
+    """Delete a signature by id."""
+    try:
+        removed = detection_engine.remove_signatures([signature_id])
+    except Exception as e:
+        logger.error(f"Signature delete error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Signature {signature_id} not found")
+    return {"message": f"Signature {signature_id} deleted", "version": detection_engine.signature_detector.version}
+
+@app.get("/signatures/versions")
+async def signature_versions():
+    """Signature snapshots available for rollback and the active one."""
+    return detection_engine.signature_versions()
+
+@app.post("/signatures/rollback")
+async def rollback_signatures(version: Optional[int] = None):
+    """Reactivate an earlier signature snapshot, the previous one by default."""
+    try:
+        return {"message": "Signatures rolled back", "version": detection_engine.rollback_signatures(version)}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Signature rollback error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/signatures/profile")
+async def signature_profile(limit: Optional[int] = 50):
+    """Per-signature evaluation, hit and cost counters, costliest first, with dead, slow and noisy signatures flagged."""
+    try:
+        return detection_engine.signature_profile(limit)
+    except Exception as e:
+        logger.error(f"Signature profile error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/signatures/optimize")
+async def optimize_signatures():
+    """Defer expensive signature conditions using the measured profile."""
+    try:
+        return {"changed": detection_engine.optimize_signatures(), "version": detection_engine.signature_detector.version}
+    except Exception as e:
+        logger.error(f"Signature optimize error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/indicators/stats")
+async def indicator_stats():
+    """Indicator set sizes, filter memory and false-positive rates."""
+    try:
+        return detection_engine.indicator_stats()
+    except Exception as e:
+        logger.error(f"Indicator stats error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Detection result cache hit ratio, size and evictions."""
+    try:
+        return detection_engine.cache_stats()
+    except Exception as e:
+        logger.error(f"Cache stats error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/pipeline/stats")
+async def pipeline_stats():
+    """Detection stage costs, skips and degraded-mode state."""
+    try:
+        return detection_engine.pipeline_stats()
+    except Exception as e:
+        logger.error(f"Pipeline stats error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting Cybersecurity Threat Detection API...")
@@ -0,0 +1,112 @@
+"""
+Aho-Corasick Matcher for the Cybersecurity Threat Detection System.
+Finds every occurrence of many literal patterns in a single pass over the text.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Transitions live in one flat dict keyed by (state << 21) | code point, which is far
+# smaller than a dict per trie node once the automaton holds hundreds of thousands of states
+_CHAR_BITS = 21
+# Below this many patterns a direct substring scan (done in C) beats walking the automaton in Python
+DIRECT_SCAN_LIMIT = 16
+
+class AhoCorasick:
+    """Multi-pattern automaton mapping each pattern to the ids of the items it belongs to."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, int]] = ()):
+        self._goto: Dict[int, int] = {}
+        self._fail: List[int] = [0]
+        self._outputs: List[Tuple[int, ...]] = [()]
+        # Empty patterns occur in every string, including the empty one
+        self._empty: Tuple[int, ...] = ()
+        self._direct: List[Tuple[str, int]] = []
+        self.pattern_count = 0
+        self.build(patterns)
+
+    def build(self, patterns: Iterable[Tuple[str, int]]):
+        """Compile (pattern, id) pairs into the automaton, replacing any previous contents."""
+        patterns = list(patterns)
+        self.pattern_count = len(patterns)
+        if len(patterns) < DIRECT_SCAN_LIMIT:
+            self._direct = patterns
+            self._goto, self._fail, self._outputs, self._empty = {}, [0], [()], ()
+            return
+        self._direct = []
+        goto: Dict[int, int] = {}
+        outputs: List[List[int]] = [[]]
+        empty: List[int] = []
+        for pattern, item_id in patterns:
+            if not pattern:
+                empty.append(item_id)
+                continue
+            state = 0
+            for char in pattern:
+                key = (state << _CHAR_BITS) | ord(char)
+                next_state = goto.get(key)
+                if next_state is None:
+                    next_state = goto[key] = len(outputs)
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(item_id)
+
+        # Breadth-first over the trie so every fail target is finished before it is used
+        children: List[List[Tuple[int, int]]] = [[] for _ in outputs]
+        for key, child in goto.items():
+            children[key >> _CHAR_BITS].append((key & ((1 << _CHAR_BITS) - 1), child))
+        fail = [0] * len(outputs)
+        merged: List[Tuple[int, ...]] = [()] * len(outputs)
+        queue = deque(child for _, child in children[0])
+        for _, child in children[0]:
+            merged[child] = tuple(outputs[child])
+        while queue:
+            state = queue.popleft()
+            for code, child in children[state]:
+                target = fail[state]
+                while True:
+                    next_state = goto.get((target << _CHAR_BITS) | code)
+                    if next_state is not None:
+                        fail[child] = next_state
+                        break
+                    if target == 0:
+                        break
+                    target = fail[target]
+                # A state also reports everything its longest proper suffix reports
+                merged[child] = tuple(outputs[child]) + merged[fail[child]]
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = merged
+        self._empty = tuple(empty)
+
+    def search(self, text: str) -> Set[int]:
+        """Return the ids of every pattern occurring anywhere in text."""
+        if self._direct:
+            return {item_id for pattern, item_id in self._direct if pattern in text}
+        found = set(self._empty)
+        goto_get = self._goto.get
+        fail = self._fail
+        outputs = self._outputs
+        state = 0
+        for char in text:
+            code = ord(char)
+            while True:
+                next_state = goto_get((state << _CHAR_BITS) | code)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def __len__(self) -> int:
+        return self.pattern_count
+
+if __name__ == "__main__":
+    automaton = AhoCorasick([("he", 0), ("she", 1), ("his", 2), ("hers", 3)])
+    print(sorted(automaton.search("ushers")))
@@ -3,71 +3,166 @@ Anomaly Detector for the Cybersecurity Threat Detection System.
 Uses machine learning to detect unknown threats based on anomalous behavior.
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+import joblib
 import numpy as np
 from sklearn.ensemble import IsolationForest
+from .feature_schema import DEFAULT_SCHEMA, FeatureSchema, FeatureSchemaError
+from .flat_forest import SKLEARN_BATCH_ROWS, FlatForest
+from .model_store import ModelStore
+from .streaming_anomaly import StreamingAnomalyModel
+from ..utils.config_loader import get_config_value
+from ..utils.event_batch import EventBatch
 from ..utils.logger import get_logger
 
 logger = get_logger()
 
+MODEL_NAME = "anomaly"
+
 class AnomalyDetector:
     """Detects anomalies using machine learning models."""
     
-    def __init__(self):
+    def __init__(self, schema: Optional[FeatureSchema] = None, streaming: Optional[bool] = None):
         self.model = IsolationForest(contamination=0.1)
+        # Flattened copy of the trained forest used for scoring; sklearn's per-call overhead dwarfs the traversal
+        self.flat_model: Optional[FlatForest] = None
         self.is_trained = False
-        logger.info("Anomaly Detector initialized.")
+        self.schema = schema or DEFAULT_SCHEMA
+        self.vectorizer = self.schema.compile()
+        if streaming is None:
+            streaming = get_config_value("detection.anomaly.mode", "batch") == "streaming"
+        # In streaming mode every scored event also updates the model; the batch forest covers its warm-up
+        self.streaming_model: Optional[StreamingAnomalyModel] = StreamingAnomalyModel() if streaming else None
+        logger.info(f"Anomaly Detector initialized ({'streaming' if streaming else 'batch'} mode).")
     
     def extract_features(self, data: Dict) -> np.ndarray:
-        """Extract features from data for anomaly detection."""
-        features = []
-        # Example features: length of values, presence of certain patterns, etc.
-        for key, value in data.items():
-            if isinstance(value, str):
-                features.append(len(value))
-                features.append(1 if "http" in value else 0)
-            elif isinstance(value, (int, float)):
-                features.append(value)
-        return np.array(features).reshape(1, -1)
+        """Extract the schema's feature row for one event, shaped (1, n_features)."""
+        return self.vectorizer.transform_one(data)
     
     def detect(self, data: Dict) -> List[Dict]:
         """Detect anomalies in the data."""
-        if not self.is_trained:
+        if self.streaming_model is not None:
+            predictions = self._predict_streaming(self.extract_features(data))
+            if predictions is None:
+                return []
+            prediction = predictions[0]
+        elif not self.is_trained:
             logger.warning("Anomaly detector not trained yet.")
             return []
+        else:
+            prediction = self.flat_model.predict_one(self.extract_features(data))
         
-        features = self.extract_features(data)
-        prediction = self.model.predict(features)
-        
-        if prediction[0] == -1:  # Anomaly detected
-            threat = {
-                "type": "anomaly",
-                "risk_score": 75,  # Medium risk for anomalies
-                "confidence": "medium",
-                "description": "Anomalous behavior detected"
-            }
-            logger.info(f"Anomaly threat detected: {threat}")
-            return [threat]
+        if prediction == -1:  # Anomaly detected
+            return [self._make_threat()]
         return []
+
+    def extract_features_batch(self, batch: EventBatch) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Build the feature matrix for a batch as (row indexes, feature matrix) pairs.
+
+        The schema fixes the layout, so every batch is a single group covering all rows.
+        """
+        if not len(batch):
+            return []
+        return [(np.arange(len(batch)), self.vectorizer.transform_batch(batch))]
+
+    def detect_batch(self, batch: EventBatch) -> List[List[Dict]]:
+        """Detect anomalies for every row of an EventBatch with one predict call on the schema's feature matrix."""
+        results: List[List[Dict]] = [[] for _ in range(len(batch))]
+        if self.streaming_model is None and not self.is_trained:
+            logger.warning("Anomaly detector not trained yet.")
+            return results
+        for indexes, features in self.extract_features_batch(batch):
+            if self.streaming_model is not None:
+                predictions = self._predict_streaming(features)
+                if predictions is None:
+                    continue
+            else:
+                # Both models predict identically; the flat one wins until the batch is large
+                model = self.flat_model if len(features) <= SKLEARN_BATCH_ROWS else self.model
+                predictions = model.predict(features)
+            for index in indexes[predictions == -1]:
+                results[index] = [self._make_threat()]
+        return results
+
+    def _predict_streaming(self, features: np.ndarray) -> Optional[np.ndarray]:
+        # Score and learn in one step; until the first window completes the trained batch forest (if any) decides
+        ready = self.streaming_model.is_ready
+        predictions = self.streaming_model.process(features)
+        if ready:
+            return predictions
+        if self.is_trained:
+            return self.flat_model.predict(features)
+        return None
+
+    def _make_threat(self) -> Dict:
+        threat = {
+            "type": "anomaly",
+            "risk_score": 75,  # Medium risk for anomalies
+            "confidence": "medium",
+            "description": "Anomalous behavior detected"
+        }
+        logger.info(f"Anomaly threat detected: {threat}")
+        return threat
     
     def train(self, training_data: List[Dict]):
         """Train the anomaly detection model."""
-        features = []
-        for data in training_data:
-            feat = self.extract_features(data)
-            features.append(feat.flatten())
-        
-        X = np.array(features)
+        X = self.vectorizer.transform(training_data)
         self.model.fit(X)
+        self.flat_model = FlatForest.from_sklearn(self.model)
+        self.is_trained = True
+        if self.streaming_model is not None:
+            # Training traffic seeds the streaming windows so scoring switches over sooner
+            self.streaming_model.update(X)
+        logger.info(f"Anomaly detection model trained on {X.shape[0]} events "
+                    f"with feature schema v{self.schema.version} ({self.schema.fingerprint}).")
+
+    def save(self, path: str):
+        """Save the model together with the feature schema it was trained on."""
+        joblib.dump({"schema": self.schema.to_dict(), "model": self.model, "is_trained": self.is_trained}, path)
+        logger.info(f"Anomaly detector saved to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "AnomalyDetector":
+        """Load a detector saved by save(); scoring uses the saved schema, not the current default."""
+        data = joblib.load(path)
+        detector = cls(FeatureSchema.from_dict(data["schema"]))
+        detector.model = data["model"]
+        detector.is_trained = data["is_trained"]
+        if detector.is_trained:
+            detector.flat_model = FlatForest.from_sklearn(detector.model)
+        trained_width = getattr(detector.model, "n_features_in_", len(detector.schema))
+        if trained_width != len(detector.schema):
+            raise FeatureSchemaError(f"Model expects {trained_width} features but its schema declares "
+                                     f"{len(detector.schema)}")
+        return detector
+
+    def save_to_store(self, store: ModelStore, metadata: Optional[Dict] = None) -> int:
+        """Store the trained model and its schema as a new version in a ModelStore."""
+        if not self.is_trained:
+            raise ValueError("Cannot store an untrained anomaly model")
+        return store.save(MODEL_NAME, self.flat_model, self.model, self.schema, metadata)
+
+    def load_from_store(self, store: ModelStore, version: Optional[int] = None) -> int:
+        """Switch to a stored model version (the newest by default), returning the version loaded."""
+        stored = store.load(MODEL_NAME, version)
+        schema = stored.schema or DEFAULT_SCHEMA
+        if stored.forest.n_features > len(schema):
+            raise FeatureSchemaError(f"Stored model uses {stored.forest.n_features} features but its schema "
+                                     f"declares {len(schema)}")
+        self.schema = schema
+        self.vectorizer = schema.compile()
+        self.flat_model = stored.forest
+        self.model = stored.estimator if stored.estimator is not None else stored.forest
         self.is_trained = True
-        logger.info("Anomaly detection model trained.")
+        logger.info(f"Anomaly model version {stored.version} loaded (schema v{schema.version}).")
+        return stored.version
 
 if __name__ == "__main__":
     detector = AnomalyDetector()
     # Mock training data
-    training_data = [{"normal": "data"}, {"another": "normal"}]
+    training_data = [{"length": 60 + i % 10, "protocol": 6, "tcp_flags": "A"} for i in range(100)]
     detector.train(training_data)
     
-    test_data = {"suspicious": "very_long_and_suspicious_string_here"}
+    test_data = {"length": 65000, "protocol": 17, "url": "very_long_and_suspicious_string_here"}
     threats = detector.detect(test_data)
     print(threats)
@@ -0,0 +1,131 @@
+"""
+Bloom Filter for the Cybersecurity Threat Detection System.
+Memory-budgeted probabilistic set membership used to prefilter large indicator feeds.
+"""
+
+import hashlib
+import math
+import struct
+from typing import Dict, Iterable, Optional
+import numpy as np
+
+_MASK64 = (1 << 64) - 1
+_FILE_MAGIC = b"BLM1"
+_FILE_HEADER = struct.Struct("<4sQQQ")
+
+def indicator_digest(value: str) -> bytes:
+    """16-byte digest used both to position bloom bits and as the exact-match key."""
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+
+class BloomFilter:
+    """Bloom filter over 16-byte digests using double hashing."""
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.001,
+                 max_memory_bytes: Optional[int] = None):
+        capacity = max(1, capacity)
+        bits = math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))
+        if max_memory_bytes is not None and bits > max_memory_bytes * 8:
+            # The budget wins over the target rate; stats() reports the rate actually achieved
+            bits = max_memory_bytes * 8
+        self.bits = max(64, bits)
+        # More hash functions than the target rate needs only costs lookup time
+        self.hashes = max(1, min(round(self.bits / capacity * math.log(2)),
+                                 math.ceil(-math.log2(false_positive_rate))))
+        self.capacity = capacity
+        self.target_false_positive_rate = false_positive_rate
+        self.count = 0
+        self.array = np.zeros((self.bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, digest: bytes):
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        bits = self.bits
+        return [((h1 + i * h2) & _MASK64) % bits for i in range(self.hashes)]
+
+    def add_digest(self, digest: bytes):
+        """Add one digest."""
+        array = self.array
+        for position in self._positions(digest):
+            array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def add_digests(self, digests: np.ndarray):
+        """Add many digests given as a contiguous array of 16-byte records (vectorized)."""
+        halves = np.frombuffer(digests.tobytes(), dtype="<u8").reshape(-1, 2)
+        h1 = halves[:, 0]
+        h2 = halves[:, 1] | np.uint64(1)
+        for i in range(self.hashes):
+            # uint64 arithmetic wraps exactly like the masked Python ints in _positions
+            positions = (h1 + np.uint64(i) * h2) % np.uint64(self.bits)
+            np.bitwise_or.at(self.array, (positions >> np.uint64(3)).astype(np.int64),
+                             (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+        self.count += len(halves)
+
+    def add(self, value: str):
+        """Add a normalized string value."""
+        self.add_digest(indicator_digest(value))
+
+    def might_contain_digest(self, digest: bytes) -> bool:
+        """False means definitely absent; True means present or a false positive."""
+        array = self.array
+        for position in self._positions(digest):
+            if not array[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, value: str) -> bool:
+        return self.might_contain_digest(indicator_digest(value))
+
+    def memory_bytes(self) -> int:
+        """Size of the bit array."""
+        return self.array.nbytes
+
+    def expected_false_positive_rate(self) -> float:
+        """False-positive rate implied by the current fill."""
+        return (1.0 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def stats(self) -> Dict:
+        """Sizing and expected accuracy of the filter."""
+        return {
+            "capacity": self.capacity,
+            "count": self.count,
+            "bits": self.bits,
+            "hashes": self.hashes,
+            "memory_bytes": self.memory_bytes(),
+            "target_false_positive_rate": self.target_false_positive_rate,
+            "expected_false_positive_rate": self.expected_false_positive_rate()
+        }
+
+    def save(self, path: str):
+        """Write the filter to disk so it can be loaded without rehashing the feed."""
+        with open(path, "wb") as f:
+            f.write(_FILE_HEADER.pack(_FILE_MAGIC, self.bits, self.hashes, self.count))
+            self.array.tofile(f)
+
+    @classmethod
+    def load(cls, path: str, target_false_positive_rate: float = 0.001) -> "BloomFilter":
+        """Read a filter written by save()."""
+        with open(path, "rb") as f:
+            magic, bits, hashes, count = _FILE_HEADER.unpack(f.read(_FILE_HEADER.size))
+            if magic != _FILE_MAGIC:
+                raise ValueError(f"Not a bloom filter file: {path}")
+            array = np.fromfile(f, dtype=np.uint8)
+        bloom = cls.__new__(cls)
+        bloom.bits, bloom.hashes, bloom.count = bits, hashes, count
+        bloom.capacity = count
+        bloom.target_false_positive_rate = target_false_positive_rate
+        bloom.array = array
+        return bloom
+
+    @classmethod
+    def from_values(cls, values: Iterable[str], capacity: int, false_positive_rate: float = 0.001) -> "BloomFilter":
+        """Build a filter from normalized string values."""
+        bloom = cls(capacity, false_positive_rate)
+        for value in values:
+            bloom.add(value)
+        return bloom
+
+if __name__ == "__main__":
+    bloom = BloomFilter.from_values((f"domain{i}.example" for i in range(100000)), 100000, 0.01)
+    misses = sum(1 for i in range(100000) if f"other{i}.example" in bloom)
+    print(f"{bloom.stats()} observed false positives: {misses / 100000:.4f}")
@@ -3,51 +3,343 @@ Main Detection Engine for the Cybersecurity Threat Detection System.
 Orchestrates threat detection using multiple detection methods.
 """
 
-from typing import Dict, List
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
 from .signature_detector import SignatureDetector
+from .signature_watcher import SignatureWatcher
+from .ioc_detector import IOCDetector
 from .anomaly_detector import AnomalyDetector
+from .header_detector import HeaderDetector
+from .detection_pipeline import DetectionPipeline, Stage
 from .threat_classifier import ThreatClassifier
+from .window_detector import WindowDetector
+from .model_store import ModelStore
+from .result_cache import ResultCache, connect_redis, event_fingerprint
+from ..utils.config_loader import get_config_value
+from ..utils.event_batch import EventBatch
 from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
 
 logger = get_logger()
+metrics = get_metrics()
 
 class DetectionEngine:
     """Main detection engine that combines multiple detection methods."""
     
-    def __init__(self):
+    def __init__(self, model_store: Optional[ModelStore] = None, result_cache: Optional[ResultCache] = None):
         self.signature_detector = SignatureDetector()
+        # Rule files from detection.signatures.rule_paths, hot-reloaded in the background when watch is on
+        self.signature_watcher = SignatureWatcher(self.signature_detector)
+        if self.signature_watcher.paths:
+            if get_config_value("detection.signatures.watch", True):
+                self.signature_watcher.start()
+            else:
+                self.signature_watcher.poll()
+        self.ioc_detector = IOCDetector()
+        self.header_detector = HeaderDetector()
         self.anomaly_detector = AnomalyDetector()
+        # Stateful per-source/per-destination windows; None when disabled in config
+        self.window_detector = WindowDetector() if get_config_value("detection.windows.enabled", True) else None
         self.threat_classifier = ThreatClassifier()
+        # Stateless stages, cheapest first; stages look detectors up on each call so replacing one takes effect
+        self.pipeline = DetectionPipeline({
+            "ioc": self._detector_stage("ioc", "ioc_detector"),
+            "headers": self._detector_stage("headers", "header_detector"),
+            "signatures": self._detector_stage("signatures", "signature_detector"),
+            "anomaly": Stage("anomaly", self._anomaly_stage, self._anomaly_stage_batch),
+            "classification": Stage("classification", lambda data, threats: self.threat_classifier.classify(threats),
+                                    lambda batch, threat_lists: self._classify_rows([threat_lists], len(threat_lists)),
+                                    lambda threats: self.threat_classifier.classify(threats, model=False))
+        })
+        # Results of the stateless detectors by event content; None when disabled in config
+        if result_cache is None and get_config_value("performance.cache_enabled", True):
+            shared = connect_redis() if get_config_value("performance.shared_cache_enabled", False) else None
+            result_cache = ResultCache(shared=shared)
+        self.result_cache = result_cache
+        self._cache_lock = threading.Lock()
+        self._cache_state: Optional[tuple] = None
+        self._cache_token = ""
+        self._cache_ignored: FrozenSet[str] = frozenset()
+        self.model_store = model_store or ModelStore()
+        if get_config_value("detection.model_store.warm_start", True):
+            self.load_models()
         logger.info("Detection Engine initialized.")
     
     def detect_threats(self, data: Dict) -> List[Dict]:
         """Detect threats in the given data."""
-        threats = []
-        
-        # Signature-based detection
-        signature_threats = self.signature_detector.detect(data)
-        threats.extend(signature_threats)
-        
-        # Anomaly-based detection
-        anomaly_threats = self.anomaly_detector.detect(data)
-        threats.extend(anomaly_threats)
-        
-        # Classify threats
-        classified_threats = self.threat_classifier.classify(threats)
+        if self.pipeline.allowlisted(data):
+            return []
+        context = self._cache_context()
+        classified_threats = None
+        if context is not None:
+            token, ignored = context
+            key = event_fingerprint(data, ignored)
+            classified_threats = self.result_cache.get(key, token)
+        if classified_threats is None:
+            # IOC, header and signature checks, then anomaly scoring and classification unless skipped
+            classified_threats, complete = self.pipeline.run(data)
+            if context is not None and complete:
+                self.result_cache.put(key, token, classified_threats)
+
+        # Stateful detectors see every event, cached or not
+        stateful_threats = []
+        if self.anomaly_detector.streaming_model is not None:
+            stateful_threats.extend(self.anomaly_detector.detect(data))
+
+        # Windowed detection of scans, brute force and floods
+        if self.window_detector is not None:
+            stateful_threats.extend(self.window_detector.detect(data))
+        if stateful_threats:
+            classified_threats = classified_threats + self.threat_classifier.classify(stateful_threats)
         
         logger.info(f"Detected {len(classified_threats)} threats.")
         return classified_threats
     
+    def detect_threats_batch(self, events: List[Dict]) -> List[List[Dict]]:
+        """Detect threats in many events at once, returning one threat list per input event.
+
+        Each detector runs over the whole batch and each model predicts once on a
+        stacked feature matrix, so results match detect_threats() event by event.
+        With the result cache on, the stateless stages only see events whose
+        content is neither cached nor repeated earlier in the batch.
+        """
+        if not events:
+            return []
+        batch = EventBatch.from_events(events)
+        allowlisted = self.pipeline.allowlisted_rows(batch)
+        inspected = [index for index, trusted in enumerate(allowlisted) if not trusted]
+        results: List[List[Dict]] = [[] for _ in events]
+        if not inspected:
+            return results
+        if len(inspected) < len(events):
+            batch = batch.take(inspected)
+            events = [events[index] for index in inspected]
+
+        stateless: List[Optional[List[Dict]]] = [None] * len(events)
+        context = self._cache_context()
+        if context is None:
+            missed = list(range(len(events)))
+        else:
+            token, ignored = context
+            keys = [event_fingerprint(event, ignored) for event in events]
+            first_rows: Dict[bytes, int] = {}
+            for index, key in enumerate(keys):
+                if key not in first_rows:
+                    stateless[index] = self.result_cache.get(key, token)
+                    if stateless[index] is None:
+                        first_rows[key] = index
+            missed = list(first_rows.values())
+
+        if missed:
+            found, complete = self.pipeline.run_batch(batch if len(missed) == len(events) else batch.take(missed))
+            for index, threats in zip(missed, found):
+                stateless[index] = threats
+                if context is not None and complete:
+                    self.result_cache.put(keys[index], token, threats)
+            if context is not None:
+                # Repeats of a content first seen in this batch are served from its fresh entry
+                for index, threats in enumerate(stateless):
+                    if threats is None:
+                        threats = self.result_cache.get(keys[index], token) if complete else None
+                        stateless[index] = threats if threats is not None else \
+                            [dict(threat) for threat in stateless[first_rows[keys[index]]]]
+
+        per_detector = []
+        if self.anomaly_detector.streaming_model is not None:
+            per_detector.append(self.anomaly_detector.detect_batch(batch))
+        if self.window_detector is not None:
+            per_detector.append(self.window_detector.detect_batch(batch))
+        if per_detector:
+            stateless = [threats + stateful for threats, stateful in
+                         zip(stateless, self._classify_rows(per_detector, len(events)))]
+        for index, threats in zip(inspected, stateless):
+            results[index] = threats
+
+        logger.info(f"Detected {sum(len(threats) for threats in results)} threats in a batch of {len(results)} events.")
+        return results
+
+    def _detector_stage(self, name: str, attribute: str) -> Stage:
+        # Pipeline stage appending what the engine's detector of that attribute finds
+        return Stage(name, lambda data, threats: threats + getattr(self, attribute).detect(data),
+                     lambda batch, threat_lists: [threats + found for threats, found in
+                                                  zip(threat_lists, getattr(self, attribute).detect_batch(batch))])
+
+    def _anomaly_stage(self, data: Dict, threats: List[Dict]) -> List[Dict]:
+        # Streaming anomaly scoring learns from every event, so it runs outside the pipeline and the cache
+        if self.anomaly_detector.streaming_model is not None:
+            return threats
+        return threats + self.anomaly_detector.detect(data)
+
+    def _anomaly_stage_batch(self, batch: EventBatch, threat_lists: List[List[Dict]]) -> List[List[Dict]]:
+        if self.anomaly_detector.streaming_model is not None:
+            return threat_lists
+        return [threats + found for threats, found in zip(threat_lists, self.anomaly_detector.detect_batch(batch))]
+
+    def _classify_rows(self, per_detector: List[List[List[Dict]]], rows: int) -> List[List[Dict]]:
+        # Classify every row's threats in one call, then hand them back to their rows in detector order
+        threats = []
+        owners = []
+        for index in range(rows):
+            for results in per_detector:
+                threats.extend(results[index])
+                owners.extend([index] * len(results[index]))
+
+        classified_threats = self.threat_classifier.classify(threats)
+        results: List[List[Dict]] = [[] for _ in range(rows)]
+        for index, threat in zip(owners, classified_threats):
+            results[index].append(threat)
+        return results
+
+    def _cache_context(self) -> Optional[Tuple[str, FrozenSet[str]]]:
+        """The current detection token and ignored fields, clearing the cache when signatures or models changed."""
+        if self.result_cache is None:
+            return None
+        anomaly = self.anomaly_detector
+        classifier = self.threat_classifier
+        # Updates replace these objects rather than mutating them, so identity is enough to notice a change;
+        # re-optimized signatures keep their list, so a new compiled form alone keeps the cache
+        state = (self.signature_detector.signatures, self.ioc_detector.index, self.ioc_detector.stores,
+                 self.pipeline.allowlist,
+                 anomaly.streaming_model, anomaly.is_trained, anomaly.flat_model, anomaly.schema,
+                 classifier.is_trained, classifier.flat_model, classifier.threat_types)
+        with self._cache_lock:
+            previous = self._cache_state
+            if previous is None or any(old is not new for old, new in zip(previous, state)):
+                self._cache_token = self._detection_token()
+                self._cache_ignored = self._ignored_fields()
+                self._cache_state = state
+                if previous is not None:
+                    self.result_cache.clear()
+                    logger.info(f"Detection state changed; result cache cleared (token {self._cache_token}).")
+            return self._cache_token, self._cache_ignored
+
+    def _detection_token(self) -> str:
+        # Hash of everything the cached detectors depend on; shared-tier keys carry it
+        anomaly = self.anomaly_detector
+        classifier = self.threat_classifier
+        parts = [self.pipeline.fingerprint(),
+                 json.dumps(self.signature_detector.signatures, sort_keys=True, default=str),
+                 self.ioc_detector.index.fingerprint(),
+                 json.dumps([[store.path, store.metadata] for store in self.ioc_detector.stores],
+                            sort_keys=True, default=str)]
+        if anomaly.streaming_model is not None:
+            parts.append("anomaly:streaming")
+        elif anomaly.is_trained:
+            parts.extend([anomaly.flat_model.fingerprint(), anomaly.schema.fingerprint])
+        else:
+            parts.append("anomaly:untrained")
+        if classifier.is_trained:
+            parts.extend([classifier.flat_model.fingerprint(), json.dumps(classifier.threat_types)])
+        else:
+            parts.append("classifier:untrained")
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    def _ignored_fields(self) -> FrozenSet[str]:
+        # Timestamps make repeated events look distinct; they only count when a signature or feature reads them
+        used = set(self.signature_detector.target_fields)
+        if self.anomaly_detector.streaming_model is None:
+            used.update(feature.field for feature in self.anomaly_detector.schema.features)
+        return frozenset(field for field in ("timestamp",) if field not in used)
+
     def update_signatures(self, signatures: List[Dict]):
         """Update the signature database."""
         self.signature_detector.update_signatures(signatures)
         logger.info("Signatures updated.")
+
+    def remove_signatures(self, ids: List[str]) -> int:
+        """Delete signatures by id, returning how many were removed."""
+        return self.signature_detector.remove_signatures(ids)
+
+    def rollback_signatures(self, version: Optional[int] = None) -> int:
+        """Reactivate an earlier signature snapshot (the previous one by default), returning its version."""
+        return self.signature_detector.rollback(version)
+
+    def signature_versions(self) -> List[Dict]:
+        """Signature snapshots available for rollback and the active one."""
+        return self.signature_detector.versions()
+
+    def signature_profile(self, limit: Optional[int] = None) -> Dict:
+        """Per-signature evaluation, hit and cost counters, with dead, slow and noisy signatures flagged."""
+        return self.signature_detector.profile_report(limit)
+
+    def optimize_signatures(self) -> bool:
+        """Defer the signature conditions the profile found expensive, returning True if anything changed."""
+        return self.signature_detector.optimize()
+
+    def update_ip_indicators(self, indicators: Iterable[Tuple[str, Dict]]):
+        """Replace the IP/CIDR indicator set with (network, label) pairs."""
+        self.ioc_detector.update_indicators(indicators)
+
+    def load_ip_indicators(self, paths: List[str]):
+        """Replace the IP/CIDR indicator set from feed files."""
+        self.ioc_detector.load_feeds(paths)
+
+    def load_indicator_stores(self, paths: List[str]):
+        """Replace the domain/hash indicator stores with prebuilt stores."""
+        self.ioc_detector.open_stores(paths)
+
+    def indicator_stats(self) -> Dict:
+        """Indicator counts, memory use and filter false-positive rates."""
+        return self.ioc_detector.stats()
     
-    def train_models(self, training_data: List[Dict]):
-        """Train the machine learning models."""
+    def update_allowlist(self, networks: Iterable[str]):
+        """Replace the networks whose traffic is trusted and never inspected."""
+        self.pipeline.update_allowlist(networks)
+
+    def pipeline_stats(self) -> Dict:
+        """Per-stage costs and skips, short-circuits and degraded-mode state of the detection pipeline."""
+        return self.pipeline.stats()
+
+    def cache_stats(self) -> Dict:
+        """Result cache hit ratio, tier hits, size and evictions."""
+        return self.result_cache.stats() if self.result_cache is not None else {}
+
+    def window_stats(self) -> Dict:
+        """Keys tracked and evicted by the windowed detectors."""
+        return self.window_detector.stats() if self.window_detector is not None else {}
+
+    def _stored_models(self) -> Dict:
+        return {"anomaly": self.anomaly_detector, "classifier": self.threat_classifier}
+
+    def save_models(self) -> Dict[str, int]:
+        """Store every trained model as a new version, returning the version numbers written."""
+        return {name: model.save_to_store(self.model_store)
+                for name, model in self._stored_models().items() if model.is_trained}
+
+    def load_models(self, versions: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """Load stored models (pinned versions, else configured ones, else the newest), returning what was loaded."""
+        versions = versions or {}
+        start_time = time.perf_counter()
+        loaded = {}
+        for name, model in self._stored_models().items():
+            if not self.model_store.versions(name):
+                continue
+            version = versions.get(name, get_config_value(f"detection.model_store.{name}_version", None))
+            try:
+                loaded[name] = model.load_from_store(self.model_store, version)
+            except Exception as e:
+                # A stale or foreign store must not stop the engine starting; the current model stays in use
+                logger.error(f"Failed to load stored {name} model, keeping the current one: {str(e)}")
+        if loaded:
+            load_ms = (time.perf_counter() - start_time) * 1000.0
+            metrics.set_gauge("detection.model_load_ms", load_ms)
+            logger.info(f"Loaded stored models {loaded} in {load_ms:.1f} ms")
+        return loaded
+
+    def train_models(self, training_data: List[Dict]) -> Dict[str, int]:
+        """Train the machine learning models and store them, returning the versions written."""
         self.anomaly_detector.train(training_data)
         self.threat_classifier.train(training_data)
         logger.info("Models trained.")
+        if not get_config_value("detection.model_store.save_on_train", True):
+            return {}
+        # Without a stored version the next start would have to train again
+        versions = self.save_models()
+        logger.info(f"Stored trained models {versions}")
+        return versions
 
 if __name__ == "__main__":
     engine = DetectionEngine()
@@ -0,0 +1,263 @@
+"""
+Detection Pipeline for the Cybersecurity Threat Detection System.
+Runs detection stages cheapest first under a per-event latency budget, skipping optional stages when they cannot pay off.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .ip_index import IPIndex
+from ..utils.config_loader import get_config_value
+from ..utils.event_batch import EventBatch
+from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
+
+logger = get_logger()
+metrics = get_metrics()
+
+# run(event, threats) and run_batch(batch, threat lists) return the threats with the stage's findings added;
+# fallback(threats), if set, stands in for a skipped stage
+Stage = namedtuple("Stage", ["name", "run", "run_batch", "fallback"], defaults=(None,))
+
+SKIP_REASONS = ("short_circuit", "budget", "degraded")
+
+class DetectionPipeline:
+    """Ordered detection stages with short-circuiting, a latency budget and a degraded mode.
+
+    Optional stages are skipped for an event once an earlier stage found a threat at
+    or above short_circuit_risk, or when their expected cost would take the event
+    over latency_budget_ms. When the expected cost of every stage together exceeds
+    the budget, the pipeline degrades and drops optional stages for all events,
+    re-measuring them on one probe event in probe_interval, until the expected cost
+    falls back under recover_ratio of the budget.
+    """
+
+    def __init__(self, stages: Dict[str, Stage], order: Optional[List[str]] = None,
+                 optional: Optional[Iterable[str]] = None, allowlist: Optional[Iterable[str]] = None,
+                 short_circuit_risk: Optional[float] = None, latency_budget_ms: Optional[float] = None,
+                 recover_ratio: Optional[float] = None, probe_interval: Optional[int] = None,
+                 cost_smoothing: Optional[float] = None, clock: Callable[[], float] = time.perf_counter):
+        order = order or get_config_value("detection.pipeline.stages",
+                                          ["signatures", "ioc", "headers", "anomaly", "classification"])
+        unknown = [name for name in order if name not in stages]
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {unknown}")
+        self.stages = [stages[name] for name in order]
+        self.optional = frozenset(optional if optional is not None else
+                                  get_config_value("detection.pipeline.optional", ["anomaly", "classification"]))
+        self.short_circuit_risk = short_circuit_risk or get_config_value("detection.pipeline.short_circuit_risk", 90)
+        self.latency_budget_ms = latency_budget_ms or get_config_value("detection.pipeline.latency_budget_ms", 10.0)
+        self.recover_ratio = recover_ratio or get_config_value("detection.pipeline.recover_ratio", 0.8)
+        self.probe_interval = probe_interval or get_config_value("detection.pipeline.probe_interval", 1000)
+        self.cost_smoothing = cost_smoothing or get_config_value("detection.pipeline.cost_smoothing", 0.05)
+        self.clock = clock
+        self.allowlist = IPIndex((network, {"type": "allowlist"}) for network in
+                                 (allowlist if allowlist is not None else
+                                  get_config_value("detection.pipeline.allowlist", [])))
+        self.degraded = False
+        # Per stage: expected cost per event (EWMA, ms), total time spent and skip counts by reason
+        self.costs = {stage.name: {"cost_ms": 0.0, "total_ms": 0.0, "events": 0,
+                                   **{reason: 0 for reason in SKIP_REASONS}} for stage in self.stages}
+        self.stats_counts = {"events": 0, "allowlisted": 0, "short_circuits": 0, "over_budget": 0,
+                             "degraded_episodes": 0, "probes": 0}
+        self._until_probe = self.probe_interval
+        self._lock = threading.Lock()
+
+    def update_allowlist(self, networks: Iterable[str]):
+        """Replace the trusted source networks."""
+        self.allowlist = IPIndex((network, {"type": "allowlist"}) for network in networks)
+        logger.info(f"Pipeline allowlist updated with {len(self.allowlist)} networks.")
+
+    def fingerprint(self) -> str:
+        """Short hash of everything that decides which stages produce an event's threats, budget aside."""
+        encoded = json.dumps([[stage.name for stage in self.stages], sorted(self.optional), self.short_circuit_risk,
+                              self.allowlist.fingerprint()]).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def allowlisted(self, data: Dict) -> bool:
+        """True when the event comes from a trusted network and needs no inspection."""
+        allowlist = self.allowlist
+        source = data.get("source_ip")
+        if not len(allowlist) or not isinstance(source, str) or allowlist.lookup(source) is None:
+            return False
+        with self._lock:
+            self.stats_counts["allowlisted"] += 1
+        return True
+
+    def allowlisted_rows(self, batch: EventBatch) -> List[bool]:
+        """Per row of a batch, whether its source is on the allowlist."""
+        allowlist = self.allowlist
+        if not len(allowlist):
+            return [False] * len(batch)
+        # Each distinct source address is looked up once through the batch string table
+        sources = batch.columns["source_ip"]
+        trusted = {code: allowlist.lookup(batch.strings[code]) is not None
+                   for code in np.unique(sources).tolist() if code >= 0}
+        rows = [trusted.get(code, False) for code in sources.tolist()]
+        with self._lock:
+            self.stats_counts["allowlisted"] += sum(rows)
+        return rows
+
+    def run(self, data: Dict) -> Tuple[List[Dict], bool]:
+        """Threats from each stage in order, and whether no stage was dropped for time (results may be cached)."""
+        start = self.clock()
+        skip_optional, probe = self._admit(1)
+        threats: List[Dict] = []
+        complete = True
+        short_circuit = False
+        for stage in self.stages:
+            if stage.name in self.optional:
+                reason = self._skip_reason(stage, start, 1, short_circuit, skip_optional, probe)
+                if reason is not None:
+                    self._skipped(stage, reason, 1)
+                    complete = complete and reason == "short_circuit"
+                    if stage.fallback is not None:
+                        threats = stage.fallback(threats)
+                    continue
+            stage_start = self.clock()
+            threats = stage.run(data, threats)
+            self._measured(stage, (self.clock() - stage_start) * 1000.0, 1)
+            if not short_circuit and self._over_risk(threats):
+                short_circuit = True
+                with self._lock:
+                    self.stats_counts["short_circuits"] += 1
+        self._finished((self.clock() - start) * 1000.0, 1)
+        return threats, complete
+
+    def run_batch(self, batch: EventBatch) -> Tuple[List[List[Dict]], bool]:
+        """Threats per row from each stage in order, and whether no stage was dropped for time.
+
+        Rows short-circuited by an earlier stage are left out of later optional stages,
+        so each row gets the threats run() would give it.
+        """
+        rows = len(batch)
+        results: List[List[Dict]] = [[] for _ in range(rows)]
+        if not rows:
+            return results, True
+        start = self.clock()
+        skip_optional, probe = self._admit(rows)
+        complete = True
+        short_circuit = [False] * rows
+        for stage in self.stages:
+            targets = list(range(rows))
+            if stage.name in self.optional:
+                reason = self._skip_reason(stage, start, rows, False, skip_optional, probe)
+                if reason is not None:
+                    skipped, targets = targets, []
+                    complete = False
+                else:
+                    reason = "short_circuit"
+                    skipped = [row for row in targets if short_circuit[row]]
+                    targets = [row for row in targets if not short_circuit[row]]
+                if skipped:
+                    self._skipped(stage, reason, len(skipped))
+                    if stage.fallback is not None:
+                        for row in skipped:
+                            results[row] = stage.fallback(results[row])
+            if not targets:
+                continue
+            stage_start = self.clock()
+            found = stage.run_batch(batch if len(targets) == rows else batch.take(targets),
+                                    [results[row] for row in targets])
+            self._measured(stage, (self.clock() - stage_start) * 1000.0, len(targets))
+            for row, threats in zip(targets, found):
+                results[row] = threats
+                if not short_circuit[row] and self._over_risk(threats):
+                    short_circuit[row] = True
+        with self._lock:
+            self.stats_counts["short_circuits"] += sum(short_circuit)
+        self._finished((self.clock() - start) * 1000.0, rows)
+        return results, complete
+
+    def _over_risk(self, threats: List[Dict]) -> bool:
+        return any(threat.get("risk_score", 0) >= self.short_circuit_risk for threat in threats)
+
+    def _admit(self, events: int) -> Tuple[bool, bool]:
+        # (skip optional stages, probe): a degraded pipeline still measures every stage once in probe_interval
+        with self._lock:
+            self.stats_counts["events"] += events
+            if not self.degraded:
+                return False, False
+            self._until_probe -= events
+            if self._until_probe > 0:
+                return True, False
+            self._until_probe = self.probe_interval
+            self.stats_counts["probes"] += 1
+            return False, True
+
+    def _skip_reason(self, stage: Stage, start: float, events: int, short_circuit: bool, skip_optional: bool,
+                     probe: bool) -> Optional[str]:
+        if short_circuit:
+            return "short_circuit"
+        if skip_optional:
+            return "degraded"
+        elapsed_ms = (self.clock() - start) * 1000.0 / events
+        if not probe and elapsed_ms + self.costs[stage.name]["cost_ms"] > self.latency_budget_ms:
+            return "budget"
+        return None
+
+    def _skipped(self, stage: Stage, reason: str, events: int):
+        with self._lock:
+            self.costs[stage.name][reason] += events
+
+    def _measured(self, stage: Stage, elapsed_ms: float, events: int):
+        per_event = elapsed_ms / events
+        with self._lock:
+            cost = self.costs[stage.name]
+            cost["total_ms"] += elapsed_ms
+            cost["events"] += events
+            # The average starts from zero, so one slow first call (lazy model setup) cannot degrade the pipeline;
+            # a batch counts as one sample so a large batch cannot swamp it
+            cost["cost_ms"] += self.cost_smoothing * (per_event - cost["cost_ms"])
+
+    def _finished(self, elapsed_ms: float, events: int):
+        with self._lock:
+            if elapsed_ms / events > self.latency_budget_ms:
+                self.stats_counts["over_budget"] += events
+            expected = sum(cost["cost_ms"] for cost in self.costs.values())
+            if not self.degraded and expected > self.latency_budget_ms:
+                self.degraded = True
+                self._until_probe = self.probe_interval
+                self.stats_counts["degraded_episodes"] += 1
+                metrics.increment("detection.pipeline.degraded_episodes")
+                logger.warning(f"Detection pipeline degraded: expected {expected:.2f} ms per event over the "
+                               f"{self.latency_budget_ms} ms budget, skipping {sorted(self.optional)}")
+            elif self.degraded and expected <= self.latency_budget_ms * self.recover_ratio:
+                self.degraded = False
+                logger.info(f"Detection pipeline recovered: expected {expected:.2f} ms per event")
+            else:
+                return
+        metrics.set_gauge("detection.pipeline.degraded", 1 if self.degraded else 0)
+
+    def stats(self) -> Dict:
+        """Event counts, degraded state and per-stage cost and skip counts."""
+        with self._lock:
+            stages = {name: dict(cost) for name, cost in self.costs.items()}
+            counts = dict(self.stats_counts)
+        for name, cost in stages.items():
+            cost["optional"] = name in self.optional
+            metrics.set_gauge(f"detection.pipeline.{name}_ms", cost["cost_ms"])
+        counts.update({
+            "degraded": self.degraded,
+            "latency_budget_ms": self.latency_budget_ms,
+            "expected_ms": sum(cost["cost_ms"] for cost in stages.values()),
+            "allowlist_networks": len(self.allowlist),
+            "stages": stages
+        })
+        return counts
+
+if __name__ == "__main__":
+    slow = Stage("slow", lambda data, threats: time.sleep(0.002) or threats + [{"type": "anomaly", "risk_score": 75}],
+                 lambda batch, lists: lists)
+    fast = Stage("fast", lambda data, threats: threats + ([{"type": "malware", "risk_score": 95}]
+                                                          if data.get("bad") else []), lambda batch, lists: lists)
+    pipeline = DetectionPipeline({"fast": fast, "slow": slow}, order=["fast", "slow"], optional=["slow"],
+                                 allowlist=["10.0.0.0/8"], latency_budget_ms=1.0, cost_smoothing=0.2)
+    print(pipeline.run({"bad": True}), pipeline.run({}), pipeline.allowlisted({"source_ip": "10.1.2.3"}))
+    for _ in range(20):
+        pipeline.run({})
+    print(pipeline.stats())
@@ -0,0 +1,212 @@
+"""
+Feature Schema for the Cybersecurity Threat Detection System.
+Declared, versioned feature layouts compiled into vectorizers that fill fixed-width matrices.
+"""
+
+import hashlib
+import json
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import numpy as np
+from ..utils.event_batch import FIELD_BITS, STRING_FIELDS, EventBatch
+
+# number: numeric value; length: len() of text or bytes; contains: 1/0 for a substring; present: 1/0 for not None
+FEATURE_KINDS = ("number", "length", "contains", "present")
+
+Feature = namedtuple("Feature", ["name", "field", "kind", "argument", "default"], defaults=(None, 0.0))
+
+class FeatureSchemaError(ValueError):
+    """Raised when a feature schema is invalid or does not match a saved model."""
+
+def _extractor(feature: Feature) -> Callable[[Any], float]:
+    """Scalar function computing one feature from one field value (None when missing)."""
+    default = float(feature.default)
+    if feature.kind == "number":
+        def extract(value):
+            if isinstance(value, (int, float)) and value == value:
+                return float(value)
+            return default
+    elif feature.kind == "length":
+        def extract(value):
+            return float(len(value)) if isinstance(value, (str, bytes, bytearray, memoryview)) else default
+    elif feature.kind == "contains":
+        text = feature.argument
+        data = text.encode("utf-8")
+        def extract(value):
+            if isinstance(value, str):
+                return 1.0 if text in value else 0.0
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                return 1.0 if data in bytes(value) else 0.0
+            return default
+    else:
+        def extract(value):
+            return 0.0 if value is None else 1.0
+    return extract
+
+class FeatureSchema:
+    """An ordered, versioned list of features; column j of every matrix is features[j]."""
+
+    def __init__(self, features: Iterable[Feature], version: int = 1):
+        self.features = [Feature(*feature) if not isinstance(feature, Feature) else feature for feature in features]
+        self.version = version
+        names = set()
+        for feature in self.features:
+            if feature.kind not in FEATURE_KINDS:
+                raise FeatureSchemaError(f"Feature {feature.name!r} has unknown kind {feature.kind!r}")
+            if feature.kind == "contains" and not isinstance(feature.argument, str):
+                raise FeatureSchemaError(f"Feature {feature.name!r} needs a string to look for")
+            if feature.name in names:
+                raise FeatureSchemaError(f"Duplicate feature name {feature.name!r}")
+            names.add(feature.name)
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    @property
+    def names(self) -> List[str]:
+        """Column names in matrix order."""
+        return [feature.name for feature in self.features]
+
+    @property
+    def fingerprint(self) -> str:
+        """Short hash of the feature list; two schemas with the same fingerprint build identical matrices."""
+        encoded = json.dumps([list(feature) for feature in self.features], sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def to_dict(self) -> Dict:
+        """Serializable form, saved alongside trained models."""
+        return {"version": self.version, "fingerprint": self.fingerprint,
+                "features": [feature._asdict() for feature in self.features]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FeatureSchema":
+        """Rebuild a schema saved by to_dict(), verifying its fingerprint."""
+        schema = cls([Feature(**feature) for feature in data["features"]], data.get("version", 1))
+        if data.get("fingerprint") and data["fingerprint"] != schema.fingerprint:
+            raise FeatureSchemaError(f"Feature schema fingerprint mismatch: saved {data['fingerprint']}, "
+                                     f"rebuilt {schema.fingerprint}")
+        return schema
+
+    def compile(self) -> "FeatureVectorizer":
+        """Compile the schema into a vectorizer."""
+        return FeatureVectorizer(self)
+
+class FeatureVectorizer:
+    """Fills preallocated feature matrices from event dicts or EventBatches."""
+
+    def __init__(self, schema: FeatureSchema):
+        self.schema = schema
+        self.fields = [feature.field for feature in schema.features]
+        self.extractors = [_extractor(feature) for feature in schema.features]
+        self.width = len(schema)
+
+    def transform_one(self, event: Dict) -> np.ndarray:
+        """Feature row for a single event, shaped (1, width)."""
+        return np.array([[extract(event.get(field)) for field, extract in zip(self.fields, self.extractors)]])
+
+    def transform(self, events: List[Dict], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Feature matrix for a list of event dicts; missing fields take the feature default."""
+        out = np.empty((len(events), self.width)) if out is None else out
+        for column, (field, extract) in enumerate(zip(self.fields, self.extractors)):
+            out[:, column] = [extract(event.get(field)) for event in events]
+        return out
+
+    def transform_batch(self, batch: EventBatch, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Feature matrix for an EventBatch, computed from its columns; equal to transform(batch.to_events())."""
+        count = len(batch)
+        out = np.empty((count, self.width)) if out is None else out
+        columns = batch.columns
+        payloads = None
+        for column, (field, extract) in enumerate(zip(self.fields, self.extractors)):
+            missing = extract(None)
+            if field not in FIELD_BITS:
+                out[:, column] = missing
+            elif field in STRING_FIELDS:
+                # Each distinct string is scored once; code -1 (None) picks the trailing missing value
+                table = np.array([extract(value) for value in batch.strings] + [missing])
+                out[:, column] = table[columns[field]]
+            elif field == "payload":
+                values = _payload_column(batch, self.schema.features[column])
+                if values is None:
+                    if payloads is None:
+                        payloads = [batch.payload(index) for index in range(count)]
+                    values = [extract(payload) for payload in payloads]
+                out[:, column] = values
+            else:
+                values = columns[field]
+                valid = ~np.isnan(values) if field == "timestamp" else values >= 0
+                if self.schema.features[column].kind == "number":
+                    out[:, column] = np.where(valid, values, missing)
+                else:
+                    # length/contains/present give the same value for every number
+                    out[:, column] = np.where(valid, extract(0), missing)
+        # Values that did not fit a fixed column (and fields with no column) live in extras
+        for row, extras in enumerate(batch.extras):
+            if extras:
+                for column, field in enumerate(self.fields):
+                    if field in extras:
+                        out[row, column] = self.extractors[column](extras[field])
+        return out
+
+def _payload_column(batch: EventBatch, feature: Feature) -> Optional[np.ndarray]:
+    """Payload feature computed on the shared payload buffer, or None when rows must be decoded."""
+    columns = batch.columns
+    lengths = columns["payload_length"]
+    has = lengths >= 0
+    missing = float(feature.default)
+    if feature.kind == "present":
+        return has.astype(float)
+    if feature.kind == "length":
+        # Text payloads count characters, which equals their encoded length only for ASCII
+        if columns["payload_is_text"][has].any() and not batch.payload_buffer.isascii():
+            return None
+        return np.where(has, lengths, missing)
+
+    needle = feature.argument.encode("utf-8")
+    found = np.zeros(len(batch), dtype=bool)
+    rows = np.flatnonzero(lengths > 0)
+    offsets = columns["payload_offset"]
+    rows = rows[np.argsort(offsets[rows], kind="stable")]
+    starts = offsets[rows]
+    if not needle or (len(starts) > 1 and not np.all(np.diff(starts) > 0)):
+        # Empty needles and batches that repeat a row (via take) are left to the per-row path
+        return None
+    # UTF-8 substrings are byte substrings, so one scan of the buffer serves text and bytes alike
+    buffer = batch.payload_buffer
+    positions = []
+    position = buffer.find(needle)
+    while position != -1:
+        positions.append(position)
+        position = buffer.find(needle, position + 1)
+    if positions and len(rows):
+        positions = np.array(positions, dtype=np.int64)
+        owners = np.searchsorted(starts, positions, side="right") - 1
+        valid = owners >= 0
+        owners, positions = rows[owners[valid]], positions[valid]
+        inside = positions + len(needle) <= offsets[owners] + lengths[owners]
+        found[owners[inside]] = True
+    return np.where(has, found.astype(float), missing)
+
+DEFAULT_SCHEMA = FeatureSchema([
+    Feature("length", "length", "number"),
+    Feature("protocol", "protocol", "number"),
+    Feature("source_port", "source_port", "number"),
+    Feature("destination_port", "destination_port", "number"),
+    Feature("has_payload", "payload", "present"),
+    Feature("payload_length", "payload", "length"),
+    Feature("payload_http", "payload", "contains", "http"),
+    Feature("tcp_syn", "tcp_flags", "contains", "S"),
+    Feature("tcp_fin", "tcp_flags", "contains", "F"),
+    Feature("tcp_rst", "tcp_flags", "contains", "R"),
+    Feature("url_length", "url", "length"),
+    Feature("url_http", "url", "contains", "http"),
+    Feature("attempts", "attempts", "number"),
+], version=1)
+
+if __name__ == "__main__":
+    vectorizer = DEFAULT_SCHEMA.compile()
+    events = [{"length": 60, "protocol": 6, "tcp_flags": "S", "payload": b"GET http://x"},
+              {"url": "http://malware.com/x", "attempts": 3}]
+    print(DEFAULT_SCHEMA.names)
+    print(vectorizer.transform(events))
+    print(vectorizer.transform_batch(EventBatch.from_events(events)))
@@ -0,0 +1,259 @@
+"""
+Flat Forest for the Cybersecurity Threat Detection System.
+Exports trained sklearn forests to contiguous node arrays for low-latency and vectorized inference.
+"""
+
+import hashlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sklearn.ensemble import IsolationForest, RandomForestClassifier
+
+CLASSIFIER = "classifier"
+ISOLATION = "isolation"
+# Rows are traversed in chunks so the (rows x trees) walker arrays stay small
+CHUNK_ROWS = 16384
+# Steps between dropping walkers that have reached a leaf
+COMPACT_EVERY = 6
+# Above about this many rows sklearn's compiled traversal outweighs its fixed per-call overhead
+SKLEARN_BATCH_ROWS = 1000
+
+def _average_path_length(n_samples):
+    """Expected path length of an unsuccessful search in a binary search tree of n samples."""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros(n_samples.shape)
+    result[n_samples == 2] = 1.0
+    larger = n_samples > 2
+    result[larger] = (2.0 * (np.log(n_samples[larger] - 1.0) + np.euler_gamma)
+                      - 2.0 * (n_samples[larger] - 1.0) / n_samples[larger])
+    return result
+
+def _node_depths(children_left: np.ndarray, children_right: np.ndarray) -> np.ndarray:
+    """Number of nodes on the path from the root to each node (the root counts as 1)."""
+    depths = np.zeros(len(children_left), dtype=np.float64)
+    depths[0] = 1.0
+    # sklearn numbers children after their parent, so one forward pass suffices
+    for node in range(len(children_left)):
+        if children_left[node] != -1:
+            depths[children_left[node]] = depths[node] + 1.0
+            depths[children_right[node]] = depths[node] + 1.0
+    return depths
+
+class FlatForest:
+    """A forest as flat node arrays; leaves are their own children so traversal can run a fixed number of steps."""
+
+    def __init__(self, kind: str, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 leaf_value: np.ndarray, roots: np.ndarray, max_depth: int,
+                 classes: Optional[np.ndarray] = None, offset: float = 0.0, denominator: float = 1.0):
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        # children[2 * node + go_left] is the next node: right child first, then left, so one gather steps
+        self.children = children
+        # Classifier: normalized class probabilities per node; isolation: path length credited at each leaf
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes = classes
+        self.offset = offset
+        self.denominator = denominator
+        self.n_features = int(feature.max()) + 1 if len(feature) else 0
+        self._is_leaf: Optional[np.ndarray] = None
+        self._lists: Optional[tuple] = None
+        self._fingerprint: Optional[str] = None
+
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        """Export a fitted RandomForestClassifier or IsolationForest."""
+        if isinstance(model, RandomForestClassifier):
+            return cls._from_random_forest(model)
+        if isinstance(model, IsolationForest):
+            return cls._from_isolation_forest(model)
+        raise TypeError(f"Cannot flatten a {type(model).__name__}")
+
+    @classmethod
+    def _from_trees(cls, trees: List[Tuple], kind: str, **extra) -> "FlatForest":
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for tree, feature_map, value in trees:
+            count = tree.node_count
+            is_leaf = tree.children_left == -1
+            nodes = np.arange(offset, offset + count, dtype=np.int32)
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, feature_map[np.maximum(tree.feature, 0)]).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            left = np.where(is_leaf, nodes, tree.children_left + offset)
+            right = np.where(is_leaf, nodes, tree.children_right + offset)
+            children.append(np.stack([right, left], axis=1).ravel().astype(np.int32))
+            values.append(value)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += count
+        return cls(kind, np.concatenate(features), np.concatenate(thresholds), np.concatenate(children),
+                   np.concatenate(values), np.array(roots, dtype=np.int32), max_depth, **extra)
+
+    @classmethod
+    def _from_random_forest(cls, model: RandomForestClassifier) -> "FlatForest":
+        if model.n_outputs_ != 1:
+            raise ValueError("Only single-output forests can be flattened")
+        trees = []
+        identity = np.arange(model.n_features_in_)
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            trees.append((tree, identity, value / normalizer))
+        return cls._from_trees(trees, CLASSIFIER, classes=model.classes_)
+
+    @classmethod
+    def _from_isolation_forest(cls, model: IsolationForest) -> "FlatForest":
+        trees = []
+        for estimator, features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            # Each leaf is credited its depth plus the expected depth of the samples it still holds
+            credit = (_node_depths(tree.children_left, tree.children_right)
+                      + _average_path_length(tree.n_node_samples)) - 1.0
+            feature_map = np.asarray(features) if model._max_features != model.n_features_in_ \
+                else np.arange(model.n_features_in_)
+            trees.append((tree, feature_map, credit[:, np.newaxis]))
+        denominator = len(model.estimators_) * float(_average_path_length([model._max_samples])[0])
+        return cls._from_trees(trees, ISOLATION, offset=float(model.offset_), denominator=denominator)
+
+    def _check(self, X) -> np.ndarray:
+        # sklearn trees compare float32 features with float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] < self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but the forest uses {self.n_features}")
+        return X
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf node index reached in every tree, shaped (rows, trees)."""
+        X = self._check(X)
+        trees = len(self.roots)
+        leaves = np.empty((X.shape[0], trees), dtype=np.int32)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            chunk = np.ascontiguousarray(X[start:start + CHUNK_ROWS])
+            leaves[start:start + CHUNK_ROWS] = self._apply_chunk(chunk).reshape(len(chunk), trees)
+        return leaves
+
+    def _apply_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        # One (row, tree) walker per element; every step moves all walkers one level down
+        values = chunk.ravel()
+        walkers = np.broadcast_to(self.roots, (len(chunk), len(self.roots))).ravel().copy()
+        bases = np.repeat(np.arange(len(chunk), dtype=np.int64) * chunk.shape[1], len(self.roots))
+        leaves = np.empty(len(walkers), dtype=np.int32)
+        positions = None
+        for step in range(self.max_depth):
+            go_left = np.take(values, bases + np.take(self.feature, walkers)) <= np.take(self.threshold, walkers)
+            walkers = np.take(self.children, 2 * walkers + go_left)
+            if step % COMPACT_EVERY == COMPACT_EVERY - 1 and step < self.max_depth - 1:
+                # Walkers that reached a leaf are parked so later steps only move the rest
+                active = ~np.take(self.is_leaf, walkers)
+                if positions is None:
+                    leaves[:] = walkers
+                    positions = np.flatnonzero(active)
+                else:
+                    leaves[positions] = walkers
+                    positions = positions[active]
+                walkers, bases = walkers[active], bases[active]
+        if positions is None:
+            leaves[:] = walkers
+        else:
+            leaves[positions] = walkers
+        return leaves
+
+    @property
+    def is_leaf(self) -> np.ndarray:
+        """Boolean mask of leaf nodes."""
+        if self._is_leaf is None:
+            self._is_leaf = self.children[1::2] == np.arange(len(self.feature), dtype=self.children.dtype)
+        return self._is_leaf
+
+    def _accumulate(self, X) -> np.ndarray:
+        # Trees are added in order, matching sklearn's summation exactly
+        leaves = self.apply(X)
+        total = np.zeros((leaves.shape[0], self.leaf_value.shape[1]))
+        for tree in range(leaves.shape[1]):
+            total += self.leaf_value[leaves[:, tree]]
+        return total
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Mean class probabilities across trees (classifier forests)."""
+        return self._accumulate(X) / len(self.roots)
+
+    def score_samples(self, X) -> np.ndarray:
+        """Isolation score of each row as sklearn's score_samples; lower is more anomalous."""
+        depths = self._accumulate(X)[:, 0]
+        if self.denominator == 0:
+            return -np.ones_like(depths)
+        return -(2 ** (-(depths / self.denominator)))
+
+    def predict(self, X) -> np.ndarray:
+        """Class labels, or 1 for inliers and -1 for outliers, exactly as the sklearn model predicts."""
+        if self.kind == CLASSIFIER:
+            return self.classes.take(np.argmax(self.predict_proba(X), axis=1))
+        return np.where(self.score_samples(X) - self.offset < 0, -1, 1)
+
+    def predict_one(self, row):
+        """Low-latency prediction for a single feature row."""
+        if self._lists is None:
+            # Python lists make the single-row walk several times faster than indexing arrays; they are
+            # built on first use so processes that only score batches keep just the shared mapped arrays
+            self._lists = (self.feature.tolist(), self.threshold.tolist(), self.children[1::2].tolist(),
+                           self.children[0::2].tolist(), self.roots.tolist(), self.leaf_value.tolist())
+        feature, threshold, left, right, roots, leaf_value = self._lists
+        x = np.asarray(row, dtype=np.float32).ravel().tolist()
+        total = [0.0] * len(leaf_value[0])
+        for node in roots:
+            while left[node] != node:
+                node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+            value = leaf_value[node]
+            for i in range(len(total)):
+                total[i] += value[i]
+        if self.kind == CLASSIFIER:
+            return self.classes[total.index(max(total))]
+        score = -(2 ** (-(total[0] / self.denominator))) if self.denominator else -1.0
+        return -1 if score - self.offset < 0 else 1
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Node arrays and scalars as a dict of arrays, for saving."""
+        arrays = {name: getattr(self, name) for name in ("feature", "threshold", "children", "leaf_value", "roots")}
+        arrays["scalars"] = np.array([self.max_depth, self.offset, self.denominator], dtype=np.float64)
+        if self.classes is not None:
+            arrays["classes"] = self.classes
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, kind: str, arrays: Dict[str, np.ndarray]) -> "FlatForest":
+        """Rebuild a forest from to_arrays() output (arrays may be memory-mapped)."""
+        max_depth, offset, denominator = arrays["scalars"].tolist()
+        return cls(kind, arrays["feature"], arrays["threshold"], arrays["children"], arrays["leaf_value"],
+                   arrays["roots"], int(max_depth), arrays.get("classes"), offset, denominator)
+
+    def memory_bytes(self) -> int:
+        """Size of the node arrays."""
+        return sum(array.nbytes for array in self.to_arrays().values())
+
+    def fingerprint(self) -> str:
+        """Digest of the node arrays, identifying the model across processes."""
+        if self._fingerprint is None:
+            digest = hashlib.sha256(self.kind.encode("ascii"))
+            for name, array in sorted(self.to_arrays().items()):
+                digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode("ascii"))
+                digest.update(np.ascontiguousarray(array).tobytes())
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+if __name__ == "__main__":
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(500, 5))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    forest = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    flat = FlatForest.from_sklearn(forest)
+    print("classifier agrees:", np.array_equal(flat.predict(X), forest.predict(X)), flat.predict_one(X[0]))
+    isolation = IsolationForest(random_state=0).fit(X)
+    flat = FlatForest.from_sklearn(isolation)
+    print("isolation agrees:", np.array_equal(flat.predict(X), isolation.predict(X)), flat.predict_one(X[0]))
@@ -0,0 +1,71 @@
+"""
+Header Detector for the Cybersecurity Threat Detection System.
+Flags packets whose TCP flags or ports no ordinary stack sends, such as null, FIN and Xmas scan probes.
+"""
+
+from typing import Any, Dict, List
+from ..utils.event_batch import EventBatch
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+TCP = 6
+UDP = 17
+# Flag combinations that only appear in crafted probes, keyed by the set of flag letters
+SCAN_FLAGS = {
+    frozenset(): "null scan",
+    frozenset("F"): "FIN scan",
+    frozenset("FPU"): "Xmas scan",
+}
+
+class HeaderDetector:
+    """Detects stealth scan probes from packet headers alone; cheap enough to run before any other stage."""
+
+    def detect(self, data: Dict) -> List[Dict]:
+        """Detect crafted TCP flag combinations and traffic to port 0."""
+        # Flow summaries carry the OR of every packet's flags (a normal connection is "FSPA"), so only
+        # single packets are judged on their flags
+        flags = None if "packets" in data or "flow_end" in data else data.get("tcp_flags")
+        return self._check(data.get("protocol"), flags, data.get("destination_port"))
+
+    def detect_batch(self, batch: EventBatch) -> List[List[Dict]]:
+        """Detect header anomalies for every row of an EventBatch, one threat list per row."""
+        if not len(batch):
+            return []
+        protocols = batch.columns["protocol"].tolist()
+        flags = batch.string_column("tcp_flags").tolist()
+        ports = batch.columns["destination_port"].tolist()
+        results = []
+        for row, extras in enumerate(batch.extras):
+            if extras:
+                results.append(self.detect(batch.event(row)))
+            else:
+                results.append(self._check(protocols[row], flags[row], ports[row]))
+        return results
+
+    def _check(self, protocol: Any, flags: Any, port: Any) -> List[Dict]:
+        if protocol == TCP and isinstance(flags, str):
+            letters = frozenset(flags)
+            probe = SCAN_FLAGS.get(letters)
+            if probe is None and "S" in letters and "F" in letters:
+                probe = "SYN+FIN scan"
+            if probe is not None:
+                return [self._make_threat(f"TCP {probe} (flags '{flags}')")]
+        if port == 0 and protocol in (TCP, UDP):
+            return [self._make_threat("Traffic to reserved port 0")]
+        return []
+
+    def _make_threat(self, description: str) -> Dict:
+        threat = {
+            "type": "port_scan",
+            "risk_score": 60,
+            "confidence": "medium",
+            "description": f"Header anomaly: {description}"
+        }
+        logger.info(f"Header threat detected: {threat}")
+        return threat
+
+if __name__ == "__main__":
+    detector = HeaderDetector()
+    for flags in ("S", "PA", "", "F", "FPU", "SF"):
+        print(repr(flags), detector.detect({"protocol": 6, "tcp_flags": flags, "destination_port": 80}))
@@ -0,0 +1,197 @@
+"""
+Indicator Store for the Cybersecurity Threat Detection System.
+Large domain and file-hash indicator sets behind a bloom filter with an exact, memory-mapped backing file.
+"""
+
+import json
+import mmap
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+import numpy as np
+from .bloom_filter import BloomFilter, indicator_digest
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+KINDS = ("domain", "hash")
+KEY_BYTES = 16
+# Digests are sorted and written in chunks of this many indicators while building
+BUILD_CHUNK = 1_000_000
+HASH_LENGTHS = (32, 40, 64)   # md5, sha1, sha256 hex digests
+
+def normalize_domain(value: str) -> Optional[str]:
+    """Lower-case host name of a domain or URL, or None if there is no dotted host name."""
+    value = value.strip().lower()
+    if "/" in value:
+        value = urlsplit(value if "//" in value else "//" + value).hostname or ""
+    value = value.rstrip(".")
+    # Single-label names are local hosts, not feed indicators
+    return value if "." in value and " " not in value else None
+
+def domain_candidates(value: str) -> List[str]:
+    """A domain followed by its parent domains, so 'a.evil.com' also matches an 'evil.com' indicator."""
+    domain = normalize_domain(value)
+    if not domain:
+        return []
+    labels = domain.split(".")
+    # Bare top-level domains are never checked on their own
+    return [".".join(labels[i:]) for i in range(max(1, len(labels) - 1))]
+
+def normalize_hash(value: str) -> Optional[str]:
+    """Lower-case hex file hash, or None if the value is not an md5, sha1 or sha256 digest."""
+    value = value.strip().lower()
+    if len(value) not in HASH_LENGTHS:
+        return None
+    try:
+        int(value, 16)
+    except ValueError:
+        return None
+    return value
+
+NORMALIZERS = {"domain": normalize_domain, "hash": normalize_hash}
+
+def read_value_file(path: str) -> Iterator[str]:
+    """Stream the first column of an indicator feed; blank lines and # comments are ignored."""
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                yield line.split(",", 1)[0].strip()
+
+class IndicatorStore:
+    """Membership test for one indicator feed.
+
+    The bloom filter answers almost every lookup (the misses) from memory; only filter
+    hits binary-search the sorted digest file, which is memory-mapped rather than loaded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path + ".json", "r") as f:
+            self.metadata: Dict = json.load(f)
+        self.kind = self.metadata["kind"]
+        self.bloom = BloomFilter.load(path + ".bloom", self.metadata.get("false_positive_rate", 0.001))
+        self.count = os.path.getsize(path) // KEY_BYTES
+        self._file = open(path, "rb")
+        self._keys = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else b""
+        self._normalize = NORMALIZERS[self.kind]
+        self.lookups = 0
+        self.bloom_hits = 0
+        self.false_positives = 0
+
+    @classmethod
+    def build(cls, values: Iterable[str], path: str, kind: str, false_positive_rate: float = 0.001,
+              max_memory_bytes: Optional[int] = None, indicator_type: Optional[str] = None,
+              risk_score: int = 80, capacity: Optional[int] = None) -> "IndicatorStore":
+        """Normalize, deduplicate and write a feed to disk, then open it."""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown indicator kind {kind!r}; expected one of {KINDS}")
+        normalize = NORMALIZERS[kind]
+        chunks: List[np.ndarray] = []
+        pending: List[bytes] = []
+        skipped = 0
+        for value in values:
+            normalized = normalize(value)
+            if normalized is None:
+                skipped += 1
+                continue
+            pending.append(indicator_digest(normalized))
+            if len(pending) >= BUILD_CHUNK:
+                chunks.append(np.unique(np.array(pending, dtype=f"S{KEY_BYTES}")))
+                pending = []
+        if pending:
+            chunks.append(np.unique(np.array(pending, dtype=f"S{KEY_BYTES}")))
+        del pending
+        keys = np.unique(np.concatenate(chunks)) if chunks else np.array([], dtype=f"S{KEY_BYTES}")
+        del chunks
+        if skipped:
+            logger.warning(f"Skipped {skipped} invalid {kind} indicators while building {path}")
+
+        bloom = BloomFilter(capacity or len(keys), false_positive_rate, max_memory_bytes)
+        for start in range(0, len(keys), BUILD_CHUNK):
+            bloom.add_digests(keys[start:start + BUILD_CHUNK])
+        with open(path, "wb") as f:
+            # Fixed-width S16 records sort exactly as the raw digest bytes compare
+            f.write(keys.tobytes())
+        bloom.save(path + ".bloom")
+        with open(path + ".json", "w") as f:
+            json.dump({"kind": kind, "type": indicator_type or f"malicious_{kind}", "risk_score": risk_score,
+                       "false_positive_rate": false_positive_rate, "count": len(keys)}, f)
+        logger.info(f"Built {kind} indicator store {path}: {len(keys)} indicators, "
+                    f"{bloom.memory_bytes() / 1e6:.1f} MB filter")
+        return cls(path)
+
+    @classmethod
+    def from_file(cls, feed_path: str, path: str, kind: str, **options) -> "IndicatorStore":
+        """Build a store from a one-indicator-per-line feed file."""
+        return cls.build(read_value_file(feed_path), path, kind, **options)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _contains_digest(self, digest: bytes) -> bool:
+        keys = self._keys
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            key = keys[middle * KEY_BYTES:(middle + 1) * KEY_BYTES]
+            if key < digest:
+                low = middle + 1
+            elif key > digest:
+                high = middle
+            else:
+                return True
+        return False
+
+    def contains(self, normalized: str) -> bool:
+        """Exact membership of an already normalized value."""
+        self.lookups += 1
+        digest = indicator_digest(normalized)
+        if not self.bloom.might_contain_digest(digest):
+            return False
+        self.bloom_hits += 1
+        if self._contains_digest(digest):
+            return True
+        self.false_positives += 1
+        return False
+
+    def lookup(self, value: str) -> Optional[str]:
+        """The indicator a raw field value matches (a parent domain for subdomains), or None."""
+        if self.kind == "domain":
+            for candidate in domain_candidates(value):
+                if self.contains(candidate):
+                    return candidate
+            return None
+        normalized = normalize_hash(value)
+        return normalized if normalized is not None and self.contains(normalized) else None
+
+    def stats(self) -> Dict:
+        """Filter sizing together with the observed lookup and false-positive counts."""
+        stats = self.bloom.stats()
+        stats.update({
+            "path": self.path,
+            "kind": self.kind,
+            "indicators": self.count,
+            "backing_file_bytes": self.count * KEY_BYTES,
+            "lookups": self.lookups,
+            "bloom_hits": self.bloom_hits,
+            "false_positives": self.false_positives,
+            "observed_false_positive_rate": self.false_positives / max(1, self.lookups - self.bloom_hits + self.false_positives)
+        })
+        return stats
+
+    def close(self):
+        """Release the memory map."""
+        if isinstance(self._keys, mmap.mmap):
+            self._keys.close()
+        self._file.close()
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        store = IndicatorStore.build(["evil.com", "bad.example.org"], os.path.join(directory, "domains.idx"), "domain")
+        for value in ("login.evil.com", "http://bad.example.org/x", "good.com"):
+            print(value, store.lookup(value))
+        print(store.stats())
+        store.close()
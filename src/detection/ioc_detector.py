@@ -0,0 +1,160 @@
+"""
+IOC Detector for the Cybersecurity Threat Detection System.
+Matches event addresses, domains and file hashes against threat intelligence indicators.
+"""
+
+import itertools
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .indicator_store import IndicatorStore
+from .ip_index import IPIndex, read_indicator_file
+from ..utils.config_loader import get_config_value
+from ..utils.event_batch import EventBatch
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+IP_FIELDS = ("source_ip", "destination_ip")
+# Fields checked against each kind of indicator store
+STORE_FIELDS = {
+    "domain": ("domain", "dns_query", "url", "referrer"),
+    "hash": ("file_hash", "md5", "sha1", "sha256"),
+}
+
+class IOCDetector:
+    """Detects traffic to or from indicator addresses using longest-prefix match."""
+
+    def __init__(self, feeds: Optional[List[str]] = None, stores: Optional[List[str]] = None):
+        self.index = IPIndex()
+        self.stores: List[IndicatorStore] = []
+        self._update_lock = threading.Lock()
+        feeds = feeds if feeds is not None else get_config_value("detection.ioc.ip_feeds", [])
+        if feeds:
+            self.load_feeds(feeds)
+        stores = stores if stores is not None else get_config_value("detection.ioc.indicator_stores", [])
+        if stores:
+            self.open_stores(stores)
+        logger.info(f"IOC Detector initialized with {len(self.index)} IP indicators "
+                    f"and {sum(len(store) for store in self.stores)} domain/hash indicators.")
+
+    def update_indicators(self, entries: Iterable[Tuple[str, Dict]]):
+        """Replace the indicator set; the new index is built aside and swapped in atomically."""
+        with self._update_lock:
+            index = IPIndex(entries)
+            # Readers keep using whichever index they already hold until this single assignment
+            self.index = index
+        logger.info(f"IP indicator index swapped in: {len(index)} prefixes, {index.memory_bytes() / 1e6:.1f} MB")
+
+    def load_feeds(self, paths: List[str], default_type: str = "malicious_ip", default_risk_score: int = 80):
+        """Bulk load indicator feed files and swap them in as one index."""
+        self.update_indicators(itertools.chain.from_iterable(
+            read_indicator_file(path, default_type, default_risk_score, path) for path in paths))
+
+    def open_stores(self, paths: List[str]):
+        """Open prebuilt domain/hash indicator stores and swap them in as the store set."""
+        stores = [IndicatorStore(path) for path in paths]
+        with self._update_lock:
+            self.stores = stores
+        for store in stores:
+            stats = store.stats()
+            logger.info(f"Indicator store {store.path}: {stats['indicators']} {store.kind} indicators, "
+                        f"{stats['memory_bytes'] / 1e6:.1f} MB filter, "
+                        f"expected false-positive rate {stats['expected_false_positive_rate']:.2e}")
+
+    def build_store(self, feed_path: str, store_path: str, kind: str, indicator_type: Optional[str] = None,
+                    risk_score: int = 80) -> IndicatorStore:
+        """Build a store from a feed file with the configured filter budget and add it to the store set."""
+        max_memory_mb = get_config_value("detection.ioc.bloom.max_memory_mb", None)
+        store = IndicatorStore.from_file(
+            feed_path, store_path, kind,
+            false_positive_rate=get_config_value("detection.ioc.bloom.false_positive_rate", 0.001),
+            max_memory_bytes=int(max_memory_mb * 1024 * 1024) if max_memory_mb else None,
+            indicator_type=indicator_type, risk_score=risk_score)
+        with self._update_lock:
+            self.stores = self.stores + [store]
+        return store
+
+    def stats(self) -> Dict:
+        """Indicator counts, memory use and filter accuracy."""
+        return {
+            "ip_indicators": len(self.index),
+            "ip_index_bytes": self.index.memory_bytes(),
+            "stores": [store.stats() for store in self.stores]
+        }
+
+    def detect(self, data: Dict) -> List[Dict]:
+        """Detect events whose addresses, domains or file hashes are known indicators."""
+        index = self.index
+        threats = []
+        if len(index):
+            for field in IP_FIELDS:
+                address = data.get(field)
+                if isinstance(address, str):
+                    match = index.lookup(address)
+                    if match is not None:
+                        threats.append(self._make_threat(field, address, match))
+        if self.stores:
+            threats.extend(self._detect_stores(data))
+        return threats
+
+    def _detect_stores(self, data: Dict) -> List[Dict]:
+        threats = []
+        for store in self.stores:
+            for field in STORE_FIELDS[store.kind]:
+                value = data.get(field)
+                if isinstance(value, str):
+                    indicator = store.lookup(value)
+                    if indicator is not None:
+                        threats.append(self._make_threat(field, value, {
+                            "type": store.metadata["type"], "risk_score": store.metadata["risk_score"],
+                            "indicator": indicator}))
+        return threats
+
+    def detect_batch(self, batch: EventBatch) -> List[List[Dict]]:
+        """Detect indicator hits for every row of an EventBatch, one threat list per row."""
+        results: List[List[Dict]] = [[] for _ in range(len(batch))]
+        index = self.index
+        if not len(batch):
+            return results
+        if self.stores:
+            # Domains and hashes are not batch columns, so they can only be in extras
+            for row, extras in enumerate(batch.extras):
+                if extras:
+                    results[row].extend(self._detect_stores(extras))
+        if not len(index):
+            return results
+        # Addresses come from the batch string table, so each distinct address is looked up once
+        matches: Dict[int, Dict] = {}
+        for field in IP_FIELDS:
+            for code in np.unique(batch.columns[field]).tolist():
+                if code >= 0 and code not in matches:
+                    matches[code] = index.lookup(batch.strings[code])
+        for field in IP_FIELDS:
+            codes = batch.columns[field]
+            hit_codes = [code for code, match in matches.items() if match is not None]
+            for row in np.flatnonzero(np.isin(codes, hit_codes)).tolist():
+                address = batch.strings[codes[row]]
+                results[row].append(self._make_threat(field, address, matches[codes[row]]))
+        extras_rows = [row for row, extras in enumerate(batch.extras) if extras and any(f in extras for f in IP_FIELDS)]
+        for row in extras_rows:
+            # Addresses that did not fit the columns (e.g. malformed) sit in extras
+            results[row].extend(self.detect({field: batch.extras[row].get(field) for field in IP_FIELDS}))
+        return results
+
+    def _make_threat(self, field: str, address: str, match: Dict) -> Dict:
+        threat = {
+            "type": match.get("type", "malicious_ip"),
+            "risk_score": match.get("risk_score", 80),
+            "confidence": "high",
+            "description": f"IOC match: {field} {address} in {match['indicator']}",
+            "indicator": match["indicator"],
+            "field": field
+        }
+        logger.info(f"IOC threat detected: {threat}")
+        return threat
+
+if __name__ == "__main__":
+    detector = IOCDetector(feeds=[])
+    detector.update_indicators([("203.0.113.0/24", {"type": "c2", "risk_score": 90})])
+    print(detector.detect({"source_ip": "10.0.0.1", "destination_ip": "203.0.113.7"}))
@@ -0,0 +1,238 @@
+"""
+IP Indicator Index for the Cybersecurity Threat Detection System.
+Longest-prefix matching of IPv4/IPv6 addresses against large IP and CIDR indicator sets.
+"""
+
+import hashlib
+import json
+import socket
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+NO_MATCH = -1
+
+def address_to_int(address: str) -> Tuple[int, int]:
+    """Return (family version, integer value) for an IPv4 or IPv6 address string."""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+    except OSError:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+
+def parse_network(network: str) -> Tuple[int, int, int]:
+    """Return (family version, network int, prefix length) for an address or CIDR string."""
+    address, _, length = network.strip().partition("/")
+    version, value = address_to_int(address)
+    bits = 32 if version == 4 else 128
+    prefix_length = int(length) if length else bits
+    if not 0 <= prefix_length <= bits:
+        raise ValueError(f"Invalid prefix length in {network!r}")
+    # Host bits set in the indicator (e.g. 10.1.2.3/24) are ignored, as with strict=False
+    return version, value & ~((1 << (bits - prefix_length)) - 1), prefix_length
+
+def format_network(version: int, value: int, prefix_length: int) -> str:
+    """Render a network int and prefix length back to CIDR notation."""
+    if version == 4:
+        return f"{socket.inet_ntop(socket.AF_INET, value.to_bytes(4, 'big'))}/{prefix_length}"
+    return f"{socket.inet_ntop(socket.AF_INET6, value.to_bytes(16, 'big'))}/{prefix_length}"
+
+class _RangeTable:
+    """Prefixes of one address family flattened into sorted, disjoint address ranges.
+
+    Nested prefixes are resolved at build time so that every range carries its most
+    specific prefix, which turns longest-prefix match into a single binary search.
+    """
+
+    def __init__(self, bits: int, prefixes: List[Tuple[int, int, int]]):
+        self.bits = bits
+        # IPv4 boundaries fit a compact unsigned array; IPv6 needs arbitrary-precision ints
+        self.starts = array("I") if bits == 32 else []
+        self.values = array("i")
+        stack: List[Tuple[int, int]] = []
+        limit = 1 << bits
+        # Parents sort before the prefixes nested inside them
+        for start, length, value in sorted(prefixes, key=lambda prefix: (prefix[0], prefix[1])):
+            end = start + (1 << (bits - length)) - 1
+            while stack and stack[-1][0] < start:
+                closed_end, _ = stack.pop()
+                self._emit(closed_end + 1, stack[-1][1] if stack else NO_MATCH)
+            self._emit(start, value)
+            stack.append((end, value))
+        while stack:
+            closed_end, _ = stack.pop()
+            if closed_end + 1 < limit:
+                self._emit(closed_end + 1, stack[-1][1] if stack else NO_MATCH)
+
+    def _emit(self, position: int, value: int):
+        if self.starts and self.starts[-1] == position:
+            self.values[-1] = value
+            if len(self.values) > 1 and self.values[-2] == value:
+                self.starts.pop()
+                self.values.pop()
+            return
+        if self.values and self.values[-1] == value:
+            return
+        self.starts.append(position)
+        self.values.append(value)
+
+    def lookup(self, address: int) -> int:
+        index = bisect_right(self.starts, address) - 1
+        return self.values[index] if index >= 0 else NO_MATCH
+
+    def lookup_many(self, addresses: np.ndarray) -> np.ndarray:
+        """Vectorized lookup of IPv4 addresses given as a uint32 array."""
+        if not len(self.starts):
+            return np.full(len(addresses), NO_MATCH, dtype=np.int32)
+        starts = np.frombuffer(self.starts, dtype=np.uint32)
+        values = np.frombuffer(self.values, dtype=np.int32)
+        index = np.searchsorted(starts, addresses, side="right") - 1
+        return np.where(index >= 0, values[np.maximum(index, 0)], NO_MATCH)
+
+    def memory_bytes(self) -> int:
+        if isinstance(self.starts, array):
+            return self.starts.itemsize * len(self.starts) + self.values.itemsize * len(self.values)
+        return len(self.starts) * 40 + self.values.itemsize * len(self.values)
+
+class IPIndex:
+    """Immutable longest-prefix-match index over IP and CIDR indicators.
+
+    Updates build a new index and swap it in, so lookups never see a half-built table.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Dict]] = ()):
+        self.labels: List[Dict] = []
+        label_ids: Dict[Tuple, int] = {}
+        # (version, network int, prefix length) -> label id; a later entry for a prefix replaces the earlier one
+        unique: Dict[Tuple[int, int, int], int] = {}
+        skipped = 0
+        last_label, last_label_id = None, None
+        for network, label in entries:
+            try:
+                prefix = parse_network(network)
+            except (OSError, ValueError):
+                skipped += 1
+                continue
+            # Feeds repeat the same label for long runs of entries, so labels are interned
+            if label is last_label:
+                label_id = last_label_id
+            else:
+                key = tuple(sorted(label.items()))
+                label_id = label_ids.get(key)
+                if label_id is None:
+                    label_id = label_ids[key] = len(self.labels)
+                    self.labels.append(dict(label))
+                last_label, last_label_id = label, label_id
+            unique[prefix] = label_id
+        if skipped:
+            logger.warning(f"Skipped {skipped} invalid IP indicators")
+
+        # Per family, prefix id -> network start, prefix length and label, in compact arrays
+        self._starts = {4: array("I"), 6: []}
+        self._lengths = {4: array("B"), 6: array("B")}
+        self._labels = {4: array("i"), 6: array("i")}
+        for (version, start, length), label_id in unique.items():
+            self._starts[version].append(start)
+            self._lengths[version].append(length)
+            self._labels[version].append(label_id)
+        del unique
+        self._tables = {
+            version: _RangeTable(bits, list(zip(self._starts[version], self._lengths[version],
+                                                range(len(self._labels[version])))))
+            for version, bits in ((4, 32), (6, 128))
+        }
+
+    @classmethod
+    def from_file(cls, path: str, default_type: str = "malicious_ip", default_risk_score: int = 80,
+                  source: Optional[str] = None) -> "IPIndex":
+        """Bulk load 'network[,type[,risk_score]]' lines; blank lines and # comments are ignored."""
+        return cls(read_indicator_file(path, default_type, default_risk_score, source or path))
+
+    def __len__(self) -> int:
+        return len(self._labels[4]) + len(self._labels[6])
+
+    def lookup(self, address: str) -> Optional[Dict]:
+        """Return the most specific indicator containing an address, or None."""
+        try:
+            version, value = address_to_int(address)
+        except (OSError, TypeError):
+            return None
+        prefix_id = self._tables[version].lookup(value)
+        return self.describe(version, prefix_id) if prefix_id != NO_MATCH else None
+
+    def lookup_ipv4_many(self, addresses: np.ndarray) -> np.ndarray:
+        """IPv4 prefix ids (or NO_MATCH) for a uint32 array of addresses."""
+        return self._tables[4].lookup_many(addresses)
+
+    def describe(self, version: int, prefix_id: int) -> Dict:
+        """Indicator details for a prefix id returned by a lookup."""
+        result = dict(self.labels[self._labels[version][prefix_id]])
+        result["indicator"] = format_network(version, self._starts[version][prefix_id],
+                                             self._lengths[version][prefix_id])
+        return result
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the prefix arrays and lookup tables."""
+        size = sum(table.memory_bytes() for table in self._tables.values())
+        for version in (4, 6):
+            size += len(self._labels[version]) * (self._labels[version].itemsize + self._lengths[version].itemsize)
+        return size + self._starts[4].itemsize * len(self._starts[4]) + 40 * len(self._starts[6])
+
+    def fingerprint(self) -> str:
+        """Digest of the prefixes and labels; equal indexes built in different processes agree."""
+        digest = hashlib.sha256(json.dumps(self.labels, sort_keys=True, default=str).encode("utf-8"))
+        for version in (4, 6):
+            digest.update(repr(list(self._starts[version])).encode("ascii") if version == 6
+                          else self._starts[version].tobytes())
+            digest.update(self._lengths[version].tobytes())
+            digest.update(self._labels[version].tobytes())
+        return digest.hexdigest()[:16]
+
+def read_indicator_file(path: str, default_type: str, default_risk_score: int,
+                        source: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+    """Stream (network, label) pairs from an indicator feed file.
+
+    Lines with an unparseable network are skipped and a non-numeric risk score falls
+    back to default_risk_score, so one malformed line never aborts a feed load.
+    """
+    bad_networks, bad_scores = [], []
+    with open(path, "r") as f:
+        for number, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = [part.strip() for part in line.split(",")]
+            try:
+                parse_network(parts[0])
+            except (OSError, ValueError):
+                bad_networks.append(number)
+                continue
+            risk_score = default_risk_score
+            if len(parts) > 2 and parts[2]:
+                try:
+                    risk_score = int(parts[2])
+                except ValueError:
+                    bad_scores.append(number)
+            label = {
+                "type": parts[1] if len(parts) > 1 and parts[1] else default_type,
+                "risk_score": risk_score,
+            }
+            if source:
+                label["source"] = source
+            yield parts[0], label
+    if bad_networks:
+        logger.warning(f"Skipped {len(bad_networks)} lines with an invalid network in {path} "
+                       f"(first at line {bad_networks[0]})")
+    if bad_scores:
+        logger.warning(f"Used risk score {default_risk_score} for {len(bad_scores)} lines with a non-numeric "
+                       f"risk score in {path} (first at line {bad_scores[0]})")
+
+if __name__ == "__main__":
+    index = IPIndex([("10.0.0.0/8", {"type": "internal", "risk_score": 0}),
+                     ("10.1.2.0/24", {"type": "c2", "risk_score": 90}),
+                     ("2001:db8::/32", {"type": "scanner", "risk_score": 60})])
+    for address in ("10.1.2.3", "10.9.9.9", "2001:db8::1", "8.8.8.8"):
+        print(address, index.lookup(address))
@@ -0,0 +1,145 @@
+"""
+Model Store for the Cybersecurity Threat Detection System.
+Versioned, integrity-checked on-disk models whose node arrays are memory-mapped at load time.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional
+import joblib
+import numpy as np
+from .feature_schema import FeatureSchema
+from .flat_forest import FlatForest
+from ..utils.config_loader import get_config_value
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+MANIFEST = "manifest.json"
+ESTIMATOR_FILE = "estimator.joblib"
+
+StoredModel = namedtuple("StoredModel", ["name", "version", "forest", "schema", "estimator", "manifest"])
+
+class ModelStoreError(Exception):
+    """Raised when a stored model is missing, unreadable or fails its integrity check."""
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ModelStore:
+    """Models stored as <root>/<name>/<version>/ directories, one immutable directory per version.
+
+    Forest node arrays are plain .npy files opened with mmap, so every worker
+    process loading the same version shares one copy of the pages.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or get_config_value("detection.model_store.path", "data/models")
+
+    def versions(self, name: str) -> List[int]:
+        """Stored versions of a model, oldest first."""
+        directory = os.path.join(self.root, name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(entry) for entry in os.listdir(directory) if entry.isdigit())
+
+    def latest_version(self, name: str) -> Optional[int]:
+        """Newest stored version of a model, or None."""
+        versions = self.versions(name)
+        return versions[-1] if versions else None
+
+    def save(self, name: str, forest: FlatForest, estimator=None, schema: Optional[FeatureSchema] = None,
+             metadata: Optional[Dict] = None) -> int:
+        """Store a new version and return its number; the version appears atomically once complete."""
+        directory = os.path.join(self.root, name)
+        os.makedirs(directory, exist_ok=True)
+        staging = os.path.join(directory, f".staging-{os.getpid()}-{time.time_ns()}")
+        os.makedirs(staging)
+        try:
+            files = {}
+            for array_name, array in forest.to_arrays().items():
+                filename = f"forest.{array_name}.npy"
+                np.save(os.path.join(staging, filename), np.ascontiguousarray(array), allow_pickle=False)
+                files[filename] = _file_digest(os.path.join(staging, filename))
+            if estimator is not None:
+                joblib.dump(estimator, os.path.join(staging, ESTIMATOR_FILE))
+                files[ESTIMATOR_FILE] = _file_digest(os.path.join(staging, ESTIMATOR_FILE))
+            manifest = {
+                "name": name,
+                "kind": forest.kind,
+                "created": time.time(),
+                "schema": schema.to_dict() if schema is not None else None,
+                "metadata": metadata or {},
+                "files": files
+            }
+            with open(os.path.join(staging, MANIFEST), "w") as f:
+                json.dump(manifest, f, indent=2)
+            while True:
+                version = (self.latest_version(name) or 0) + 1
+                try:
+                    # Renaming onto an existing version fails, so concurrent savers each get their own number
+                    os.rename(staging, os.path.join(directory, str(version)))
+                    break
+                except OSError:
+                    if not os.path.isdir(os.path.join(directory, str(version))):
+                        raise
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logger.info(f"Stored model {name} version {version}")
+        return version
+
+    def load(self, name: str, version: Optional[int] = None, verify: bool = True,
+             load_estimator: bool = True) -> StoredModel:
+        """Load a model version (the newest by default) with its forest arrays memory-mapped."""
+        if version is None:
+            version = self.latest_version(name)
+            if version is None:
+                raise ModelStoreError(f"No stored versions of model {name!r} in {self.root}")
+        directory = os.path.join(self.root, name, str(version))
+        try:
+            with open(os.path.join(directory, MANIFEST), "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ModelStoreError(f"Cannot read model {name!r} version {version}: {str(e)}")
+
+        files = manifest["files"]
+        if verify:
+            for filename, expected in files.items():
+                path = os.path.join(directory, filename)
+                if not os.path.exists(path) or _file_digest(path) != expected:
+                    raise ModelStoreError(f"Integrity check failed for {name!r} version {version}: {filename}")
+
+        arrays = {}
+        for filename in files:
+            if filename.startswith("forest.") and filename.endswith(".npy"):
+                arrays[filename[len("forest."):-len(".npy")]] = np.load(
+                    os.path.join(directory, filename), mmap_mode="r", allow_pickle=False)
+        forest = FlatForest.from_arrays(manifest["kind"], arrays)
+        schema = FeatureSchema.from_dict(manifest["schema"]) if manifest.get("schema") else None
+        estimator = None
+        if load_estimator and ESTIMATOR_FILE in files:
+            estimator = joblib.load(os.path.join(directory, ESTIMATOR_FILE), mmap_mode="r")
+        return StoredModel(name, version, forest, schema, estimator, manifest)
+
+    def delete(self, name: str, version: int):
+        """Remove one stored version."""
+        shutil.rmtree(os.path.join(self.root, name, str(version)))
+
+if __name__ == "__main__":
+    import tempfile
+    from sklearn.ensemble import IsolationForest
+    X = np.random.RandomState(0).normal(size=(500, 4))
+    with tempfile.TemporaryDirectory() as root:
+        store = ModelStore(root)
+        version = store.save("demo", FlatForest.from_sklearn(IsolationForest(random_state=0).fit(X)))
+        stored = store.load("demo", version)
+        print(stored.version, stored.forest.predict(X[:10]), store.versions("demo"))
@@ -0,0 +1,193 @@
+"""
+Result Cache for the Cybersecurity Threat Detection System.
+Caches detection results by event content in a local LRU with an optional shared Redis tier.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional
+from ..utils.config_loader import get_config_value
+from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
+
+logger = get_logger()
+metrics = get_metrics()
+
+KEY_PREFIX = "threat-detection:result"
+# Approximate bytes per local entry beyond its key and value (dict slot, tuple, string headers)
+ENTRY_OVERHEAD = 200
+
+def event_fingerprint(event: Dict[str, Any], ignored: FrozenSet[str] = frozenset()) -> bytes:
+    """16-byte digest of an event's fields and values, skipping fields that cannot change its result.
+
+    Ignored fields still count when their value is text, which unscoped signatures match.
+    """
+    parts = []
+    for key in sorted(event):
+        value = event[key]
+        if key in ignored and not isinstance(value, str):
+            continue
+        if isinstance(value, (memoryview, bytearray)):
+            value = bytes(value)
+        # repr keeps types apart ("80" vs 80) and covers nested lists and dicts well enough for a cache key
+        parts.append(f"{key}\x00{value!r}")
+    return hashlib.blake2b("\x01".join(parts).encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+class LocalRedis:
+    """In-process stand-in for the redis-py client covering the calls the shared tier makes."""
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value, ex: Optional[int] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def flushdb(self) -> bool:
+        with self._lock:
+            self._data.clear()
+        return True
+
+def connect_redis():
+    """Open a redis-py client with the configured database settings."""
+    import redis
+    return redis.Redis(host=get_config_value("storage.redis.host", "localhost"),
+                       port=get_config_value("storage.redis.port", 6379),
+                       db=get_config_value("storage.redis.db", 0),
+                       socket_timeout=get_config_value("storage.redis.socket_timeout_seconds", 0.05))
+
+class ResultCache:
+    """Threat lists by event fingerprint: an LRU with TTL and a byte budget, then an optional shared tier.
+
+    Entries are stored as JSON text, so hits hand out fresh lists that callers
+    may modify, and the byte budget counts what is actually held. Shared keys
+    carry the detection token, so workers only share results produced by the
+    same signatures and models.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None, shared=None):
+        self.max_bytes = max_bytes or int(get_config_value("performance.cache_size_mb", 1024) * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds or get_config_value("storage.redis.cache_ttl_seconds", 3600)
+        self.shared = shared
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats_counts = {"hits": 0, "misses": 0, "shared_hits": 0, "evictions": 0, "expired": 0,
+                             "invalidations": 0, "shared_errors": 0}
+
+    def get(self, key: bytes, token: str) -> Optional[List[Dict]]:
+        """Cached threats for a fingerprint, or None on a miss in every tier."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                text, expires, _ = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.stats_counts["hits"] += 1
+                    return [] if text == "[]" else json.loads(text)
+                self._remove(key)
+                self.stats_counts["expired"] += 1
+        if self.shared is not None:
+            try:
+                value = self.shared.get(self._shared_key(key, token))
+            except Exception as e:
+                self._shared_failed(e)
+                value = None
+            if value is not None:
+                text = value.decode("utf-8") if isinstance(value, bytes) else value
+                self._store(key, text)
+                with self._lock:
+                    self.stats_counts["hits"] += 1
+                    self.stats_counts["shared_hits"] += 1
+                return json.loads(text)
+        with self._lock:
+            self.stats_counts["misses"] += 1
+        return None
+
+    def put(self, key: bytes, token: str, threats: List[Dict]):
+        """Cache the threats found for a fingerprint in every tier."""
+        text = json.dumps(threats, default=str, separators=(",", ":"))
+        self._store(key, text)
+        if self.shared is not None:
+            try:
+                self.shared.set(self._shared_key(key, token), text, ex=int(self.ttl_seconds))
+            except Exception as e:
+                self._shared_failed(e)
+
+    def clear(self):
+        """Drop every local entry; shared entries are left to expire since their keys carry the old token."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.stats_counts["invalidations"] += 1
+
+    def _store(self, key: bytes, text: str):
+        size = len(key) + len(text) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (text, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats_counts["evictions"] += 1
+
+    def _remove(self, key: bytes):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    @staticmethod
+    def _shared_key(key: bytes, token: str) -> str:
+        return f"{KEY_PREFIX}:{token}:{key.hex()}"
+
+    def _shared_failed(self, error: Exception):
+        # The shared tier is an optimization; detection carries on locally when it is unreachable
+        with self._lock:
+            self.stats_counts["shared_errors"] += 1
+            first = self.stats_counts["shared_errors"] == 1
+        if first:
+            logger.error(f"Shared result cache unavailable: {str(error)}")
+
+    def stats(self) -> Dict:
+        """Hit ratio, tier hits, size and eviction counts."""
+        with self._lock:
+            counts = dict(self.stats_counts)
+            entries, size = len(self._entries), self._bytes
+        lookups = counts["hits"] + counts["misses"]
+        counts.update({
+            "hit_ratio": counts["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "shared": self.shared is not None
+        })
+        metrics.set_gauge("detection.cache.hit_ratio", counts["hit_ratio"])
+        return counts
+
+if __name__ == "__main__":
+    cache = ResultCache(max_bytes=1 << 20, shared=LocalRedis())
+    key = event_fingerprint({"url": "http://malware.com", "timestamp": 1.0}, frozenset(["timestamp"]))
+    print(cache.get(key, "demo"))
+    cache.put(key, "demo", [{"type": "malware", "risk_score": 90}])
+    print(cache.get(key, "demo"), cache.stats())
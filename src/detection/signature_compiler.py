@@ -0,0 +1,380 @@
+"""
+Signature Compiler for the Cybersecurity Threat Detection System.
+Compiles field-scoped, regex-capable signatures into per-field match indexes.
+"""
+
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from .aho_corasick import AhoCorasick
+
+# Keys that make a dict a leaf condition, each naming how its value is matched
+MATCH_KEYS = ("pattern", "equals", "prefix", "suffix", "regex", "hex")
+BOOLEAN_KEYS = ("all", "any", "not")
+# A condition without "field" applies to every string field, as bare patterns always have
+ANY_FIELD = "*"
+
+_EMPTY: Set[int] = frozenset()
+
+# Signature number -> ordinal of a regex condition within the signature -> its measured (cost_us, match_ratio)
+DeferralPlan = Dict[int, Dict[int, Tuple[float, float]]]
+
+def _as_text(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # latin-1 maps bytes one to one onto code points, so byte patterns are plain substrings
+        return bytes(value).decode("latin-1")
+    return None
+
+class SignatureCompileError(ValueError):
+    """Raised when a signature cannot be compiled."""
+
+class FieldIndex:
+    """Match index for the conditions that target one field."""
+
+    def __init__(self):
+        self.contains: List[Tuple[str, int]] = []
+        self.contains_nocase: List[Tuple[str, int]] = []
+        self.equals: Dict[Any, List[int]] = {}
+        self.equals_nocase: Dict[str, List[int]] = {}
+        self.affixes: List[Tuple[str, str, bool, int]] = []
+        self.regexes: List[Tuple[Any, int]] = []
+        self._automaton: Optional[AhoCorasick] = None
+        self._automaton_nocase: Optional[AhoCorasick] = None
+
+    def freeze(self):
+        """Build the substring automatons once every condition has been added."""
+        self._automaton = AhoCorasick(self.contains) if self.contains else None
+        self._automaton_nocase = AhoCorasick(self.contains_nocase) if self.contains_nocase else None
+        self._needs_lower = bool(self.contains_nocase or self.equals_nocase
+                                 or any(nocase for _, _, nocase, _ in self.affixes))
+
+    def match(self, value: Any) -> Set[int]:
+        """Return the ids of the conditions satisfied by a field value."""
+        text = _as_text(value)
+        if text is None:
+            try:
+                return set(self.equals.get(value, _EMPTY))
+            except TypeError:
+                return set()
+
+        found, lowered = self._lookup(text)
+        for kind, affix, nocase, leaf in self.affixes:
+            subject = lowered if nocase else text
+            if (subject.startswith(affix) if kind == "prefix" else subject.endswith(affix)):
+                found.add(leaf)
+        for regex, leaf in self.regexes:
+            if regex.search(text):
+                found.add(leaf)
+        return found
+
+    def profile(self, value: Any, costs: Dict[int, List]) -> float:
+        """Match a value timing each scanned (affix and regex) condition into costs, returning the shared lookup time."""
+        clock = time.perf_counter
+        start = clock()
+        text = _as_text(value)
+        if text is None:
+            self.match(value)
+            return clock() - start
+        found, lowered = self._lookup(text)
+        shared = clock() - start
+        for kind, affix, nocase, leaf in self.affixes:
+            start = clock()
+            subject = lowered if nocase else text
+            matched = subject.startswith(affix) if kind == "prefix" else subject.endswith(affix)
+            _add_cost(costs, leaf, clock() - start, matched)
+        for regex, leaf in self.regexes:
+            start = clock()
+            matched = regex.search(text) is not None
+            _add_cost(costs, leaf, clock() - start, matched)
+        return shared
+
+    def _lookup(self, text: str) -> Tuple[Set[int], Optional[str]]:
+        # Equality and substring conditions, answered for all signatures at once
+        found = set(self.equals.get(text, _EMPTY))
+        if self._automaton is not None:
+            found |= self._automaton.search(text)
+        lowered = None
+        if self._needs_lower:
+            lowered = text.lower()
+            if self._automaton_nocase is not None:
+                found |= self._automaton_nocase.search(lowered)
+            found.update(self.equals_nocase.get(lowered, _EMPTY))
+        return found, lowered
+
+class CompiledSignatures:
+    """Signatures compiled into per-field indexes plus one boolean expression per signature.
+
+    Regex conditions named in a deferral plan are left out of the per-field scan when
+    the signature cannot match without one of its other conditions: they are only run,
+    cheapest and most decisive first, for events where that other condition matched.
+    """
+
+    def __init__(self, signatures: List[Dict], deferred: Optional[DeferralPlan] = None):
+        self.signatures = signatures
+        self.plan: DeferralPlan = deferred or {}
+        self.indexes: Dict[str, FieldIndex] = {}
+        self.expressions: List[tuple] = []
+        # leaf id -> indexes of the signatures that reference it
+        self.leaf_signatures: List[List[int]] = []
+        # signature number -> its first leaf id, so a leaf is also known by its ordinal within its signature
+        self.first_leaf: List[int] = []
+        # Signatures that can match with no satisfied condition (e.g. a bare "not")
+        self.unconditional: List[int] = []
+        # Deferred leaf id -> (regex, fields), run only while evaluating a signature
+        self.deferred: Dict[int, Tuple[Any, List[str]]] = {}
+        self._pending: Dict[int, Tuple[Any, List[str]]] = {}
+        for number, signature in enumerate(signatures):
+            try:
+                self._compile_signature(number, signature)
+            except SignatureCompileError as e:
+                raise SignatureCompileError(f"Signature {number} ({signature.get('type', 'untyped')}): {str(e)}")
+        for index in self.indexes.values():
+            index.freeze()
+
+    @property
+    def fields(self) -> Set[str]:
+        """Fields that at least one signature targets specifically."""
+        return {field for field in self.indexes if field != ANY_FIELD}
+
+    def match_field(self, field: str, value: Any) -> Set[int]:
+        """Conditions satisfied by one field of an event."""
+        index = self.indexes.get(field)
+        found = index.match(value) if index is not None else set()
+        any_field = self.indexes.get(ANY_FIELD)
+        if any_field is not None and isinstance(value, str):
+            found |= any_field.match(value)
+        return found
+
+    def match_event(self, event: Dict, evaluated: Optional[List[int]] = None) -> List[int]:
+        """Indexes of the signatures matching an event, in signature order."""
+        leaves: Set[int] = set()
+        for field, value in event.items():
+            leaves |= self.match_field(field, value)
+        return self.evaluate(leaves, event, evaluated)
+
+    def evaluate(self, leaves: Set[int], event: Union[Dict, Callable[[], Dict], None] = None,
+                 evaluated: Optional[List[int]] = None) -> List[int]:
+        """Indexes of the signatures whose expression holds given the satisfied conditions.
+
+        event (or a function returning it) is needed to run deferred conditions; the
+        numbers of the signatures evaluated are appended to evaluated when given.
+        """
+        candidates = set(self.unconditional)
+        for leaf in leaves:
+            candidates.update(self.leaf_signatures[leaf])
+        if evaluated is not None:
+            evaluated.extend(candidates)
+        resolve = self._resolver(event) if self.deferred and event is not None else None
+        return [number for number in sorted(candidates) if _evaluate(self.expressions[number], leaves, resolve)]
+
+    def leaf_key(self, leaf: int) -> Tuple[int, int]:
+        """(signature number, ordinal within the signature) of a leaf id."""
+        number = self.leaf_signatures[leaf][0]
+        return number, leaf - self.first_leaf[number]
+
+    def profile_event(self, event: Dict) -> Tuple[float, Dict[int, List]]:
+        """Match an event timing every scanned or deferred condition.
+
+        Returns the time spent in lookups shared by all signatures, and per leaf id its
+        [seconds, matched] on this event.
+        """
+        clock = time.perf_counter
+        shared = 0.0
+        costs: Dict[int, List] = {}
+        any_field = self.indexes.get(ANY_FIELD)
+        for field, value in event.items():
+            index = self.indexes.get(field)
+            if index is not None:
+                shared += index.profile(value, costs)
+            if any_field is not None and isinstance(value, str):
+                shared += any_field.profile(value, costs)
+        for leaf in self.deferred:
+            start = clock()
+            matched = self._match_deferred(leaf, event)
+            _add_cost(costs, leaf, clock() - start, matched)
+        return shared, costs
+
+    def _resolver(self, event: Union[Dict, Callable[[], Dict]]) -> Callable[[int], bool]:
+        results: Dict[int, bool] = {}
+        data: List[Dict] = []
+
+        def resolve(leaf: int) -> bool:
+            if leaf not in self.deferred:
+                return False
+            if leaf not in results:
+                if not data:
+                    data.append(event() if callable(event) else event)
+                results[leaf] = self._match_deferred(leaf, data[0])
+            return results[leaf]
+        return resolve
+
+    def _match_deferred(self, leaf: int, event: Dict) -> bool:
+        regex, fields = self.deferred[leaf]
+        for field, value in event.items():
+            if field in fields:
+                text = _as_text(value)
+            elif ANY_FIELD in fields and isinstance(value, str):
+                text = value
+            else:
+                continue
+            if text is not None and regex.search(text):
+                return True
+        return False
+
+    def _compile_signature(self, number: int, signature: Dict):
+        if not isinstance(signature, dict):
+            raise SignatureCompileError("signature must be an object")
+        for key in ("type", "risk_score"):
+            if key not in signature:
+                raise SignatureCompileError(f"missing required key '{key}'")
+        first_leaf = len(self.leaf_signatures)
+        self.first_leaf.append(first_leaf)
+        self._defer = self.plan.get(number, {})
+        self._pending = {}
+        expression = self._compile_node(signature)
+        if self._pending:
+            # Deferring is only safe when the signature cannot match on its deferred conditions alone
+            if _evaluate(expression, set(self._pending)):
+                for leaf, (regex, fields) in self._pending.items():
+                    self._index_regex(regex, fields, leaf)
+            else:
+                self.deferred.update(self._pending)
+                ranks = {first_leaf + ordinal: cost for ordinal, cost in self._defer.items()}
+                expression = _order(expression, {leaf: ranks[leaf] for leaf in self._pending})
+        self.expressions.append(expression)
+        for leaf in range(first_leaf, len(self.leaf_signatures)):
+            self.leaf_signatures[leaf].append(number)
+        # With none of its own conditions satisfied a signature's result never changes
+        if _evaluate(expression, _EMPTY):
+            self.unconditional.append(number)
+
+    def _compile_node(self, node: Any, negated: bool = False) -> tuple:
+        if not isinstance(node, dict):
+            raise SignatureCompileError(f"condition must be an object, got {type(node).__name__}")
+        boolean = [key for key in BOOLEAN_KEYS if key in node]
+        matchers = [key for key in MATCH_KEYS if key in node]
+        if len(boolean) + len(matchers) != 1:
+            raise SignatureCompileError(
+                f"condition needs exactly one of {', '.join(MATCH_KEYS + BOOLEAN_KEYS)}, got {boolean + matchers or 'none'}")
+        if boolean:
+            key = boolean[0]
+            if key == "not":
+                return ("not", self._compile_node(node["not"], not negated))
+            children = node[key]
+            if not isinstance(children, list) or not children:
+                raise SignatureCompileError(f"'{key}' needs a non-empty list of conditions")
+            return (key, tuple(self._compile_node(child, negated) for child in children))
+        return ("leaf", self._compile_leaf(node, matchers[0], negated))
+
+    def _compile_leaf(self, node: Dict, kind: str, negated: bool = False) -> int:
+        fields = node.get("field", ANY_FIELD)
+        fields = fields if isinstance(fields, list) else [fields]
+        if not fields or not all(isinstance(field, str) for field in fields):
+            raise SignatureCompileError("'field' must be a field name or a list of field names")
+        value = node[kind]
+        nocase = bool(node.get("nocase", False))
+        leaf = len(self.leaf_signatures)
+        self.leaf_signatures.append([])
+
+        if kind == "regex":
+            if not isinstance(value, str):
+                raise SignatureCompileError("'regex' must be a string")
+            try:
+                compiled = re.compile(value, re.IGNORECASE if nocase else 0)
+            except re.error as e:
+                raise SignatureCompileError(f"invalid regex {value!r}: {str(e)}")
+        elif kind == "hex":
+            try:
+                value = bytes.fromhex(value).decode("latin-1")
+            except (TypeError, ValueError):
+                raise SignatureCompileError(f"invalid hex byte pattern {value!r}")
+        elif kind == "equals":
+            if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                raise SignatureCompileError("'equals' must be a string or number")
+        elif not isinstance(value, str):
+            raise SignatureCompileError(f"'{kind}' must be a string")
+
+        if kind == "regex":
+            # Only conditions a match requires to hold can wait until the rest of the signature matched
+            if not negated and leaf - self.first_leaf[-1] in self._defer:
+                self._pending[leaf] = (compiled, fields)
+            else:
+                self._index_regex(compiled, fields, leaf)
+            return leaf
+        for field in fields:
+            index = self.indexes.setdefault(field, FieldIndex())
+            if kind in ("pattern", "hex"):
+                if nocase:
+                    index.contains_nocase.append((value.lower(), leaf))
+                else:
+                    index.contains.append((value, leaf))
+            elif kind == "equals":
+                if nocase and isinstance(value, str):
+                    index.equals_nocase.setdefault(value.lower(), []).append(leaf)
+                else:
+                    index.equals.setdefault(value, []).append(leaf)
+            else:
+                index.affixes.append((kind, value.lower() if nocase else value, nocase, leaf))
+        return leaf
+
+    def _index_regex(self, regex: Any, fields: List[str], leaf: int):
+        for field in fields:
+            self.indexes.setdefault(field, FieldIndex()).regexes.append((regex, leaf))
+
+def _add_cost(costs: Dict[int, List], leaf: int, seconds: float, matched: bool):
+    cost = costs.setdefault(leaf, [0.0, False])
+    cost[0] += seconds
+    cost[1] = cost[1] or matched
+
+def _evaluate(expression: tuple, leaves: Set[int], resolve: Optional[Callable[[int], bool]] = None) -> bool:
+    kind, operand = expression
+    if kind == "leaf":
+        return operand in leaves or (resolve is not None and resolve(operand))
+    if kind == "all":
+        return all(_evaluate(child, leaves, resolve) for child in operand)
+    if kind == "any":
+        return any(_evaluate(child, leaves, resolve) for child in operand)
+    return not _evaluate(operand, leaves, resolve)
+
+def _order(expression: tuple, deferred: Dict[int, Tuple[float, float]]) -> tuple:
+    """Reorder "all" and "any" children so deferred conditions run last, cheapest and most decisive first."""
+    kind, operand = expression
+    if kind == "not":
+        return (kind, _order(operand, deferred))
+    if kind == "leaf":
+        return expression
+    children = tuple(_order(child, deferred) for child in operand)
+
+    def rank(child: tuple) -> float:
+        # Expected cost per decision: an "all" stops at the first failure, an "any" at the first success
+        if child[0] != "leaf" or child[1] not in deferred:
+            return sum(deferred.get(leaf, (0.0, 0.0))[0] for leaf in _leaves(child))
+        cost, ratio = deferred[child[1]]
+        decisive = 1.0 - ratio if kind == "all" else ratio
+        return cost / max(decisive, 0.01)
+    return (kind, tuple(sorted(children, key=rank)))
+
+def _leaves(expression: tuple) -> List[int]:
+    kind, operand = expression
+    if kind == "leaf":
+        return [operand]
+    if kind == "not":
+        return _leaves(operand)
+    return [leaf for child in operand for leaf in _leaves(child)]
+
+def compile_signatures(signatures: List[Dict], deferred: Optional[DeferralPlan] = None) -> CompiledSignatures:
+    """Compile a signature list, raising SignatureCompileError on the first invalid signature."""
+    return CompiledSignatures(signatures, deferred)
+
+
+if __name__ == "__main__":
+    compiled = compile_signatures([
+        {"type": "malware", "pattern": "malware.com", "risk_score": 90},
+        {"type": "admin_probe", "risk_score": 70,
+         "all": [{"field": "url", "regex": r"^/admin/.*\.php$"}, {"not": {"field": "source_ip", "prefix": "10."}}]},
+        {"type": "shellcode", "field": "payload", "hex": "90909090", "risk_score": 95},
+    ])
+    print(compiled.match_event({"url": "/admin/setup.php", "source_ip": "203.0.113.5"}))
+    print(compiled.match_event({"payload": b"\x00\x90\x90\x90\x90", "source_ip": "10.0.0.1"}))
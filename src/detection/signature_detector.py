@@ -3,16 +3,66 @@ Signature-based Detector for the Cybersecurity Threat Detection System.
 Detects known threats using predefined signatures and patterns.
 """
 
-from typing import Dict, List
+import hashlib
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import numpy as np
+from .signature_compiler import compile_signatures
+from .signature_profile import SignatureProfile
+from ..utils.config_loader import get_config_value
+from ..utils.event_batch import FIELDS, STRING_FIELDS, EventBatch
 from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
 
 logger = get_logger()
+metrics = get_metrics()
+
+DEFAULT_SOURCE = "default"
+API_SOURCE = "api"
+
+# One published signature set: never modified, only replaced. sources maps each origin (defaults, the API,
+# a rule file path) to its signatures; signatures is their merge in source order, one entry per signature id, ids
+# gives each one's id. Re-optimizing swaps in a new compiled form under the same version
+SignatureSnapshot = namedtuple("SignatureSnapshot", ["version", "signatures", "compiled", "sources", "created", "ids"])
+
+def signature_id(signature: Dict) -> str:
+    """A signature's "id", or a hash of its content for signatures without one."""
+    if "id" in signature:
+        return str(signature["id"])
+    encoded = json.dumps(signature, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+def _dedupe(signatures: Iterable[Dict]) -> List[Dict]:
+    # A later signature with the same id replaces the earlier one in its position
+    merged: Dict[str, Dict] = {}
+    for signature in signatures:
+        merged[signature_id(signature)] = signature
+    return list(merged.values())
 
 class SignatureDetector:
-    """Detects known threats using signature-based methods."""
+    """Detects known threats using signature-based methods.
+
+    Readers take the current snapshot with a single attribute read and use it for
+    the whole call, so they never lock and never see a half-built set. Writers
+    compile a new snapshot aside and swap it in; earlier snapshots are kept for rollback.
+    With a profile, expensive regex conditions it measures are deferred until the rest
+    of their signature matched; signatures themselves keep their order, so threats do too.
+    """
     
-    def __init__(self):
-        self.signatures = self._load_default_signatures()
+    def __init__(self, history: Optional[int] = None, profile: Optional[SignatureProfile] = None):
+        self._write_lock = threading.Lock()
+        self.profile = profile
+        if profile is None and get_config_value("detection.signatures.profile.enabled", True):
+            self.profile = SignatureProfile()
+        self.auto_optimize = get_config_value("detection.signatures.profile.auto_optimize", True)
+        self._history: deque = deque(maxlen=history or get_config_value("detection.signatures.history", 10))
+        self._next_version = 1
+        self.snapshot: Optional[SignatureSnapshot] = None
+        with self._write_lock:
+            self._publish({DEFAULT_SOURCE: self._load_default_signatures()})
         logger.info("Signature Detector initialized with default signatures.")
     
     def _load_default_signatures(self) -> List[Dict]:
@@ -23,37 +73,242 @@ class SignatureDetector:
             {"type": "brute_force", "pattern": "failed login", "risk_score": 80}
         ]
     
+    @property
+    def signatures(self) -> List[Dict]:
+        """The active signatures; treat as read-only."""
+        return self.snapshot.signatures
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    @property
+    def target_fields(self) -> Set[str]:
+        """Fields that at least one signature is scoped to."""
+        return self.snapshot.compiled.fields
+
     def detect(self, data: Dict) -> List[Dict]:
         """Detect threats based on signatures."""
-        threats = []
-        for signature in self.signatures:
-            if self._matches_signature(data, signature):
-                threat = {
-                    "type": signature["type"],
-                    "risk_score": signature["risk_score"],
-                    "confidence": "high",
-                    "description": f"Signature match: {signature['pattern']}"
-                }
-                threats.append(threat)
-                logger.info(f"Signature threat detected: {threat}")
-        return threats
-    
-    def _matches_signature(self, data: Dict, signature: Dict) -> bool:
-        """Check if data matches a signature."""
-        pattern = signature["pattern"]
-        # Simple string matching - can be extended with regex or more complex patterns
-        for value in data.values():
-            if isinstance(value, str) and pattern in value:
-                return True
-        return False
+        snapshot = self.snapshot
+        if self.profile is None:
+            # Each field is run once through its own index, so signatures scoped to absent fields cost nothing
+            return [self._make_threat(snapshot.signatures[i]) for i in snapshot.compiled.match_event(data)]
+        evaluated: List[int] = []
+        matched = snapshot.compiled.match_event(data, evaluated)
+        self._record(snapshot, 1, lambda offset: data, evaluated, matched)
+        return [self._make_threat(snapshot.signatures[i]) for i in matched]
+
+    def detect_batch(self, batch: EventBatch) -> List[List[Dict]]:
+        """Detect threats for every row of an EventBatch, returning one threat list per row."""
+        snapshot = self.snapshot
+        compiled = snapshot.compiled
+        signatures = snapshot.signatures
+        rows = len(batch)
+        row_leaves: List[Optional[Set[int]]] = [None] * rows
+        columns = batch.columns
+
+        def merge(indexes, leaves):
+            for index in indexes:
+                if row_leaves[index] is None:
+                    row_leaves[index] = set(leaves)
+                else:
+                    row_leaves[index] |= leaves
+
+        # Column values (IPs, flags, ports) repeat heavily, so each distinct value is matched once
+        for name in FIELDS:
+            if name in ("payload", "timestamp"):
+                continue
+            string_column = name in STRING_FIELDS
+            if not string_column and name not in compiled.fields:
+                continue
+            values, inverse = np.unique(columns[name], return_inverse=True)
+            matches = {}
+            for position, value in enumerate(values.tolist()):
+                if value < 0:
+                    continue
+                leaves = compiled.match_field(name, batch.strings[value] if string_column else value)
+                if leaves:
+                    matches[position] = leaves
+            if matches:
+                for index in np.flatnonzero(np.isin(inverse, list(matches))).tolist():
+                    merge([index], matches[inverse[index]])
+
+        if "timestamp" in compiled.fields:
+            for index in np.flatnonzero(batch.has_field("timestamp")).tolist():
+                merge([index], compiled.match_field("timestamp", batch[index]["timestamp"]))
+        text_payloads = columns["payload_is_text"] & (columns["payload_length"] >= 0)
+        payload_rows = columns["payload_length"] >= 0 if "payload" in compiled.fields else text_payloads
+        for index in np.flatnonzero(payload_rows).tolist():
+            merge([index], compiled.match_field("payload", batch.payload(index)))
+        for index, extras in enumerate(batch.extras):
+            if extras:
+                for key, value in extras.items():
+                    merge([index], compiled.match_field(key, value))
+
+        # Rows with no satisfied condition all share one result
+        unmatched_numbers = compiled.evaluate(set()) if compiled.unconditional else []
+        unmatched = [self._make_threat(signatures[i]) for i in unmatched_numbers]
+        evaluated: Optional[List[int]] = [] if self.profile is not None else None
+        matched: List[List[int]] = []
+        for row, leaves in enumerate(row_leaves):
+            if leaves:
+                # Deferred conditions need the row itself, which is only built when one is reached
+                event = (lambda row=row: batch.event(row)) if compiled.deferred else None
+                matched.append(compiled.evaluate(leaves, event, evaluated))
+            else:
+                matched.append(unmatched_numbers)
+        if evaluated is not None:
+            empty_rows = sum(1 for leaves in row_leaves if not leaves)
+            evaluated.extend(compiled.unconditional * empty_rows)
+            self._record(snapshot, rows, batch.event, evaluated, [i for numbers in matched for i in numbers])
+        return [
+            [self._make_threat(signatures[i]) for i in numbers] if numbers is not unmatched_numbers else list(unmatched)
+            for numbers in matched
+        ]
+
+    def _record(self, snapshot: SignatureSnapshot, events: int, event_at: Callable[[int], Dict],
+                evaluated: List[int], matched: List[int]):
+        # Exact counts for every call; one event in sample_interval is matched again with its conditions timed
+        ids = snapshot.ids
+        offsets = self.profile.record(events, [ids[i] for i in evaluated], [ids[i] for i in matched])
+        due = False
+        for offset in offsets:
+            shared, costs = snapshot.compiled.profile_event(event_at(offset))
+            keyed = {}
+            for leaf, cost in costs.items():
+                number, ordinal = snapshot.compiled.leaf_key(leaf)
+                keyed[(ids[number], ordinal)] = cost
+            due = self.profile.record_sample(shared, keyed) or due
+        if due and self.auto_optimize:
+            # Never wait on a writer from the detection path; the next due sample tries again
+            self.optimize(blocking=False)
+
+    def _make_threat(self, signature: Dict) -> Dict:
+        threat = {
+            "type": signature["type"],
+            "risk_score": signature["risk_score"],
+            "confidence": "high",
+            "description": f"Signature match: {signature.get('pattern', signature.get('name', signature['type']))}"
+        }
+        logger.info(f"Signature threat detected: {threat}")
+        return threat
     
     def update_signatures(self, new_signatures: List[Dict]):
-        """Update the signature database."""
-        self.signatures.extend(new_signatures)
+        """Add signatures, replacing any with the same id; the whole update is rejected if any fails to compile."""
+        new_signatures = list(new_signatures)
+        with self._write_lock:
+            sources = dict(self.snapshot.sources)
+            sources[API_SOURCE] = _dedupe(sources.get(API_SOURCE, []) + new_signatures)
+            self._publish(sources)
         logger.info(f"Added {len(new_signatures)} new signatures.")
 
+    def remove_signatures(self, ids: Iterable[str]) -> int:
+        """Delete signatures by id from every source, returning how many were removed."""
+        ids = set(ids)
+        with self._write_lock:
+            sources = {source: [signature for signature in signatures if signature_id(signature) not in ids]
+                       for source, signatures in self.snapshot.sources.items()}
+            removed = sum(len(signatures) for signatures in self.snapshot.sources.values()) - \
+                sum(len(signatures) for signatures in sources.values())
+            if removed:
+                self._publish(sources)
+        logger.info(f"Removed {removed} signatures.")
+        return removed
+
+    def load_sources(self, updates: Dict[str, Optional[List[Dict]]]):
+        """Replace the signatures of whole sources at once; None or an empty list drops a source."""
+        with self._write_lock:
+            sources = dict(self.snapshot.sources)
+            for source, signatures in updates.items():
+                if signatures:
+                    sources[source] = _dedupe(signatures)
+                else:
+                    sources.pop(source, None)
+            self._publish(sources)
+
+    def rollback(self, version: Optional[int] = None) -> int:
+        """Make an earlier snapshot (the previous one by default) active again, returning its version."""
+        with self._write_lock:
+            if not self._history:
+                raise ValueError("No earlier signature snapshot to roll back to")
+            if version is None:
+                target = self._history[-1]
+            else:
+                target = next((snapshot for snapshot in self._history if snapshot.version == version), None)
+                if target is None:
+                    raise ValueError(f"Signature version {version} is not in the rollback history")
+            self._history.remove(target)
+            # The snapshot being replaced stays in history, so a rollback can itself be undone
+            self._history.append(self.snapshot)
+            self._activate(target)
+        logger.warning(f"Signatures rolled back to version {target.version}.")
+        return target.version
+
+    def optimize(self, blocking: bool = True) -> bool:
+        """Recompile the active signatures with the profile's deferral plan, returning True if it changed."""
+        if self.profile is None or not self._write_lock.acquire(blocking=blocking):
+            return False
+        try:
+            snapshot = self.snapshot
+            plan = self.profile.plan(snapshot.ids)
+            if _deferral_sets(plan) == _deferral_sets(snapshot.compiled.plan):
+                return False
+            compiled = compile_signatures(snapshot.signatures, plan)
+            self._activate(snapshot._replace(compiled=compiled))
+        finally:
+            self._write_lock.release()
+        metrics.increment("detection.signatures.optimizations")
+        logger.info(f"Signatures re-optimized: {len(compiled.deferred)} conditions deferred.")
+        return True
+
+    def profile_report(self, limit: Optional[int] = None) -> Dict:
+        """Per-signature evaluation, hit and cost counters for the active signatures, costliest first."""
+        if self.profile is None:
+            return {"enabled": False}
+        snapshot = self.snapshot
+        compiled = snapshot.compiled
+        deferred = set()
+        for leaf in compiled.deferred:
+            number, ordinal = compiled.leaf_key(leaf)
+            deferred.add((snapshot.ids[number], ordinal))
+        report = self.profile.report(snapshot.ids, snapshot.signatures, deferred, limit)
+        report.update({"enabled": True, "version": snapshot.version, "deferred_conditions": len(deferred)})
+        return report
+
+    def versions(self) -> List[Dict]:
+        """Snapshots available for rollback and the active one, by version."""
+        active = self.snapshot
+        snapshots = sorted(list(self._history) + [active], key=lambda snapshot: snapshot.version)
+        return [{"version": snapshot.version, "signatures": len(snapshot.signatures), "created": snapshot.created,
+                 "sources": sorted(snapshot.sources), "active": snapshot is active} for snapshot in snapshots]
+
+    def _publish(self, sources: Dict[str, List[Dict]]):
+        # Called with the write lock held; compiling first means a bad update leaves the active snapshot in place
+        signatures = _dedupe(signature for source_signatures in sources.values() for signature in source_signatures)
+        ids = [signature_id(signature) for signature in signatures]
+        # Conditions already measured stay deferred across reloads, since profiles are kept by signature id
+        compiled = compile_signatures(signatures, self.profile.plan(ids) if self.profile is not None else None)
+        snapshot = SignatureSnapshot(self._next_version, signatures, compiled, sources, time.time(), ids)
+        if self.profile is not None:
+            self.profile.register(ids)
+        self._next_version += 1
+        if self.snapshot is not None:
+            self._history.append(self.snapshot)
+        self._activate(snapshot)
+
+    def _activate(self, snapshot: SignatureSnapshot):
+        self.snapshot = snapshot
+        metrics.set_gauge("detection.signatures.version", snapshot.version)
+        metrics.set_gauge("detection.signatures.count", len(snapshot.signatures))
+
+def _deferral_sets(plan: Dict[int, Dict[int, tuple]]) -> Dict[int, Set[int]]:
+    return {number: set(conditions) for number, conditions in plan.items()}
+
 if __name__ == "__main__":
     detector = SignatureDetector()
     test_data = {"url": "malware.com/download"}
     threats = detector.detect(test_data)
     print(threats)
+    detector.update_signatures([{"id": "dl", "type": "malware", "pattern": "/download", "risk_score": 70}])
+    print(detector.detect(test_data), detector.rollback(), detector.versions())
+    print(detector.profile_report(limit=3))
@@ -0,0 +1,161 @@
+"""
+Signature Profile for the Cybersecurity Threat Detection System.
+Counts per-signature evaluations and hits, samples condition costs, and plans which expensive conditions to defer.
+"""
+
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from .signature_compiler import DeferralPlan
+from ..utils.config_loader import get_config_value
+from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
+
+logger = get_logger()
+metrics = get_metrics()
+
+class SignatureProfile:
+    """Evaluation, hit and cost counters for signatures, keyed by signature id so they survive reloads.
+
+    Evaluations and hits are counted for every event. Costs come from one event in
+    sample_interval, matched again with every scanned (affix or regex) and deferred
+    condition timed on its own; substring and equality lookups are shared by all
+    signatures and reported as one total.
+    """
+
+    def __init__(self, sample_interval: Optional[int] = None, optimize_every: Optional[int] = None,
+                 defer_min_us: Optional[float] = None, min_events: Optional[int] = None,
+                 noisy_ratio: Optional[float] = None, slow_us: Optional[float] = None):
+        self.sample_interval = max(1, int(sample_interval or
+                                          get_config_value("detection.signatures.profile.sample_interval", 100)))
+        self.optimize_every = optimize_every or get_config_value("detection.signatures.profile.optimize_every", 1000)
+        self.defer_min_us = defer_min_us or get_config_value("detection.signatures.profile.defer_min_us", 5.0)
+        self.min_events = min_events or get_config_value("detection.signatures.profile.min_events", 1000)
+        self.noisy_ratio = noisy_ratio or get_config_value("detection.signatures.profile.noisy_ratio", 0.5)
+        self.slow_us = slow_us or get_config_value("detection.signatures.profile.slow_us", 50.0)
+        self.events = 0
+        self.samples = 0
+        self.shared_seconds = 0.0
+        self.evaluations: Counter = Counter()
+        self.hits: Counter = Counter()
+        # (signature id, condition ordinal) -> sampled seconds and sampled matches
+        self.condition_seconds: Counter = Counter()
+        self.condition_matches: Counter = Counter()
+        # Signature id -> (events, samples) counted before it was first loaded
+        self._since: Dict[str, Tuple[int, int]] = {}
+        self._until_sample = self.sample_interval
+        self._until_optimize = self.optimize_every
+        self._lock = threading.Lock()
+
+    def register(self, ids: Iterable[str]):
+        """Start the counters of newly loaded signatures from now."""
+        with self._lock:
+            for signature_id in ids:
+                self._since.setdefault(signature_id, (self.events, self.samples))
+
+    def record(self, events: int, evaluated: List[str], matched: List[str]) -> List[int]:
+        """Count a detection call, returning the offsets of its events to sample for timing."""
+        with self._lock:
+            self.events += events
+            self.evaluations.update(evaluated)
+            self.hits.update(matched)
+            offsets = []
+            position = self._until_sample - 1
+            while position < events:
+                offsets.append(position)
+                position += self.sample_interval
+            self._until_sample = position - events + 1
+        return offsets
+
+    def record_sample(self, shared_seconds: float, costs: Dict[Tuple[str, int], List]) -> bool:
+        """Add the condition costs of one sampled event, returning True when a re-optimization is due."""
+        with self._lock:
+            self.samples += 1
+            self.shared_seconds += shared_seconds
+            for key, (seconds, matched) in costs.items():
+                self.condition_seconds[key] += seconds
+                if matched:
+                    self.condition_matches[key] += 1
+            self._until_optimize -= 1
+            if self._until_optimize > 0:
+                return False
+            self._until_optimize = self.optimize_every
+            return True
+
+    def plan(self, ids: List[str]) -> DeferralPlan:
+        """Scanned conditions costing at least defer_min_us per event, with their cost and match ratio."""
+        numbers = {signature_id: number for number, signature_id in enumerate(ids)}
+        plan: DeferralPlan = {}
+        with self._lock:
+            for (signature_id, ordinal), seconds in self.condition_seconds.items():
+                number = numbers.get(signature_id)
+                samples = self.samples - self._since.get(signature_id, (0, 0))[1]
+                if number is None or samples <= 0:
+                    continue
+                cost_us = seconds / samples * 1e6
+                if cost_us >= self.defer_min_us:
+                    ratio = self.condition_matches[(signature_id, ordinal)] / samples
+                    plan.setdefault(number, {})[ordinal] = (cost_us, ratio)
+        return plan
+
+    def report(self, ids: List[str], signatures: List[Dict], deferred: Set[Tuple[str, int]],
+               limit: Optional[int] = None) -> Dict:
+        """Counters and flags for the given signatures, costliest first, with the dead, slow and noisy ones listed."""
+        with self._lock:
+            events, samples = self.events, self.samples
+            shared_seconds = self.shared_seconds
+            condition_seconds = dict(self.condition_seconds)
+            since = dict(self._since)
+            evaluations, hits = dict(self.evaluations), dict(self.hits)
+        seconds_by_id: Counter = Counter()
+        for (signature_id, _), seconds in condition_seconds.items():
+            seconds_by_id[signature_id] += seconds
+        deferred_by_id = Counter(signature_id for signature_id, _ in deferred)
+        rows = []
+        flagged: Dict[str, List[str]] = {"dead": [], "slow": [], "noisy": []}
+        for signature_id, signature in zip(ids, signatures):
+            first_event, first_sample = since.get(signature_id, (0, 0))
+            seen, sampled = events - first_event, samples - first_sample
+            hit_count = hits.get(signature_id, 0)
+            hit_ratio = hit_count / seen if seen else 0.0
+            mean_us = seconds_by_id[signature_id] / sampled * 1e6 if sampled else 0.0
+            flags = []
+            if seen >= self.min_events and not hit_count:
+                flags.append("dead")
+            if sampled and mean_us >= self.slow_us:
+                flags.append("slow")
+            if seen >= self.min_events and hit_ratio >= self.noisy_ratio:
+                flags.append("noisy")
+            for flag in flags:
+                flagged[flag].append(signature_id)
+            rows.append({
+                "id": signature_id,
+                "type": signature.get("type"),
+                "events": seen,
+                "evaluations": evaluations.get(signature_id, 0),
+                "hits": hit_count,
+                "hit_ratio": hit_ratio,
+                "mean_us": mean_us,
+                # Sampled time scaled up to every event
+                "time_ms": seconds_by_id[signature_id] * self.sample_interval * 1000.0,
+                "deferred_conditions": deferred_by_id[signature_id],
+                "flags": flags
+            })
+        rows.sort(key=lambda row: (-row["time_ms"], -row["evaluations"]))
+        for flag, flagged_ids in flagged.items():
+            metrics.set_gauge(f"detection.signatures.{flag}", len(flagged_ids))
+        return {
+            "events": events,
+            "samples": samples,
+            "sample_interval": self.sample_interval,
+            "shared_lookup_ms": shared_seconds * self.sample_interval * 1000.0,
+            **flagged,
+            "signatures": rows[:limit] if limit is not None else rows
+        }
+
+if __name__ == "__main__":
+    profile = SignatureProfile(sample_interval=2, min_events=2)
+    profile.register(["a", "b"])
+    print(profile.record(3, ["a", "a", "b"], ["a"]))
+    profile.record_sample(0.00001, {("b", 0): [0.00002, False]})
+    print(profile.plan(["a", "b"]), profile.report(["a", "b"], [{"type": "x"}, {"type": "y"}], set()))
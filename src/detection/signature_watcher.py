@@ -0,0 +1,142 @@
+"""
+Signature Watcher for the Cybersecurity Threat Detection System.
+Watches rule files and directories and hot-reloads changed rules into a SignatureDetector in the background.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import yaml
+from .signature_compiler import SignatureCompileError
+from .signature_detector import SignatureDetector
+from ..utils.config_loader import get_config_value
+from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
+
+logger = get_logger()
+metrics = get_metrics()
+
+RULE_EXTENSIONS = (".json", ".jsonl", ".yaml", ".yml")
+
+def read_rule_file(path: str) -> List[Dict]:
+    """Signatures from a JSON list (or {"signatures": [...]}), JSON Lines or YAML rule file."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".jsonl"):
+            rules = [json.loads(line) for line in f if line.strip()]
+        elif path.lower().endswith((".yaml", ".yml")):
+            rules = yaml.safe_load(f) or []
+        else:
+            rules = json.load(f)
+    if isinstance(rules, dict):
+        rules = rules.get("signatures", [])
+    if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+        raise ValueError(f"{path} does not contain a list of signatures")
+    return rules
+
+class SignatureWatcher:
+    """Polls rule files for changes and loads each file as one signature source.
+
+    A change to any set of files is applied as a single new snapshot; a deleted file
+    drops its rules. Files that fail to parse are retried on the next poll, and a
+    rule set that fails to compile leaves the active snapshot untouched.
+    """
+
+    def __init__(self, detector: SignatureDetector, paths: Optional[List[str]] = None,
+                 interval_seconds: Optional[float] = None):
+        self.detector = detector
+        self.paths = list(paths if paths is not None else get_config_value("detection.signatures.rule_paths", []))
+        self.interval_seconds = interval_seconds or get_config_value("detection.signatures.reload_interval_seconds", 5)
+        # path -> (mtime_ns, size) of the version last applied
+        self._seen: Dict[str, Tuple[int, int]] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"polls": 0, "reloads": 0, "failures": 0, "files": 0}
+
+    def rule_files(self) -> List[str]:
+        """Rule files under the watched paths, in a stable order."""
+        files = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                    if name.lower().endswith(RULE_EXTENSIONS)))
+            elif os.path.exists(path):
+                files.append(path)
+        return files
+
+    def poll(self) -> bool:
+        """Check the rule files once and apply any changes, returning True if a new snapshot was published."""
+        self.stats["polls"] += 1
+        current = {}
+        for path in self.rule_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            current[path] = (stat.st_mtime_ns, stat.st_size)
+        updates: Dict[str, Optional[List[Dict]]] = {path: None for path in self._seen if path not in current}
+        for path, state in list(current.items()):
+            if self._seen.get(path) == state:
+                continue
+            try:
+                updates[path] = read_rule_file(path)
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                # Often a file caught mid-write; it is read again on the next poll
+                self._failed(f"Could not read rule file {path}: {str(e)}")
+                current.pop(path)
+        if not updates:
+            return False
+        try:
+            self.detector.load_sources(updates)
+        except SignatureCompileError as e:
+            self._failed(f"Rejected rule reload of {sorted(updates)}: {str(e)}")
+            # The same content would fail again; wait for the files to change
+            self._seen.update({path: state for path, state in current.items() if path in updates})
+            return False
+        for path in updates:
+            if path in current:
+                self._seen[path] = current[path]
+            else:
+                self._seen.pop(path, None)
+        self.stats["reloads"] += 1
+        self.stats["files"] = len(self._seen)
+        metrics.increment("detection.signatures.reloads")
+        logger.info(f"Reloaded rules from {len(updates)} files; signatures at version {self.detector.version}.")
+        return True
+
+    def _failed(self, message: str):
+        self.stats["failures"] += 1
+        metrics.increment("detection.signatures.reload_failures")
+        logger.error(message)
+
+    def start(self):
+        """Load the rule files now, then keep polling them on a background thread."""
+        self.poll()
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="signature-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.poll()
+            except Exception as e:
+                self._failed(f"Signature watcher poll failed: {str(e)}")
+
+if __name__ == "__main__":
+    import tempfile
+    detector = SignatureDetector()
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "web.json"), "w") as f:
+            json.dump([{"id": "web-1", "type": "sql_injection", "field": "url", "pattern": "union select",
+                        "risk_score": 85}], f)
+        watcher = SignatureWatcher(detector, [directory])
+        print(watcher.poll(), detector.detect({"url": "/q?id=1 union select"}), watcher.stats)
@@ -0,0 +1,213 @@
+"""
+Streaming Anomaly Model for the Cybersecurity Threat Detection System.
+Half-space trees that score and learn event by event over sliding count windows with fixed memory.
+"""
+
+import threading
+from typing import Dict, Optional
+import numpy as np
+from ..utils.config_loader import get_config_value
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+# Smallest work-range width (in log space) for a feature that was constant while the trees were built
+MIN_WIDTH = 1.0
+# Nodes holding less than this fraction of a window stop the scoring walk (the paper's size limit)
+SIZE_LIMIT_FRACTION = 0.1
+# Rows per walk; larger chunks spill the (depth x rows x trees) path array out of cache
+CHUNK_ROWS = 1024
+
+class StreamingAnomalyModel:
+    """Half-space trees (Tan et al., 2011) with reference and latest mass profiles.
+
+    The first window of events fixes the feature work ranges and the random tree
+    structure. After that every event is scored against the reference masses of
+    the last complete window while being counted into the latest masses. When a
+    window fills, the latest masses become the reference in a single assignment.
+    Scoring never waits for updates, and the tree structure never changes.
+    """
+
+    def __init__(self, n_trees: Optional[int] = None, depth: Optional[int] = None,
+                 window_size: Optional[int] = None, contamination: Optional[float] = None,
+                 random_state: Optional[int] = None):
+        self.n_trees = n_trees or get_config_value("detection.anomaly.streaming.trees", 25)
+        self.depth = depth or get_config_value("detection.anomaly.streaming.depth", 10)
+        self.window_size = window_size or get_config_value("detection.anomaly.streaming.window_size", 1000)
+        self.contamination = contamination if contamination is not None else \
+            get_config_value("detection.anomaly.streaming.contamination", 0.1)
+        self.size_limit = SIZE_LIMIT_FRACTION * self.window_size
+        self._nodes = 2 ** (self.depth + 1) - 1
+        self._rng = np.random.RandomState(random_state)
+        self._feature: Optional[np.ndarray] = None
+        self._split: Optional[np.ndarray] = None
+        self._latest: Optional[np.ndarray] = None
+        # (reference masses, score threshold); replaced as a whole so readers never see half a window
+        self._scoring: Optional[tuple] = None
+        # Rows of the current window, kept to set the next threshold (and to build the trees during warm-up)
+        self._window_rows: Optional[np.ndarray] = None
+        self._window_count = 0
+        self._lock = threading.Lock()
+        self.events_seen = 0
+        self.windows_completed = 0
+
+    @property
+    def is_ready(self) -> bool:
+        """True once the warm-up window has been seen and events are being scored."""
+        return self._scoring is not None
+
+    @staticmethod
+    def _transform(X) -> np.ndarray:
+        # Sizes and ports span several orders of magnitude; halving log-scaled ranges keeps splits meaningful
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return np.sign(X) * np.log1p(np.abs(X))
+
+    def _build(self, sample: np.ndarray):
+        trees, features = self.n_trees, sample.shape[1]
+        low = sample.min(axis=0)
+        width = np.maximum(sample.max(axis=0) - low, MIN_WIDTH)
+        # Each tree gets a random work range that covers the sample (section 3.1 of the paper)
+        centre = low + self._rng.random_sample((trees, features)) * width
+        radius = 2.0 * np.maximum(centre - low, low + width - centre)
+        level_low, level_high = (centre - radius)[:, np.newaxis, :], (centre + radius)[:, np.newaxis, :]
+        feature = np.zeros((trees, self._nodes), dtype=np.int64)
+        split = np.zeros((trees, self._nodes))
+        for level in range(self.depth):
+            count = 2 ** level
+            tree_index, node_index = np.ogrid[:trees, :count]
+            chosen = self._rng.randint(features, size=(trees, count))
+            middle = (level_low[tree_index, node_index, chosen] + level_high[tree_index, node_index, chosen]) / 2.0
+            feature[:, count - 1:2 * count - 1] = chosen
+            split[:, count - 1:2 * count - 1] = middle
+            left_high, right_low = level_high.copy(), level_low.copy()
+            left_high[tree_index, node_index, chosen] = middle
+            right_low[tree_index, node_index, chosen] = middle
+            level_low = np.stack([level_low, right_low], axis=2).reshape(trees, 2 * count, features)
+            level_high = np.stack([left_high, level_high], axis=2).reshape(trees, 2 * count, features)
+        self._feature = feature.ravel()
+        self._split = split.ravel()
+        self._latest = np.zeros(trees * self._nodes)
+
+    def _paths(self, X: np.ndarray) -> np.ndarray:
+        """Flat node ids visited by every (row, tree) walker, shaped (depth + 1, rows * trees)."""
+        rows, trees = len(X), self.n_trees
+        values = np.ascontiguousarray(X).ravel()
+        tree_base = np.tile(np.arange(trees, dtype=np.int64) * self._nodes, rows)
+        row_base = np.repeat(np.arange(rows, dtype=np.int64) * X.shape[1], trees)
+        local = np.zeros(rows * trees, dtype=np.int64)
+        paths = np.empty((self.depth + 1, rows * trees), dtype=np.int64)
+        paths[0] = tree_base
+        for level in range(self.depth):
+            node = paths[level]
+            local = 2 * local + 1 + (values[row_base + self._feature[node]] >= self._split[node])
+            paths[level + 1] = tree_base + local
+        return paths
+
+    def _score_paths(self, paths: np.ndarray, reference: np.ndarray) -> np.ndarray:
+        # Each walk stops at the first node whose reference mass is at most the size limit, or at a leaf
+        mass = reference[paths]
+        stop = mass <= self.size_limit
+        stop[-1] = True
+        depth = stop.argmax(axis=0)
+        walker_score = mass[depth, np.arange(paths.shape[1])] * np.exp2(depth)
+        return walker_score.reshape(-1, self.n_trees).sum(axis=1) / (self.n_trees * self.window_size)
+
+    def score_samples(self, X) -> np.ndarray:
+        """Mass score of each row against the reference window; lower is more anomalous."""
+        scoring = self._scoring
+        if scoring is None:
+            raise ValueError("Streaming anomaly model is still warming up")
+        return self._score_paths(self._paths(self._transform(X)), scoring[0])
+
+    def predict(self, X) -> np.ndarray:
+        """1 for normal rows and -1 for anomalies, like IsolationForest; all 1 during warm-up."""
+        X = self._transform(X)
+        scoring = self._scoring
+        if scoring is None:
+            return np.ones(len(X), dtype=np.int64)
+        return np.where(self._score_paths(self._paths(X), scoring[0]) < scoring[1], -1, 1)
+
+    def update(self, X):
+        """Learn rows without scoring them."""
+        X = self._transform(X)
+        with self._lock:
+            self._learn(X, None)
+
+    def process(self, X) -> np.ndarray:
+        """Score rows against the reference window, then learn them; returns predict()-style labels."""
+        X = self._transform(X)
+        if len(X) <= CHUNK_ROWS:
+            return self._process(X)
+        return np.concatenate([self._process(X[start:start + CHUNK_ROWS]) for start in range(0, len(X), CHUNK_ROWS)])
+
+    def _process(self, X: np.ndarray) -> np.ndarray:
+        scoring = self._scoring
+        paths = None
+        if scoring is None:
+            predictions = np.ones(len(X), dtype=np.int64)
+        else:
+            paths = self._paths(X)
+            predictions = np.where(self._score_paths(paths, scoring[0]) < scoring[1], -1, 1)
+        with self._lock:
+            self._learn(X, paths)
+        return predictions
+
+    def _learn(self, X: np.ndarray, paths: Optional[np.ndarray]):
+        if self._window_rows is None:
+            self._window_rows = np.empty((self.window_size, X.shape[1]))
+        start = 0
+        while start < len(X):
+            take = min(len(X) - start, self.window_size - self._window_count)
+            chunk = X[start:start + take]
+            if self.is_ready:
+                chunk_paths = paths[:, start * self.n_trees:(start + take) * self.n_trees] \
+                    if paths is not None else self._paths(chunk)
+                self._latest += np.bincount(chunk_paths.ravel(), minlength=len(self._latest))
+            self._window_rows[self._window_count:self._window_count + take] = chunk
+            self._window_count += take
+            self.events_seen += take
+            start += take
+            if self._window_count == self.window_size:
+                self._end_window()
+
+    def _end_window(self):
+        if self._feature is None:
+            self._build(self._window_rows)
+            window_paths = self._paths(self._window_rows)
+            self._latest += np.bincount(window_paths.ravel(), minlength=len(self._latest))
+        else:
+            window_paths = self._paths(self._window_rows)
+        # The threshold is the contamination quantile of the window's own rows against its own masses
+        threshold = float(np.quantile(self._score_paths(window_paths, self._latest), self.contamination))
+        self._scoring = (self._latest, threshold)
+        self._latest = np.zeros(len(self._latest))
+        self._window_count = 0
+        self.windows_completed += 1
+        logger.debug(f"Streaming anomaly window {self.windows_completed} complete; threshold {threshold:.4f}")
+
+    def memory_bytes(self) -> int:
+        """Size of the trees, both mass profiles and the window buffer; fixed once warm-up ends."""
+        arrays = [self._feature, self._split, self._latest, self._window_rows]
+        if self._scoring is not None:
+            arrays.append(self._scoring[0])
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def stats(self) -> Dict:
+        """Events seen, completed windows, the current threshold and memory use."""
+        scoring = self._scoring
+        return {
+            "ready": scoring is not None,
+            "events_seen": self.events_seen,
+            "windows_completed": self.windows_completed,
+            "window_size": self.window_size,
+            "threshold": scoring[1] if scoring is not None else None,
+            "memory_bytes": self.memory_bytes()
+        }
+
+if __name__ == "__main__":
+    rng = np.random.RandomState(0)
+    model = StreamingAnomalyModel(window_size=500, random_state=0)
+    model.update(rng.normal(500, 50, size=(2000, 4)))
+    print(model.process(np.array([[500, 500, 500, 500], [50000, 3, 500, 9]])), model.stats())
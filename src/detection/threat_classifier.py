@@ -3,19 +3,34 @@ Threat Classifier for the Cybersecurity Threat Detection System.
 Classifies detected threats into specific categories with risk scores.
 """
 
-from typing import Dict, List
+import time
+from typing import Dict, Iterable, List, Optional, Union
 from sklearn.ensemble import RandomForestClassifier
 import numpy as np
-import pandas as pd
+from .flat_forest import SKLEARN_BATCH_ROWS, FlatForest
+from .model_store import ModelStore
+from .training_pipeline import PROTOCOL_CODES, REQUEST_TYPE_CODES, TrainingReport, load_training_set, peak_rss_mb
+from ..utils.config_loader import get_config_value
 from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
 
 logger = get_logger()
+metrics = get_metrics()
+
+MODEL_NAME = "classifier"
 
 class ThreatClassifier:
     """Classifies threats into specific categories with risk assessment."""
     
     def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100)
+        # Trees are built in parallel across all cores; the depth cap bounds model size on large training sets
+        self.model = RandomForestClassifier(
+            n_estimators=get_config_value("detection.ml_models.random_forest.n_estimators", 100),
+            max_depth=get_config_value("detection.ml_models.random_forest.max_depth", 10),
+            min_samples_split=get_config_value("detection.ml_models.random_forest.min_samples_split", 2),
+            n_jobs=get_config_value("detection.ml_models.random_forest.n_jobs", -1))
+        # Flattened copy of the trained forest used for prediction
+        self.flat_model = None
         self.is_trained = False
         self.threat_types = [
             "malware", "phishing", "brute_force", "anomaly",
@@ -26,12 +41,10 @@ class ThreatClassifier:
         logger.info("Threat Classifier initialized.")
     
     def protocol_to_int(self, protocol: str) -> int:
-        mapping = {"TCP": 1, "UDP": 2, "ICMP": 3, "HTTP": 4, "HTTPS": 5, "SSH": 6, "RDP": 7, "DNS": 8, "SMB": 9, "FTP": 10, "SMTP": 11, "Telnet": 12, "NetBIOS": 13}
-        return mapping.get(protocol.upper(), 0)
+        return PROTOCOL_CODES.get(protocol.upper(), 0)
     
     def request_type_to_int(self, request_type: str) -> int:
-        mapping = {"GET": 1, "POST": 2, "PUT": 3, "DELETE": 4}
-        return mapping.get(request_type.upper(), 0)
+        return REQUEST_TYPE_CODES.get(request_type.upper(), 0)
     
     def extract_features(self, threat: Dict) -> np.ndarray:
         """Extract features from threat data for classification."""
@@ -45,17 +58,26 @@ class ThreatClassifier:
         features.append(self.request_type_to_int(threat.get("request_type", "")))
         return np.array(features).reshape(1, -1)
     
-    def classify(self, threats: List[Dict]) -> List[Dict]:
-        """Classify threats into specific categories."""
+    def classify(self, threats: List[Dict], model: bool = True) -> List[Dict]:
+        """Classify threats into specific categories; model=False keeps each threat's own type."""
+        if not model:
+            return self._basic_classify(threats)
         if not self.is_trained:
             logger.warning("Threat classifier not trained yet. Using basic classification.")
             return self._basic_classify(threats)
         
+        if not threats:
+            return []
+        if len(threats) == 1:
+            predictions = [self.flat_model.predict_one(self.extract_features(threats[0]))]
+        else:
+            # One vectorized pass over all threats; both models predict identically
+            features = np.vstack([self.extract_features(threat) for threat in threats])
+            model = self.flat_model if len(threats) <= SKLEARN_BATCH_ROWS else self.model
+            predictions = model.predict(features)
         classified_threats = []
-        for threat in threats:
-            features = self.extract_features(threat)
-            prediction = self.model.predict(features)
-            threat_type = self.threat_types[prediction[0]]
+        for threat, prediction in zip(threats, predictions):
+            threat_type = self.threat_types[prediction]
             
             classified_threat = threat.copy()
             classified_threat["classified_type"] = threat_type
@@ -70,30 +92,52 @@ class ThreatClassifier:
             threat["classified_type"] = threat.get("type", "unknown")
         return threats
     
-    def train(self, dataset_path: str = "src/detection/threat_dataset.json"):
-        """Train the threat classification model using dataset JSON."""
+    def train(self, source: Union[str, Iterable[str], List[Dict]] = "src/detection/threat_dataset.json",
+              memory_budget_mb: Optional[float] = None, sampling: Optional[str] = None) -> Optional[TrainingReport]:
+        """Train the threat classification model from dataset shards (JSON, JSONL, CSV, Parquet) or records."""
         try:
-            import json
-            with open(dataset_path, 'r') as f:
-                data = json.load(f)
-            df = pd.DataFrame(data)
-            # Map threat_type to integer labels
+            start_time = time.perf_counter()
             label_map = {t: i for i, t in enumerate(self.threat_types)}
-            df['label'] = df['threat_type'].map(label_map)
-            
-            # Prepare features
-            X = df[['risk_score', 'has_http', 'description_length', 'protocol', 'port', 'payload_size', 'request_type']].copy()
-            # Convert protocol and request_type to int using mapping functions
-            X['protocol'] = X['protocol'].apply(self.protocol_to_int)
-            X['request_type'] = X['request_type'].apply(self.request_type_to_int)
-            y = df['label']
+            X, y, counts = load_training_set(source, label_map, memory_budget_mb, sampling)
+            read_seconds = time.perf_counter() - start_time
             
             self.model.fit(X, y)
+            self.flat_model = FlatForest.from_sklearn(self.model)
             self.is_trained = True
-            logger.info("Threat classification model trained with JSON dataset.")
+            wall_seconds = time.perf_counter() - start_time
+            report = TrainingReport(counts["rows_read"], counts["rows_used"], counts["rows_dropped"],
+                                    counts["sampling"], read_seconds, wall_seconds - read_seconds, wall_seconds,
+                                    counts["rows_read"] / wall_seconds, peak_rss_mb())
+            metrics.set_gauge("training.classifier.wall_seconds", wall_seconds)
+            metrics.set_gauge("training.classifier.rows_per_second", report.rows_per_second)
+            if report.peak_rss_mb is not None:
+                metrics.set_gauge("training.classifier.peak_rss_mb", report.peak_rss_mb)
+            peak = f"{report.peak_rss_mb:.0f} MB" if report.peak_rss_mb is not None else "unavailable"
+            logger.info(f"Threat classification model trained on {report.rows_used} of {report.rows_read} rows "
+                        f"(sampling: {report.sampling}) in {wall_seconds:.2f}s, {report.rows_per_second:.0f} rows/s, "
+                        f"peak RSS {peak}.")
+            return report
         except Exception as e:
             logger.error(f"Failed to train model: {e}")
             self.is_trained = False
+            return None
+
+    def save_to_store(self, store: ModelStore, metadata: Optional[Dict] = None) -> int:
+        """Store the trained model as a new version in a ModelStore."""
+        if not self.is_trained:
+            raise ValueError("Cannot store an untrained threat classifier")
+        metadata = dict(metadata or {}, threat_types=self.threat_types)
+        return store.save(MODEL_NAME, self.flat_model, self.model, metadata=metadata)
+
+    def load_from_store(self, store: ModelStore, version: Optional[int] = None) -> int:
+        """Switch to a stored model version (the newest by default), returning the version loaded."""
+        stored = store.load(MODEL_NAME, version)
+        self.threat_types = stored.manifest["metadata"].get("threat_types", self.threat_types)
+        self.flat_model = stored.forest
+        self.model = stored.estimator if stored.estimator is not None else stored.forest
+        self.is_trained = True
+        logger.info(f"Threat classifier version {stored.version} loaded.")
+        return stored.version
 
 if __name__ == "__main__":
     classifier = ThreatClassifier()
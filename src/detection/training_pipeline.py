@@ -0,0 +1,211 @@
+"""
+Training Pipeline for the Cybersecurity Threat Detection System.
+Streams labelled threat records from JSON, JSONL, CSV or Parquet shards into a bounded, optionally sampled training set.
+"""
+
+import glob
+import json
+import os
+import sys
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from ..utils.config_loader import get_config_value
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+FEATURE_COLUMNS = ["risk_score", "has_http", "description_length", "protocol", "port", "payload_size", "request_type"]
+LABEL_COLUMN = "threat_type"
+PROTOCOL_CODES = {"TCP": 1, "UDP": 2, "ICMP": 3, "HTTP": 4, "HTTPS": 5, "SSH": 6, "RDP": 7, "DNS": 8, "SMB": 9,
+                  "FTP": 10, "SMTP": 11, "Telnet": 12, "NetBIOS": 13}
+REQUEST_TYPE_CODES = {"GET": 1, "POST": 2, "PUT": 3, "DELETE": 4}
+SHARD_EXTENSIONS = (".jsonl", ".json", ".csv", ".parquet")
+# Bytes a sampled row occupies: float32 features plus an int32 label
+ROW_BYTES = 4 * len(FEATURE_COLUMNS) + 4
+
+TrainingReport = namedtuple("TrainingReport", ["rows_read", "rows_used", "rows_dropped", "sampling", "read_seconds",
+                                               "fit_seconds", "wall_seconds", "rows_per_second", "peak_rss_mb"])
+
+def shard_paths(source: Union[str, Iterable[str]]) -> List[str]:
+    """Expand a file, directory, glob pattern or list of them into shard files in a stable order."""
+    if not isinstance(source, str):
+        return [path for item in source for path in shard_paths(item)]
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.lower().endswith(SHARD_EXTENSIONS))
+    if glob.has_magic(source):
+        return sorted(glob.glob(source))
+    return [source]
+
+def iter_record_chunks(paths: List[str], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Yield DataFrames of at most chunk_rows records from each shard in turn."""
+    for path in paths:
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".jsonl":
+            with pd.read_json(path, lines=True, chunksize=chunk_rows, dtype=False) as reader:
+                yield from reader
+        elif extension == ".csv":
+            yield from pd.read_csv(path, chunksize=chunk_rows)
+        elif extension == ".parquet":
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+        else:
+            # A JSON array cannot be streamed; it is read whole and then chunked like the other formats
+            with open(path, "r") as f:
+                records = json.load(f)
+            for start in range(0, len(records), chunk_rows):
+                yield pd.DataFrame.from_records(records[start:start + chunk_rows])
+
+def _codes(column: pd.Series, mapping: Dict[str, int]) -> np.ndarray:
+    # Same lookup as ThreatClassifier.protocol_to_int: upper-cased value against the mapping, else 0
+    return column.astype(str).str.upper().map(mapping).fillna(0).to_numpy(dtype=np.float32)
+
+def encode_chunk(frame: pd.DataFrame, labels: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Encode a chunk column by column into (features, labels, dropped rows); unlabelled rows are dropped."""
+    label = frame[LABEL_COLUMN].map(labels) if LABEL_COLUMN in frame else pd.Series(np.nan, index=frame.index)
+    keep = label.notna().to_numpy()
+    frame = frame[keep]
+    X = np.zeros((len(frame), len(FEATURE_COLUMNS)), dtype=np.float32)
+    for position, column in enumerate(FEATURE_COLUMNS):
+        if column not in frame:
+            continue
+        if column == "protocol":
+            X[:, position] = _codes(frame[column], PROTOCOL_CODES)
+        elif column == "request_type":
+            X[:, position] = _codes(frame[column], REQUEST_TYPE_CODES)
+        else:
+            X[:, position] = pd.to_numeric(frame[column], errors="coerce").fillna(0).to_numpy(dtype=np.float32)
+    return X, label[keep].to_numpy(dtype=np.int32), int((~keep).sum())
+
+class ReservoirSample:
+    """Uniform sample of at most capacity rows (Algorithm R, applied a chunk at a time).
+
+    Storage grows with the rows kept, so a dataset under the cap costs only its own
+    size and comes back whole and in input order.
+    """
+
+    def __init__(self, capacity: int, n_features: int, rng: np.random.RandomState):
+        self.capacity = capacity
+        self.seen = 0
+        self.size = 0
+        self.X = np.empty((0, n_features), dtype=np.float32)
+        self.y = np.empty(0, dtype=np.int32)
+        self._rng = rng
+
+    def _grow(self, needed: int):
+        if needed <= len(self.y):
+            return
+        rows = min(self.capacity, max(needed, 2 * len(self.y)))
+        X = np.empty((rows, self.X.shape[1]), dtype=np.float32)
+        y = np.empty(rows, dtype=np.int32)
+        X[:self.size], y[:self.size] = self.X[:self.size], self.y[:self.size]
+        self.X, self.y = X, y
+
+    def add(self, X: np.ndarray, y: np.ndarray):
+        """Offer a chunk of rows to the sample."""
+        fill = min(len(y), self.capacity - self.size)
+        if fill > 0:
+            self._grow(self.size + fill)
+            self.X[self.size:self.size + fill] = X[:fill]
+            self.y[self.size:self.size + fill] = y[:fill]
+            self.size += fill
+            self.seen += fill
+            X, y = X[fill:], y[fill:]
+        if not len(y):
+            return
+        # Row k of the stream replaces a random slot with probability capacity / k
+        slots = (self._rng.random_sample(len(y)) * (self.seen + np.arange(1, len(y) + 1))).astype(np.int64)
+        accepted = np.flatnonzero(slots < self.capacity)[::-1]
+        # Later rows landing on the same slot win, as they would one at a time
+        _, last = np.unique(slots[accepted], return_index=True)
+        accepted = accepted[last]
+        self.X[slots[accepted]] = X[accepted]
+        self.y[slots[accepted]] = y[accepted]
+        self.seen += len(y)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The sampled rows and labels."""
+        return self.X[:self.size], self.y[:self.size]
+
+class StratifiedSample:
+    """One reservoir per label with an equal share of the capacity, so rare threat types are kept whole."""
+
+    def __init__(self, capacity: int, n_features: int, n_labels: int, rng: np.random.RandomState):
+        self.per_label = max(1, capacity // n_labels)
+        self.n_features = n_features
+        self.reservoirs: Dict[int, ReservoirSample] = {}
+        self._rng = rng
+
+    @property
+    def seen(self) -> int:
+        return sum(reservoir.seen for reservoir in self.reservoirs.values())
+
+    def add(self, X: np.ndarray, y: np.ndarray):
+        """Offer a chunk of rows to the sample."""
+        for label in np.unique(y):
+            if label not in self.reservoirs:
+                self.reservoirs[label] = ReservoirSample(self.per_label, self.n_features, self._rng)
+            mask = y == label
+            self.reservoirs[label].add(X[mask], y[mask])
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The sampled rows and labels, grouped by label."""
+        if not self.reservoirs:
+            return np.empty((0, self.n_features), dtype=np.float32), np.empty(0, dtype=np.int32)
+        parts = [self.reservoirs[label].arrays() for label in sorted(self.reservoirs)]
+        return np.concatenate([X for X, _ in parts]), np.concatenate([y for _, y in parts])
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, or None where the platform does not report it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+def load_training_set(source: Union[str, Iterable[str], List[Dict]], labels: Dict[str, int],
+                      memory_budget_mb: Optional[float] = None, sampling: Optional[str] = None,
+                      chunk_rows: Optional[int] = None, seed: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    """Read and encode every chunk of a source into at most memory_budget_mb of training rows.
+
+    The source is a path, glob, directory or list of paths, or a list of record
+    dicts. Rows beyond the budget are sampled by reservoir (uniform) or
+    stratified (equal per-label) sampling.
+    """
+    memory_budget_mb = memory_budget_mb or get_config_value("detection.ml_models.training.memory_budget_mb", 512)
+    sampling = sampling or get_config_value("detection.ml_models.training.sampling", "reservoir")
+    chunk_rows = chunk_rows or get_config_value("detection.ml_models.training.chunk_rows", 100000)
+    capacity = max(1, int(memory_budget_mb * 1024 * 1024) // ROW_BYTES)
+    rng = np.random.RandomState(seed)
+    if sampling == "stratified":
+        sample = StratifiedSample(capacity, len(FEATURE_COLUMNS), len(labels), rng)
+    elif sampling == "reservoir":
+        sample = ReservoirSample(capacity, len(FEATURE_COLUMNS), rng)
+    else:
+        raise ValueError(f"Unknown sampling method: {sampling}")
+
+    if isinstance(source, list) and source and isinstance(source[0], dict):
+        chunks = (pd.DataFrame.from_records(source[start:start + chunk_rows])
+                  for start in range(0, len(source), chunk_rows))
+    else:
+        chunks = iter_record_chunks(shard_paths(source), chunk_rows)
+    dropped = 0
+    for frame in chunks:
+        X, y, chunk_dropped = encode_chunk(frame, labels)
+        sample.add(X, y)
+        dropped += chunk_dropped
+    X, y = sample.arrays()
+    if not len(y):
+        raise ValueError("No labelled training rows found")
+    return X, y, {"rows_read": sample.seen + dropped, "rows_used": len(y), "rows_dropped": dropped,
+                  "sampling": sampling if len(y) < sample.seen else "none"}
+
+if __name__ == "__main__":
+    X, y, counts = load_training_set("src/detection/threat_dataset.json",
+                                     {"malware": 0, "phishing": 1, "brute_force": 2})
+    print(X.shape, y, counts)
@@ -0,0 +1,255 @@
+"""
+Window Detector for the Cybersecurity Threat Detection System.
+Keeps per-source and per-destination counters in time-bucketed rings to catch port scans, brute force and floods.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+from ..utils.config_loader import get_config_value
+from ..utils.event_batch import EventBatch
+from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
+
+logger = get_logger()
+metrics = get_metrics()
+
+AUTH_FAILURE_EVENTS = frozenset(["failed login"])
+AUTH_FAILURE_STATUS = frozenset([401])
+
+class WindowRecord:
+    """Two series for one key, allocated on first use, plus the epoch of the newest bucket.
+
+    Series are bucket rings (lists), except a source's destination ports: the epoch each
+    port was last seen, as one (port, epoch) pair until a second port arrives, then a dict.
+    """
+
+    __slots__ = ("epoch", "first", "second", "alerted")
+
+    def __init__(self, epoch: int):
+        self.epoch = epoch
+        self.first: Optional[List] = None
+        self.second: Optional[List] = None
+        # Epoch of the last alert per series, so a key alerts at most once per window for each condition
+        self.alerted = [None, None]
+
+class WindowTable:
+    """Bounded LRU map of keys to WindowRecords; the least recently seen key is evicted at the cap."""
+
+    def __init__(self, max_keys: int, buckets: int):
+        self.max_keys = max_keys
+        self.buckets = buckets
+        self.records: "OrderedDict[str, WindowRecord]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def record(self, key: str, epoch: int) -> Optional[WindowRecord]:
+        """The key's record rolled forward to epoch, or None if epoch has already left the window."""
+        record = self.records.get(key)
+        if record is None:
+            if len(self.records) >= self.max_keys:
+                self.records.popitem(last=False)
+                self.evictions += 1
+            record = WindowRecord(epoch)
+            self.records[key] = record
+            return record
+        self.records.move_to_end(key)
+        elapsed = epoch - record.epoch
+        if elapsed > 0:
+            # Clear the buckets the clock moved past; at most one pass over the ring
+            for series in (record.first, record.second):
+                if isinstance(series, list):
+                    if elapsed >= self.buckets:
+                        series[:] = [0] * self.buckets
+                    else:
+                        for step in range(1, elapsed + 1):
+                            series[(record.epoch + step) % self.buckets] = 0
+            record.epoch = epoch
+        elif elapsed <= -self.buckets:
+            return None
+        return record
+
+class WindowDetector:
+    """Detects port scans and brute force per source, and SYN and volume floods per destination.
+
+    Each key keeps one counter per time bucket in a ring covering window_seconds;
+    updating and evaluating a key costs at most one pass over its ring.
+    """
+
+    def __init__(self, window_seconds: Optional[float] = None, buckets: Optional[int] = None,
+                 max_keys: Optional[int] = None, thresholds: Optional[Dict[str, float]] = None):
+        self.window_seconds = window_seconds or get_config_value("detection.windows.window_seconds", 60)
+        self.buckets = buckets or get_config_value("detection.windows.buckets", 6)
+        self.bucket_seconds = self.window_seconds / self.buckets
+        max_keys = max_keys or get_config_value("detection.windows.max_keys", 1000000)
+        self.thresholds = {
+            "distinct_ports": get_config_value("detection.windows.thresholds.distinct_ports", 100),
+            "failed_auths": get_config_value("detection.windows.thresholds.failed_auths", 10),
+            "syn_per_second": get_config_value("detection.windows.thresholds.syn_per_second", 200),
+            "bytes_per_second": get_config_value("detection.windows.thresholds.bytes_per_second", 12500000),
+        }
+        self.thresholds.update(thresholds or {})
+        # first series: destination ports last seen / SYN counts; second: failed authentications / bytes
+        self.sources = WindowTable(max_keys, self.buckets)
+        self.destinations = WindowTable(max_keys, self.buckets)
+        self._lock = threading.Lock()
+        logger.info(f"Window Detector initialized: {self.window_seconds}s windows in {self.buckets} buckets, "
+                    f"up to {max_keys} keys per table.")
+
+    def detect(self, data: Dict) -> List[Dict]:
+        """Account one event and return any window thresholds it crosses."""
+        with self._lock:
+            return self._detect_event(data)
+
+    def _detect_event(self, data: Dict) -> List[Dict]:
+        failed = data.get("event") in AUTH_FAILURE_EVENTS or data.get("status") in AUTH_FAILURE_STATUS
+        return self._update(data.get("timestamp"), data.get("source_ip"), data.get("destination_ip"),
+                            data.get("destination_port"), data.get("tcp_flags"), data.get("length"), failed)
+
+    def detect_batch(self, batch: EventBatch) -> List[List[Dict]]:
+        """Account every row of an EventBatch in order, one threat list per row."""
+        results: List[List[Dict]] = [[] for _ in range(len(batch))]
+        if not len(batch):
+            return results
+        columns = batch.columns
+        # Column values are converted to Python objects once; the per-row loop then avoids NumPy scalars
+        timestamps = columns["timestamp"].tolist()
+        sources = batch.string_column("source_ip").tolist()
+        destinations = batch.string_column("destination_ip").tolist()
+        ports = columns["destination_port"].tolist()
+        flags = batch.string_column("tcp_flags").tolist()
+        lengths = columns["length"].tolist()
+        extras = batch.extras
+        with self._lock:
+            for row in range(len(batch)):
+                if extras[row]:
+                    # Log fields such as "event" and values that did not fit a column live in extras
+                    threats = self._detect_event(batch.event(row))
+                else:
+                    timestamp = timestamps[row]
+                    threats = self._update(None if timestamp != timestamp else timestamp, sources[row],
+                                           destinations[row], ports[row] if ports[row] >= 0 else None,
+                                           flags[row], lengths[row] if lengths[row] >= 0 else None, False)
+                if threats:
+                    results[row] = threats
+        return results
+
+    def _update(self, timestamp: Any, source: Any, destination: Any, port: Any, flags: Any, length: Any,
+                failed: bool) -> List[Dict]:
+        try:
+            epoch = int(float(timestamp) // self.bucket_seconds)
+        except (TypeError, ValueError, OverflowError):
+            epoch = int(time.time() // self.bucket_seconds)
+        threats = []
+        buckets = self.buckets
+        slot = epoch % buckets
+        if isinstance(source, str) and (isinstance(port, int) or failed):
+            record = self.sources.record(source, epoch)
+            if record is not None:
+                if isinstance(port, int) and not isinstance(port, bool):
+                    ports = self._count_port(record, port, epoch)
+                    if ports >= self.thresholds["distinct_ports"]:
+                        threats.extend(self._alert(record, 0, epoch, "port_scan", 70, source, "distinct_ports",
+                                                   ports, f"{source} contacted {ports} distinct ports"))
+                if failed:
+                    if record.second is None:
+                        record.second = [0] * buckets
+                    record.second[slot] += 1
+                    attempts = sum(record.second)
+                    if attempts >= self.thresholds["failed_auths"]:
+                        threats.extend(self._alert(record, 1, epoch, "brute_force", 80, source, "failed_auths",
+                                                   attempts, f"{attempts} failed logins from {source}"))
+        if isinstance(destination, str):
+            syn = isinstance(flags, str) and "S" in flags and "A" not in flags
+            if not isinstance(length, (int, float)) or isinstance(length, bool) or not length >= 0:
+                length = 0
+            if syn or length:
+                record = self.destinations.record(destination, epoch)
+                if record is not None:
+                    if syn:
+                        if record.first is None:
+                            record.first = [0] * buckets
+                        record.first[slot] += 1
+                        rate = sum(record.first) / self.window_seconds
+                        if rate >= self.thresholds["syn_per_second"]:
+                            threats.extend(self._alert(record, 0, epoch, "ddos", 85, destination, "syn_per_second",
+                                                       rate, f"SYN flood to {destination}: {rate:.0f} SYN/s"))
+                    if length:
+                        if record.second is None:
+                            record.second = [0] * buckets
+                        record.second[slot] += length
+                        rate = sum(record.second) / self.window_seconds
+                        if rate >= self.thresholds["bytes_per_second"]:
+                            threats.extend(self._alert(record, 1, epoch, "ddos", 85, destination, "bytes_per_second",
+                                                       rate, f"Traffic flood to {destination}: {rate:.0f} bytes/s"))
+        return threats
+
+    def _count_port(self, record: WindowRecord, port: int, epoch: int) -> int:
+        """Note a destination port, returning the distinct ports in the window if it was new to it, else 0.
+
+        Counts are exact up to the distinct_ports threshold; past it, new ports are not
+        stored, which bounds a scanner's memory at the threshold.
+        """
+        oldest = record.epoch - self.buckets + 1
+        seen: Union[None, Tuple[int, int], Dict[int, int]] = record.first
+        if seen is None or (isinstance(seen, tuple) and (seen[0] == port or seen[1] < oldest)):
+            new = seen is None or seen[0] != port or seen[1] < oldest
+            record.first = (port, epoch if seen is None or seen[0] != port else max(seen[1], epoch))
+            return 1 if new else 0
+        if isinstance(seen, tuple):
+            seen = record.first = {seen[0]: seen[1]}
+        last = seen.get(port)
+        if last is not None and last >= oldest:
+            seen[port] = max(last, epoch)
+            return 0
+        limit = self.thresholds["distinct_ports"]
+        if len(seen) + 1 >= limit:
+            # Stale ports are only dropped once they could make the count reach the threshold
+            for stale in [stale for stale, last_epoch in seen.items() if last_epoch < oldest]:
+                del seen[stale]
+        if len(seen) < limit:
+            seen[port] = epoch
+            return len(seen)
+        return len(seen) + 1
+
+    def _alert(self, record: WindowRecord, series: int, epoch: int, threat_type: str, risk_score: int, key: str,
+               metric: str, value: float, description: str) -> List[Dict]:
+        last = record.alerted[series]
+        if last is not None and epoch - last < self.buckets:
+            return []
+        record.alerted[series] = epoch
+        threat = {
+            "type": threat_type,
+            "risk_score": risk_score,
+            "confidence": "high",
+            "description": description,
+            "key": key,
+            "metric": metric,
+            "value": value,
+            "threshold": self.thresholds[metric]
+        }
+        metrics.increment(f"detection.window.{metric}")
+        logger.info(f"Window threat detected: {threat}")
+        return [threat]
+
+    def stats(self) -> Dict:
+        """Tracked keys and evictions per table."""
+        return {
+            "sources": len(self.sources),
+            "destinations": len(self.destinations),
+            "max_keys": self.sources.max_keys,
+            "source_evictions": self.sources.evictions,
+            "destination_evictions": self.destinations.evictions
+        }
+
+if __name__ == "__main__":
+    detector = WindowDetector()
+    for port in range(1, 200):
+        threats = detector.detect({"timestamp": 1000.0 + port / 100, "source_ip": "198.51.100.7",
+                                   "destination_ip": "10.0.0.5", "destination_port": port, "tcp_flags": "S"})
+        if threats:
+            print(port, threats)
+    print(detector.stats())
@@ -0,0 +1,147 @@
+"""
+Capture Manager for the Cybersecurity Threat Detection System.
+Runs one capture process per interface worker with BPF filters pushed into the kernel.
+"""
+
+import ipaddress
+import multiprocessing
+import signal
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional
+from ..utils.config_loader import get_config_value
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+CaptureSpec = namedtuple("CaptureSpec", ["interface", "bpf_filter", "workers"])
+
+def load_capture_specs(interfaces: Optional[List[Dict]] = None) -> List[CaptureSpec]:
+    """Build capture specs from the ingestion.capture.interfaces config section."""
+    if interfaces is None:
+        interfaces = get_config_value("ingestion.capture.interfaces", [{"name": None}])
+    specs = []
+    for entry in interfaces:
+        workers = int(entry.get("workers", 1))
+        if workers < 1:
+            raise ValueError(f"Capture interface {entry.get('name')} needs at least one worker")
+        specs.append(CaptureSpec(entry.get("name"), entry.get("filter") or None, workers))
+    return specs
+
+def flow_hash_filter(worker_index: int, workers: int) -> Optional[str]:
+    """BPF expression selecting one worker's share of flows.
+
+    The hash adds source and destination addresses, so both directions of a
+    flow land on the same worker. Non-IP traffic goes to worker 0.
+    """
+    if workers <= 1:
+        return None
+    clauses = [
+        f"(ip and (ip[12:4] + ip[16:4]) % {workers} = {worker_index})",
+        f"(ip6 and (ip6[20:4] + ip6[36:4]) % {workers} = {worker_index})",
+    ]
+    if worker_index == 0:
+        clauses.append("not (ip or ip6)")
+    return " or ".join(clauses)
+
+def flow_worker(source_ip: str, destination_ip: str, workers: int) -> int:
+    """Worker index the flow hash filter assigns to an address pair."""
+    total = 0
+    for address in (source_ip, destination_ip):
+        # Same 32-bit words the BPF expression loads: the whole IPv4 address, the last word of IPv6
+        total += int(ipaddress.ip_address(address)) & 0xFFFFFFFF
+    return (total & 0xFFFFFFFF) % workers
+
+def worker_filter(spec: CaptureSpec, worker_index: int) -> Optional[str]:
+    """Combine an interface's configured filter with the worker's flow hash share."""
+    parts = [f"({part})" for part in (spec.bpf_filter, flow_hash_filter(worker_index, spec.workers)) if part]
+    return " and ".join(parts) or None
+
+def compile_bpf(expression: str, interface: Optional[str] = None):
+    """Compile a BPF expression with libpcap, raising ValueError if it is invalid."""
+    from scapy.arch.common import compile_filter
+    try:
+        return compile_filter(expression, iface=interface)
+    except ImportError:
+        # libpcap missing is an environment problem, not a bad filter
+        raise
+    except Exception as e:
+        raise ValueError(f"Invalid BPF filter {expression!r}: {str(e)}")
+
+def capture_worker(spec: CaptureSpec, worker_index: int, kafka_topic: str, bpf_filter: Optional[str]):
+    """Capture one interface's share of traffic into Kafka (runs in a child process)."""
+    from .packet_ingestor import PacketIngestor
+    ingestor = PacketIngestor(kafka_topic=kafka_topic)
+    # Terminating the process stops sniffing cleanly so buffered packets are flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: ingestor.stop_capture())
+    try:
+        ingestor.start_live_capture(interface=spec.interface, bpf_filter=bpf_filter)
+    finally:
+        ingestor.close()
+
+class CaptureManager:
+    """Starts and supervises capture worker processes for every configured interface."""
+
+    def __init__(self, kafka_topic: str, specs: Optional[List[CaptureSpec]] = None,
+                 target: Callable = capture_worker, validate_filters: bool = True):
+        self.kafka_topic = kafka_topic
+        self.specs = specs if specs is not None else load_capture_specs()
+        self.target = target
+        self.validate_filters = validate_filters
+        self.processes: List[multiprocessing.Process] = []
+
+    def plan(self) -> List[Dict]:
+        """List the (interface, worker, filter) assignments the manager will start."""
+        return [
+            {"spec": spec, "interface": spec.interface, "worker": index, "filter": worker_filter(spec, index)}
+            for spec in self.specs
+            for index in range(spec.workers)
+        ]
+
+    def start(self):
+        """Compile every filter, then start one process per interface worker."""
+        assignments = self.plan()
+        if self.validate_filters:
+            # Fail before any process starts rather than capturing unfiltered traffic
+            for assignment in assignments:
+                if assignment["filter"]:
+                    compile_bpf(assignment["filter"], assignment["interface"])
+        for assignment in assignments:
+            process = multiprocessing.Process(
+                target=self.target,
+                args=(assignment["spec"], assignment["worker"], self.kafka_topic, assignment["filter"]),
+                name=f"capture-{assignment['interface'] or 'default'}-{assignment['worker']}",
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+            logger.info(f"Started {process.name} with filter {assignment['filter']!r}")
+
+    def stop(self, timeout: float = 10.0):
+        """Ask every capture process to stop and wait for it to flush."""
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.error(f"Capture process {process.name} did not stop, killing it")
+                process.kill()
+                process.join()
+        self.processes = []
+
+    def join(self):
+        """Block until every capture process exits."""
+        for process in self.processes:
+            process.join()
+
+    def alive(self) -> int:
+        """Number of capture processes still running."""
+        return sum(1 for process in self.processes if process.is_alive())
+
+if __name__ == "__main__":
+    manager = CaptureManager(kafka_topic="network_traffic")
+    manager.start()
+    try:
+        manager.join()
+    except KeyboardInterrupt:
+        manager.stop()
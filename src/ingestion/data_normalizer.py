@@ -4,7 +4,10 @@ Standardizes input data formats to JSON for consistent processing.
 """
 
 import scapy.all as scapy
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+from .log_parser import get_log_parser
+from .packet_parser import LINKTYPE_ETHERNET, LINKTYPE_RAW, parse_header_fields, parse_packet
+from ..utils.event_batch import EventBatch, EventBatchBuilder
 from ..utils.logger import get_logger
 
 logger = get_logger()
@@ -20,27 +23,76 @@ def normalize_packet(packet: scapy.Packet) -> Dict[str, Any]:
             "length": len(packet),
             "payload": str(packet.payload) if packet.payload else None
         }
-        logger.info(f"Packet normalized: {normalized}")
+        logger.debug(f"Packet normalized: {normalized}")
         return normalized
     except Exception as e:
         logger.error(f"Error normalizing packet: {str(e)}")
         return {}
 
-def normalize_log(log: str) -> Dict[str, Any]:
+def normalize_raw_packet(data: bytes, timestamp: Optional[float] = None,
+                         linktype: int = LINKTYPE_ETHERNET, copy_payload: bool = False) -> Dict[str, Any]:
+    """Normalize raw frame bytes via the fast header parser, falling back to scapy for other protocols."""
+    try:
+        normalized = parse_packet(data, timestamp, linktype)
+        if normalized is not None:
+            if copy_payload:
+                normalized["payload"] = normalized["payload"].tobytes()
+            return normalized
+    except Exception as e:
+        logger.debug(f"Fast packet parse failed, using scapy: {str(e)}")
+    layer = scapy.conf.l2types.get(linktype, scapy.Raw)
+    packet = layer(bytes(data))
+    if timestamp is not None:
+        packet.time = timestamp
+    return normalize_packet(packet)
+
+def normalize_packet_fast(packet: scapy.Packet) -> Dict[str, Any]:
+    """Normalize a scapy packet through the fast header parser when its link layer is supported."""
+    if isinstance(packet, scapy.Ether):
+        linktype = LINKTYPE_ETHERNET
+    elif isinstance(packet, (scapy.IP, scapy.IPv6)):
+        linktype = LINKTYPE_RAW
+    else:
+        return normalize_packet(packet)
+    normalized = parse_packet(bytes(packet), float(packet.time), linktype)
+    return normalized if normalized is not None else normalize_packet(packet)
+
+def normalize_packets(frames: Iterable[Tuple[bytes, float]], linktype: int = LINKTYPE_ETHERNET) -> EventBatch:
+    """Normalize (frame bytes, timestamp) pairs into a columnar EventBatch."""
+    builder = EventBatchBuilder()
+    for data, timestamp in frames:
+        try:
+            fields = parse_header_fields(data, linktype)
+        except Exception as e:
+            logger.debug(f"Fast packet parse failed, using scapy: {str(e)}")
+            fields = None
+        if fields is not None:
+            builder.append_packet(timestamp, fields)
+        else:
+            builder.append(normalize_raw_packet(data, timestamp, linktype))
+    return builder.build()
+
+def normalize_log(log: str, source: Optional[str] = None) -> Dict[str, Any]:
     """Normalize a log entry to a standardized JSON format."""
     try:
-        # Basic log normalization - can be extended based on log format
-        normalized = {
-            "log": log,
-            "timestamp": None,  # Extract timestamp from log if possible
-            "source": "unknown"
-        }
-        logger.info(f"Log normalized: {normalized}")
+        normalized = get_log_parser().parse(log, source)
+        logger.debug(f"Log normalized: {normalized}")
         return normalized
     except Exception as e:
         logger.error(f"Error normalizing log: {str(e)}")
         return {}
 
+def normalize_logs(lines: Iterable[str], source: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream normalized events for an iterable of log lines, such as an open log file."""
+    parser = get_log_parser()
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield parser.parse(line, source)
+        except Exception as e:
+            logger.error(f"Error normalizing log: {str(e)}")
+
 if __name__ == "__main__":
     # Test with a sample packet
     packet = scapy.IP(src="192.168.1.1", dst="192.168.1.2") / scapy.TCP()
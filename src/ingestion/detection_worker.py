@@ -0,0 +1,211 @@
+"""
+Detection Worker for the Cybersecurity Threat Detection System.
+Consumes normalized events from Kafka in micro-batches and feeds them to the detection engine.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from kafka import KafkaConsumer as KafkaClient
+from .wire_format import decode_message
+from ..detection.detection_engine import DetectionEngine
+from ..utils.config_loader import get_config_value
+from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
+
+logger = get_logger()
+metrics = get_metrics()
+
+class DetectionWorker:
+    """Polls a consumer-group member and runs detection on each micro-batch."""
+
+    def __init__(self, consumer, detection_engine: Optional[DetectionEngine] = None,
+                 alert_handler: Optional[Callable[[List[Dict]], None]] = None,
+                 max_poll_records: Optional[int] = None, poll_timeout_ms: Optional[int] = None,
+                 name: str = "detection-worker-0", retry_backoff_ms: int = 1000):
+        self.consumer = consumer
+        self.detection_engine = detection_engine or DetectionEngine()
+        self.alert_handler = alert_handler
+        self.max_poll_records = max_poll_records or get_config_value("ingestion.max_poll_records", 500)
+        self.poll_timeout_ms = poll_timeout_ms if poll_timeout_ms is not None else get_config_value("ingestion.poll_timeout_ms", 1000)
+        self.name = name
+        self.retry_backoff_ms = retry_backoff_ms
+        self.stats = {
+            "batches": 0,
+            "records": 0,
+            "threats": 0,
+            "handoff_failures": 0,
+            "detection_failures": 0,
+            "skipped_records": 0,
+            "last_batch_latency_ms": 0.0,
+            "avg_batch_latency_ms": 0.0,
+            "lag": 0
+        }
+        self._stop_event = threading.Event()
+        logger.info(f"Detection worker {self.name} initialized.")
+
+    def run_once(self) -> int:
+        """Poll and process a single micro-batch, returning the number of records handled."""
+        polled = self.consumer.poll(timeout_ms=self.poll_timeout_ms, max_records=self.max_poll_records)
+        if not polled:
+            self._update_lag()
+            return 0
+
+        start_time = time.perf_counter()
+        events = []
+        origins = []
+        first_offsets = {}
+        for tp, records in polled.items():
+            first_offsets[tp] = records[0].offset
+            events.extend(record.value for record in records)
+            origins.extend((tp, record.offset) for record in records)
+
+        threats = [threat for event_threats in self._detect(events, origins) for threat in event_threats]
+
+        # Commit only after alerts are handed off so a crash re-delivers the batch
+        try:
+            if threats and self.alert_handler:
+                self.alert_handler(threats)
+        except Exception as e:
+            self.stats["handoff_failures"] += 1
+            metrics.increment("worker.handoff_failures")
+            logger.error(f"Alert handoff failed in {self.name}, rewinding batch: {str(e)}")
+            for tp, offset in first_offsets.items():
+                self.consumer.seek(tp, offset)
+            self._stop_event.wait(self.retry_backoff_ms / 1000.0)
+            return 0
+        self.consumer.commit()
+
+        latency_ms = (time.perf_counter() - start_time) * 1000.0
+        self._record_batch(len(events), len(threats), latency_ms)
+        self._update_lag()
+        return len(events)
+
+    def _detect(self, events: List[Dict], origins: List[tuple]) -> List[List[Dict]]:
+        """Detect a batch, falling back to one event at a time so a bad record is skipped rather than retried forever."""
+        try:
+            return self.detection_engine.detect_threats_batch(events)
+        except Exception as e:
+            self.stats["detection_failures"] += 1
+            metrics.increment("worker.detection_failures")
+            logger.error(f"Batch detection failed in {self.name}, retrying event by event: {str(e)}")
+        results = []
+        for event, (tp, offset) in zip(events, origins):
+            try:
+                results.append(self.detection_engine.detect_threats(event))
+            except Exception as e:
+                self.stats["skipped_records"] += 1
+                metrics.increment("worker.skipped_records")
+                logger.error(f"Skipping record {tp} offset {offset} in {self.name}: {str(e)}")
+                results.append([])
+        return results
+
+    def run(self, max_batches: Optional[int] = None):
+        """Process micro-batches until stopped or max_batches is reached."""
+        logger.info(f"Detection worker {self.name} started.")
+        batches = 0
+        try:
+            while not self._stop_event.is_set():
+                if self.run_once():
+                    batches += 1
+                if max_batches is not None and batches >= max_batches:
+                    break
+        finally:
+            logger.info(f"Detection worker {self.name} stopped. Stats: {self.stats}")
+
+    def stop(self):
+        """Ask the worker loop to exit after the current batch."""
+        self._stop_event.set()
+
+    def lag(self) -> Dict:
+        """Return the per-partition lag between the log end and this worker's position."""
+        partitions = list(self.consumer.assignment())
+        if not partitions:
+            return {}
+        end_offsets = self.consumer.end_offsets(partitions)
+        return {tp: end_offsets[tp] - self.consumer.position(tp) for tp in partitions}
+
+    def _update_lag(self):
+        total_lag = sum(self.lag().values())
+        self.stats["lag"] = total_lag
+        metrics.set_gauge(f"worker.{self.name}.lag", total_lag)
+
+    def _record_batch(self, records: int, threats: int, latency_ms: float):
+        self.stats["batches"] += 1
+        self.stats["records"] += records
+        self.stats["threats"] += threats
+        self.stats["last_batch_latency_ms"] = latency_ms
+        batches = self.stats["batches"]
+        self.stats["avg_batch_latency_ms"] += (latency_ms - self.stats["avg_batch_latency_ms"]) / batches
+        metrics.increment("worker.records", records)
+        metrics.increment("worker.threats", threats)
+        metrics.set_gauge(f"worker.{self.name}.batch_latency_ms", latency_ms)
+        logger.debug(f"{self.name} processed batch of {records} records in {latency_ms:.1f} ms")
+
+class DetectionWorkerGroup:
+    """Runs several detection workers as members of one consumer group."""
+
+    def __init__(self, consumer_factory: Callable[[int], object], num_workers: Optional[int] = None,
+                 engine_factory: Callable[[], DetectionEngine] = DetectionEngine,
+                 alert_handler: Optional[Callable[[List[Dict]], None]] = None, **worker_kwargs):
+        self.num_workers = num_workers or get_config_value("ingestion.num_workers", 1)
+        self.workers = [
+            DetectionWorker(consumer_factory(i), engine_factory(), alert_handler,
+                            name=f"detection-worker-{i}", **worker_kwargs)
+            for i in range(self.num_workers)
+        ]
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Start every worker in its own thread."""
+        for worker in self.workers:
+            thread = threading.Thread(target=worker.run, name=worker.name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop all workers and close their consumers."""
+        for worker in self.workers:
+            worker.stop()
+        for thread in self._threads:
+            thread.join(timeout)
+        for worker in self.workers:
+            worker.consumer.close()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Return the stats of every worker."""
+        return {worker.name: dict(worker.stats) for worker in self.workers}
+
+def create_kafka_consumer(topic: str = "network_traffic", bootstrap_servers: Optional[str] = None,
+                          group_id: Optional[str] = None):
+    """Create a kafka-python consumer configured for micro-batch detection."""
+    return KafkaClient(
+        topic,
+        bootstrap_servers=bootstrap_servers or get_config_value("ingestion.kafka.bootstrap_servers", "localhost:9092"),
+        group_id=group_id or get_config_value("ingestion.kafka.consumer_group", "threat_detection_consumer"),
+        value_deserializer=decode_message,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        max_poll_records=get_config_value("ingestion.max_poll_records", 500)
+    )
+
+def run_worker_process(worker_id: int):
+    """Entry point for one worker process; processes sidestep the GIL for CPU-bound detection."""
+    from ..alerting.alert_manager import AlertManager
+    worker = DetectionWorker(create_kafka_consumer(), alert_handler=AlertManager().process_alerts,
+                             name=f"detection-worker-{worker_id}")
+    try:
+        worker.run()
+    finally:
+        worker.consumer.close()
+
+if __name__ == "__main__":
+    import multiprocessing
+    processes = [
+        multiprocessing.Process(target=run_worker_process, args=(i,))
+        for i in range(get_config_value("ingestion.num_workers", 1))
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
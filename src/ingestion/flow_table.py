@@ -0,0 +1,163 @@
+"""
+Flow Table for the Cybersecurity Threat Detection System.
+Aggregates normalized packets into NetFlow-style flow summaries before detection.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .packet_parser import TCP_FLAG_STRINGS
+from ..utils.config_loader import get_config_value
+from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
+
+logger = get_logger()
+metrics = get_metrics()
+
+TCP_FLAG_VALUES = {flags: value for value, flags in enumerate(TCP_FLAG_STRINGS)}
+TCP_FIN = 0x01
+TCP_RST = 0x04
+
+FlowKey = Tuple[Any, Any, Any, Any, Any]
+
+class FlowRecord:
+    """Compact per-flow accumulator."""
+
+    __slots__ = ("key", "first_seen", "last_seen", "packets", "bytes", "tcp_flags", "first_payload")
+
+    def __init__(self, key: FlowKey, timestamp: float):
+        self.key = key
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.packets = 0
+        self.bytes = 0
+        self.tcp_flags = 0
+        self.first_payload = None
+
+    def to_event(self, end_reason: str) -> Dict[str, Any]:
+        """Render the flow as a normalized event carrying NetFlow-style counters."""
+        source_ip, destination_ip, source_port, destination_port, protocol = self.key
+        return {
+            "timestamp": self.first_seen,
+            "source_ip": source_ip,
+            "destination_ip": destination_ip,
+            "protocol": protocol,
+            "length": self.bytes,
+            "payload": self.first_payload,
+            "source_port": source_port,
+            "destination_port": destination_port,
+            "tcp_flags": TCP_FLAG_STRINGS[self.tcp_flags] if self.tcp_flags else None,
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "duration": self.last_seen - self.first_seen,
+            "flow_end": self.last_seen,
+            "end_reason": end_reason
+        }
+
+class FlowTable:
+    """Bounded 5-tuple flow table with idle/active timeouts and LRU eviction."""
+
+    def __init__(self, on_flow: Callable[[Dict[str, Any]], None], max_flows: Optional[int] = None,
+                 idle_timeout: Optional[float] = None, active_timeout: Optional[float] = None,
+                 first_payload_bytes: Optional[int] = None, sweep_interval: float = 1.0):
+        self.on_flow = on_flow
+        self.max_flows = max_flows or get_config_value("ingestion.flows.max_flows", 1000000)
+        self.idle_timeout = idle_timeout or get_config_value("ingestion.flows.idle_timeout_seconds", 15)
+        self.active_timeout = active_timeout or get_config_value("ingestion.flows.active_timeout_seconds", 60)
+        self.first_payload_bytes = first_payload_bytes if first_payload_bytes is not None else \
+            get_config_value("ingestion.flows.first_payload_bytes", 64)
+        self.sweep_interval = sweep_interval
+        # Ordered by last activity, so the least recently seen flow is always first
+        self.flows: "OrderedDict[FlowKey, FlowRecord]" = OrderedDict()
+        self.stats = {
+            "packets": 0,
+            "flows_created": 0,
+            "flows_emitted": 0,
+            "idle_expired": 0,
+            "active_expired": 0,
+            "tcp_closed": 0,
+            "evictions": 0
+        }
+        self._last_sweep = None
+
+    def add(self, event: Dict[str, Any]):
+        """Account a normalized packet to its flow, emitting any flows that end."""
+        timestamp = float(event.get("timestamp") or 0.0)
+        key = (event.get("source_ip"), event.get("destination_ip"), event.get("source_port"),
+               event.get("destination_port"), event.get("protocol"))
+        self.stats["packets"] += 1
+
+        record = self.flows.get(key)
+        if record is not None and timestamp - record.first_seen >= self.active_timeout:
+            self._emit(self.flows.pop(key), "active_timeout", "active_expired")
+            record = None
+        if record is None:
+            if len(self.flows) >= self.max_flows:
+                _, evicted = self.flows.popitem(last=False)
+                self._emit(evicted, "evicted", "evictions")
+            record = FlowRecord(key, timestamp)
+            self.flows[key] = record
+            self.stats["flows_created"] += 1
+        else:
+            self.flows.move_to_end(key)
+
+        # Sampled packets stand for sample_rate packets so flow counters stay unbiased
+        weight = event.get("sample_rate", 1)
+        record.last_seen = timestamp
+        record.packets += weight
+        record.bytes += (event.get("length") or 0) * weight
+        flags = event.get("tcp_flags")
+        if flags:
+            record.tcp_flags |= TCP_FLAG_VALUES.get(flags, 0)
+        payload = event.get("payload")
+        if record.first_payload is None and payload:
+            record.first_payload = self._copy_payload(payload)
+
+        if record.tcp_flags & (TCP_FIN | TCP_RST):
+            self._emit(self.flows.pop(key), "tcp_close", "tcp_closed")
+
+        if self._last_sweep is None:
+            self._last_sweep = timestamp
+        elif timestamp - self._last_sweep >= self.sweep_interval:
+            self.expire(timestamp)
+
+    def expire(self, now: float) -> int:
+        """Emit every flow idle for longer than the idle timeout."""
+        self._last_sweep = now
+        expired = 0
+        while self.flows:
+            key, record = next(iter(self.flows.items()))
+            if now - record.last_seen < self.idle_timeout:
+                break
+            del self.flows[key]
+            self._emit(record, "idle_timeout", "idle_expired")
+            expired += 1
+        return expired
+
+    def flush(self) -> int:
+        """Emit all remaining flows, e.g. at the end of a capture."""
+        count = len(self.flows)
+        while self.flows:
+            _, record = self.flows.popitem(last=False)
+            self._emit(record, "flush", None)
+        return count
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Return summaries of active flows without emitting them."""
+        return [record.to_event("active") for record in self.flows.values()]
+
+    def _copy_payload(self, payload: Any) -> Any:
+        # Copy out of capture buffers so the flow does not pin the whole frame
+        if isinstance(payload, memoryview):
+            return payload[:self.first_payload_bytes].tobytes()
+        return payload[:self.first_payload_bytes]
+
+    def _emit(self, record: FlowRecord, end_reason: str, counter: Optional[str]):
+        if counter:
+            self.stats[counter] += 1
+            metrics.increment(f"flows.{counter}")
+        self.stats["flows_emitted"] += 1
+        metrics.set_gauge("flows.active", len(self.flows))
+        try:
+            self.on_flow(record.to_event(end_reason))
+        except Exception as e:
+            logger.error(f"Error emitting flow summary: {str(e)}")
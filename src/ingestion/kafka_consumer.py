@@ -4,36 +4,122 @@ Handles real-time data streaming from Kafka topics.
 """
 
 from kafka import KafkaProducer
-from typing import Dict
-import json
+from typing import Callable, Dict, Optional
+import threading
+from .wire_format import encode_message
+from ..utils.config_loader import get_config_value
 from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
 
 logger = get_logger()
+metrics = get_metrics()
 
 class KafkaConsumer:
     """Kafka consumer for ingesting data from topics."""
-    
-    def __init__(self, topic: str, bootstrap_servers: str = "localhost:9092"):
+
+    def __init__(self, topic: str, bootstrap_servers: str = "localhost:9092",
+                 mode: Optional[str] = None, batch_size_bytes: Optional[int] = None,
+                 linger_ms: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 max_block_ms: Optional[int] = None, producer=None,
+                 on_delivery: Optional[Callable] = None, on_error: Optional[Callable] = None,
+                 wire_format: Optional[str] = None):
         self.topic = topic
         self.bootstrap_servers = bootstrap_servers
-        self.producer = KafkaProducer(
+        # "sync" flushes after every message, "batch" lets the producer linger and batch
+        self.mode = mode or get_config_value("ingestion.producer.mode", "batch")
+        self.batch_size_bytes = batch_size_bytes or get_config_value("ingestion.producer.batch_size_bytes", 65536)
+        self.linger_ms = linger_ms if linger_ms is not None else get_config_value("ingestion.producer.linger_ms", 5)
+        self.max_in_flight = max_in_flight or get_config_value("ingestion.producer.max_in_flight", 10000)
+        self.max_block_ms = max_block_ms if max_block_ms is not None else get_config_value("ingestion.producer.max_block_ms", 60000)
+        # "binary" is the compact versioned encoding, "json" is kept for debugging
+        self.wire_format = wire_format or get_config_value("ingestion.wire_format", "binary")
+        self.on_delivery = on_delivery
+        self.on_error = on_error
+        self.stats = {"sent": 0, "delivered": 0, "failed": 0, "blocked": 0, "dropped": 0}
+        self._stats_lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._pending = 0
+        self.producer = producer or KafkaProducer(
             bootstrap_servers=self.bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v).encode('utf-8')
+            value_serializer=lambda v: encode_message(v, self.wire_format),
+            linger_ms=self.linger_ms if self.mode == "batch" else 0,
+            batch_size=self.batch_size_bytes,
+            acks=get_config_value("ingestion.producer.acks", 1)
         )
-    
-    def send(self, data: Dict):
+
+    def send(self, data: Dict) -> bool:
         """Send data to Kafka topic."""
+        if self.mode != "batch":
+            return self._send_sync(data)
+
+        # Bounded in-flight buffer: block the caller (capture) instead of queueing without limit
+        if not self._in_flight.acquire(blocking=False):
+            self._count("blocked")
+            if not self._in_flight.acquire(timeout=self.max_block_ms / 1000.0):
+                self._count("dropped")
+                logger.warning(f"In-flight buffer full for {self.max_block_ms} ms, dropping message for topic {self.topic}")
+                return False
+        try:
+            future = self.producer.send(self.topic, value=data)
+        except Exception as e:
+            self._in_flight.release()
+            self._count("failed")
+            logger.error(f"Error sending data to Kafka: {str(e)}")
+            return False
+        self._count("sent", pending=1)
+        future.add_callback(self._handle_delivery).add_errback(self._handle_error)
+        return True
+
+    def _send_sync(self, data: Dict) -> bool:
         try:
             self.producer.send(self.topic, value=data)
             self.producer.flush()
+            self._count("sent")
+            self._count("delivered")
             logger.info(f"Data sent to Kafka topic {self.topic}: {data}")
+            return True
         except Exception as e:
+            self._count("failed")
             logger.error(f"Error sending data to Kafka: {str(e)}")
-    
-    def close(self):
-        """Close the Kafka producer."""
-        self.producer.close()
-        logger.info("Kafka producer closed.")
+            return False
+
+    def _handle_delivery(self, record_metadata):
+        self._in_flight.release()
+        self._count("delivered", pending=-1)
+        if self.on_delivery:
+            self.on_delivery(record_metadata)
+
+    def _handle_error(self, exception: Exception):
+        self._in_flight.release()
+        self._count("failed", pending=-1)
+        logger.error(f"Kafka delivery failed for topic {self.topic}: {str(exception)}")
+        if self.on_error:
+            self.on_error(exception)
+
+    def _count(self, name: str, pending: int = 0):
+        with self._stats_lock:
+            self.stats[name] += 1
+            self._pending += pending
+        metrics.increment(f"producer.{name}")
+
+    @property
+    def in_flight(self) -> int:
+        """Number of messages sent but not yet acknowledged."""
+        with self._stats_lock:
+            return self._pending
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait for all in-flight messages to be acknowledged."""
+        self.producer.flush(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Drain in-flight messages and close the Kafka producer."""
+        try:
+            self.flush(timeout)
+        except Exception as e:
+            logger.error(f"Error draining Kafka producer: {str(e)}")
+        self.producer.close(timeout)
+        logger.info(f"Kafka producer closed. Stats: {self.stats}")
 
 if __name__ == "__main__":
     consumer = KafkaConsumer(topic="network_traffic")
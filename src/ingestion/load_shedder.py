@@ -0,0 +1,129 @@
+"""
+Load Shedder for the Cybersecurity Threat Detection System.
+Switches live capture to per-flow sampling when the pipeline falls behind.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+from ..utils.config_loader import get_config_value
+from ..utils.logger import get_logger
+from ..utils.metrics import get_metrics
+
+logger = get_logger()
+metrics = get_metrics()
+
+# TCP control packets are never sampled away: they delimit flows and carry scans
+PRIORITY_TCP_FLAGS = ("S", "F", "R")
+
+class LoadShedder:
+    """Adaptive per-flow sampler driven by queue depth and capture lag."""
+
+    def __init__(self, queue_depth: Callable[[], float], high_watermark: Optional[float] = None,
+                 low_watermark: Optional[float] = None, max_lag_ms: Optional[float] = None,
+                 first_packets: Optional[int] = None, max_sample_rate: Optional[int] = None,
+                 priority_ports: Optional[Iterable[int]] = None,
+                 priority_filter: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 max_flows: Optional[int] = None, check_interval: Optional[int] = None,
+                 clock: Callable[[], float] = time.time):
+        self.queue_depth = queue_depth
+        self.high_watermark = high_watermark or get_config_value("ingestion.load_shedding.high_watermark", 0.8)
+        self.low_watermark = low_watermark if low_watermark is not None else \
+            get_config_value("ingestion.load_shedding.low_watermark", 0.3)
+        self.max_lag_ms = max_lag_ms or get_config_value("ingestion.load_shedding.max_lag_ms", 2000)
+        self.first_packets = first_packets if first_packets is not None else \
+            get_config_value("ingestion.load_shedding.first_packets", 10)
+        self.max_sample_rate = max_sample_rate or get_config_value("ingestion.load_shedding.max_sample_rate", 64)
+        self.priority_ports = frozenset(priority_ports if priority_ports is not None else
+                                        get_config_value("ingestion.load_shedding.priority_ports", [22, 23, 445, 3389]))
+        self.priority_filter = priority_filter or self.is_priority
+        self.max_flows = max_flows or get_config_value("ingestion.load_shedding.max_flows", 100000)
+        self.check_interval = check_interval or get_config_value("ingestion.load_shedding.check_interval", 256)
+        self.clock = clock
+        self.overloaded = False
+        self.sample_rate = 1
+        # Packets seen per flow while overloaded, least recently seen first
+        self.flow_counts: "OrderedDict[tuple, int]" = OrderedDict()
+        self.stats = {"packets": 0, "kept": 0, "sampled": 0, "priority": 0, "shed": 0, "overload_episodes": 0}
+        self._until_check = self.check_interval
+
+    def is_priority(self, event: Dict[str, Any]) -> bool:
+        """Default priority filter: TCP control packets and traffic on priority ports."""
+        flags = event.get("tcp_flags")
+        if flags and any(flag in flags for flag in PRIORITY_TCP_FLAGS):
+            return True
+        return event.get("destination_port") in self.priority_ports or event.get("source_port") in self.priority_ports
+
+    def admit(self, event: Dict[str, Any]) -> bool:
+        """Decide whether to keep a normalized packet, tagging sampled ones with their sample_rate.
+
+        Events without a sample_rate key stand for exactly one packet.
+        """
+        self.stats["packets"] += 1
+        self._until_check -= 1
+        if self._until_check <= 0:
+            self._until_check = self.check_interval
+            self.update(event.get("timestamp"))
+
+        if not self.overloaded:
+            self.stats["kept"] += 1
+            return True
+        if self.priority_filter(event):
+            self.stats["priority"] += 1
+            self.stats["kept"] += 1
+            return True
+
+        key = (event.get("source_ip"), event.get("destination_ip"), event.get("source_port"),
+               event.get("destination_port"), event.get("protocol"))
+        count = self.flow_counts.pop(key, 0) + 1
+        if len(self.flow_counts) >= self.max_flows:
+            self.flow_counts.popitem(last=False)
+        self.flow_counts[key] = count
+
+        if count <= self.first_packets:
+            self.stats["kept"] += 1
+            return True
+        if (count - self.first_packets) % self.sample_rate == 0:
+            event["sample_rate"] = self.sample_rate
+            self.stats["sampled"] += 1
+            self.stats["kept"] += 1
+            metrics.increment("ingestion.shed.sampled")
+            return True
+        self.stats["shed"] += 1
+        metrics.increment("ingestion.shed.packets")
+        return False
+
+    def update(self, packet_timestamp: Optional[float] = None):
+        """Re-evaluate overload from queue depth and capture lag, adjusting the sample rate."""
+        depth = self.queue_depth()
+        lag_ms = (self.clock() - float(packet_timestamp)) * 1000.0 if packet_timestamp is not None else 0.0
+        behind = depth >= self.high_watermark or lag_ms > self.max_lag_ms
+
+        if behind:
+            if not self.overloaded:
+                self.overloaded = True
+                self.stats["overload_episodes"] += 1
+                metrics.increment("ingestion.shed.overload_episodes")
+                logger.warning(f"Capture overloaded (queue depth {depth:.0%}, lag {lag_ms:.0f} ms), sampling flows")
+            # Back off multiplicatively while still falling behind
+            self.sample_rate = min(self.sample_rate * 2, self.max_sample_rate)
+        elif self.overloaded and depth <= self.low_watermark and lag_ms <= self.max_lag_ms / 2:
+            self.sample_rate //= 2
+            if self.sample_rate <= 1:
+                self.sample_rate = 1
+                self.overloaded = False
+                self.flow_counts.clear()
+                logger.info("Capture caught up, sampling disabled")
+
+        metrics.set_gauge("ingestion.shed.sample_rate", self.sample_rate)
+        metrics.set_gauge("ingestion.shed.overloaded", 1 if self.overloaded else 0)
+        metrics.set_gauge("ingestion.shed.queue_depth", depth)
+        metrics.set_gauge("ingestion.shed.lag_ms", lag_ms)
+
+if __name__ == "__main__":
+    depth = {"value": 0.95}
+    shedder = LoadShedder(queue_depth=lambda: depth["value"], check_interval=1)
+    kept = sum(shedder.admit({"timestamp": time.time(), "source_ip": "10.0.0.1", "destination_ip": "10.0.0.2",
+                              "source_port": 1234, "destination_port": 80, "protocol": 6, "tcp_flags": "A"})
+               for _ in range(1000))
+    print(f"Kept {kept} of 1000 packets at sample rate {shedder.sample_rate}: {shedder.stats}")
@@ -0,0 +1,398 @@
+"""
+Local Broker for the Cybersecurity Threat Detection System.
+In-process stand-in for Kafka used to test and benchmark the streaming path without a cluster.
+"""
+
+import threading
+import time
+import zlib
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+TopicPartition = namedtuple("TopicPartition", ["topic", "partition"])
+RecordMetadata = namedtuple("RecordMetadata", ["topic", "partition", "offset"])
+ConsumerRecord = namedtuple("ConsumerRecord", ["topic", "partition", "offset", "timestamp", "key", "value"])
+
+class LocalFuture:
+    """Minimal future mirroring kafka-python's callback interface."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks: List[Tuple[Callable, tuple]] = []
+        self._errbacks: List[Tuple[Callable, tuple]] = []
+        self._lock = threading.Lock()
+        self.value = None
+        self.exception = None
+
+    def is_done(self) -> bool:
+        """Return True once the future has been resolved."""
+        return self._event.is_set()
+
+    def add_callback(self, fn: Callable, *args) -> "LocalFuture":
+        """Register a callback invoked with the result on success."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append((fn, args))
+                return self
+        if self.exception is None:
+            fn(*args, self.value)
+        return self
+
+    def add_errback(self, fn: Callable, *args) -> "LocalFuture":
+        """Register a callback invoked with the exception on failure."""
+        with self._lock:
+            if not self._event.is_set():
+                self._errbacks.append((fn, args))
+                return self
+        if self.exception is not None:
+            fn(*args, self.exception)
+        return self
+
+    def success(self, value: Any):
+        """Resolve the future with a value."""
+        self._resolve(value, None)
+
+    def failure(self, exception: Exception):
+        """Resolve the future with an exception."""
+        self._resolve(None, exception)
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Block until resolved and return the value or raise the exception."""
+        if not self._event.wait(timeout):
+            raise TimeoutError("Timed out waiting for record delivery")
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+    def _resolve(self, value: Any, exception: Optional[Exception]):
+        with self._lock:
+            self.value = value
+            self.exception = exception
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+            errbacks, self._errbacks = self._errbacks, []
+        handlers = callbacks if exception is None else errbacks
+        result = value if exception is None else exception
+        for fn, args in handlers:
+            try:
+                fn(*args, result)
+            except Exception as e:
+                logger.error(f"Error in delivery callback: {str(e)}")
+
+class LocalBroker:
+    """In-process broker holding partitioned, append-only topic logs."""
+
+    def __init__(self, num_partitions: int = 1, request_latency_ms: float = 0.0):
+        self.num_partitions = num_partitions
+        self.request_latency_ms = request_latency_ms
+        self._lock = threading.Condition()
+        self._topics: Dict[str, List[List[Tuple[Any, Any, float]]]] = {}
+        self._committed: Dict[Tuple[str, TopicPartition], int] = {}
+        self._groups: Dict[str, Dict[str, List[str]]] = {}
+        self._generations: Dict[str, int] = {}
+        self.requests = 0
+
+    def create_topic(self, topic: str, num_partitions: Optional[int] = None):
+        """Create a topic if it does not exist."""
+        with self._lock:
+            if topic not in self._topics:
+                self._topics[topic] = [[] for _ in range(num_partitions or self.num_partitions)]
+
+    def partitions_for(self, topic: str) -> List[int]:
+        """Return the partition ids of a topic, creating it on first use."""
+        self.create_topic(topic)
+        with self._lock:
+            return list(range(len(self._topics[topic])))
+
+    def partition_for_key(self, topic: str, key: Optional[bytes], counter: int) -> int:
+        """Pick a partition by key hash, or round-robin when there is no key."""
+        count = len(self.partitions_for(topic))
+        if key is None:
+            return counter % count
+        return zlib.crc32(key) % count
+
+    def produce(self, topic: str, partition: int, records: List[Tuple[Any, Any]]) -> int:
+        """Append a batch of (key, value) records and return the base offset."""
+        self._simulate_round_trip()
+        self.create_topic(topic)
+        now = time.time()
+        with self._lock:
+            log = self._topics[topic][partition]
+            base_offset = len(log)
+            log.extend((key, value, now) for key, value in records)
+            self.requests += 1
+            self._lock.notify_all()
+        return base_offset
+
+    def fetch(self, topic: str, partition: int, offset: int, max_records: int) -> List[Tuple[int, Any, Any, float]]:
+        """Read up to max_records starting at offset as (offset, key, value, timestamp)."""
+        self.create_topic(topic)
+        with self._lock:
+            log = self._topics[topic][partition]
+            end = min(len(log), offset + max_records)
+            return [(i,) + log[i] for i in range(offset, end)]
+
+    def end_offset(self, topic: str, partition: int) -> int:
+        """Return the offset the next produced record will receive."""
+        self.create_topic(topic)
+        with self._lock:
+            return len(self._topics[topic][partition])
+
+    def wait_for_data(self, timeout: float):
+        """Block until new records arrive or the timeout expires."""
+        with self._lock:
+            self._lock.wait(timeout)
+
+    def commit(self, group_id: str, tp: TopicPartition, offset: int):
+        """Record the committed offset of a consumer group."""
+        with self._lock:
+            self._committed[(group_id, tp)] = offset
+
+    def committed(self, group_id: str, tp: TopicPartition) -> Optional[int]:
+        """Return the committed offset of a consumer group, if any."""
+        with self._lock:
+            return self._committed.get((group_id, tp))
+
+    def join_group(self, group_id: str, member_id: str, topics: List[str]) -> int:
+        """Add a member to a consumer group, triggering a rebalance."""
+        for topic in topics:
+            self.create_topic(topic)
+        with self._lock:
+            self._groups.setdefault(group_id, {})[member_id] = list(topics)
+            self._generations[group_id] = self._generations.get(group_id, 0) + 1
+            return self._generations[group_id]
+
+    def leave_group(self, group_id: str, member_id: str):
+        """Remove a member from a consumer group, triggering a rebalance."""
+        with self._lock:
+            members = self._groups.get(group_id, {})
+            if members.pop(member_id, None) is not None:
+                self._generations[group_id] = self._generations.get(group_id, 0) + 1
+
+    def assignment(self, group_id: str, member_id: str) -> Tuple[int, List[TopicPartition]]:
+        """Return the group generation and the partitions assigned to a member."""
+        with self._lock:
+            members = self._groups.get(group_id, {})
+            generation = self._generations.get(group_id, 0)
+            if member_id not in members:
+                return generation, []
+            topics = sorted({topic for subscribed in members.values() for topic in subscribed})
+            partitions = [TopicPartition(topic, p) for topic in topics for p in range(len(self._topics[topic]))]
+            ordered_members = sorted(members)
+            index = ordered_members.index(member_id)
+            assigned = [tp for i, tp in enumerate(partitions)
+                        if i % len(ordered_members) == index and tp.topic in members[member_id]]
+            return generation, assigned
+
+    def _simulate_round_trip(self):
+        if self.request_latency_ms > 0:
+            time.sleep(self.request_latency_ms / 1000.0)
+
+class LocalProducer:
+    """Producer for LocalBroker with the batching semantics of KafkaProducer."""
+
+    def __init__(self, broker: LocalBroker, value_serializer: Optional[Callable] = None,
+                 key_serializer: Optional[Callable] = None, linger_ms: int = 0,
+                 batch_size: int = 16384, **kwargs):
+        self.broker = broker
+        self.value_serializer = value_serializer
+        self.key_serializer = key_serializer
+        self.linger_ms = linger_ms
+        self.batch_size = batch_size
+        self._lock = threading.Condition()
+        self._batches: Dict[Tuple[str, int], List[Tuple[Any, Any, LocalFuture]]] = {}
+        self._batch_bytes: Dict[Tuple[str, int], int] = {}
+        self._batch_started: Dict[Tuple[str, int], float] = {}
+        self._pending = 0
+        self._counter = 0
+        self._closed = False
+        self._flush_requested = False
+        self._sender = threading.Thread(target=self._run_sender, name="local-producer", daemon=True)
+        self._sender.start()
+
+    def send(self, topic: str, value: Any = None, key: Any = None, partition: Optional[int] = None) -> LocalFuture:
+        """Queue a record for delivery and return its future."""
+        if self._closed:
+            raise RuntimeError("Producer is closed")
+        if self.value_serializer is not None:
+            value = self.value_serializer(value)
+        if key is not None and self.key_serializer is not None:
+            key = self.key_serializer(key)
+        future = LocalFuture()
+        with self._lock:
+            if partition is None:
+                partition = self.broker.partition_for_key(topic, key, self._counter)
+                self._counter += 1
+            batch_key = (topic, partition)
+            if batch_key not in self._batches:
+                self._batches[batch_key] = []
+                self._batch_bytes[batch_key] = 0
+                self._batch_started[batch_key] = time.monotonic()
+            self._batches[batch_key].append((key, value, future))
+            self._batch_bytes[batch_key] += len(value) if isinstance(value, (bytes, bytearray)) else 1
+            self._pending += 1
+            if self._batch_bytes[batch_key] >= self.batch_size or self.linger_ms <= 0:
+                self._lock.notify_all()
+        return future
+
+    def flush(self, timeout: Optional[float] = None):
+        """Send all buffered records and wait for them to be acknowledged."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._flush_requested = True
+            self._lock.notify_all()
+            while self._pending > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out flushing producer")
+                self._lock.wait(remaining)
+            self._flush_requested = False
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush outstanding records and stop the sender thread."""
+        if self._closed:
+            return
+        self.flush(timeout)
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self._sender.join(timeout)
+
+    def _ready_batches(self, force: bool) -> List[Tuple[Tuple[str, int], List]]:
+        now = time.monotonic()
+        ready = []
+        for batch_key, records in list(self._batches.items()):
+            full = self._batch_bytes[batch_key] >= self.batch_size
+            lingered = (now - self._batch_started[batch_key]) * 1000.0 >= self.linger_ms
+            if force or full or lingered:
+                ready.append((batch_key, records))
+                del self._batches[batch_key]
+                del self._batch_bytes[batch_key]
+                del self._batch_started[batch_key]
+        return ready
+
+    def _run_sender(self):
+        while True:
+            with self._lock:
+                while not self._batches and not self._closed:
+                    self._lock.wait()
+                if self._closed and not self._batches:
+                    return
+                ready = self._ready_batches(self._flush_requested or self._closed)
+                if not ready:
+                    self._lock.wait(self.linger_ms / 1000.0)
+                    continue
+            for (topic, partition), records in ready:
+                self._send_batch(topic, partition, records)
+
+    def _send_batch(self, topic: str, partition: int, records: List[Tuple[Any, Any, LocalFuture]]):
+        try:
+            base_offset = self.broker.produce(topic, partition, [(key, value) for key, value, _ in records])
+            for i, (_, _, future) in enumerate(records):
+                future.success(RecordMetadata(topic, partition, base_offset + i))
+        except Exception as e:
+            for _, _, future in records:
+                future.failure(e)
+        with self._lock:
+            self._pending -= len(records)
+            self._lock.notify_all()
+
+class LocalConsumer:
+    """Consumer-group member for LocalBroker with the polling interface of KafkaConsumer."""
+
+    _member_ids = 0
+
+    def __init__(self, *topics: str, broker: LocalBroker, group_id: str,
+                 value_deserializer: Optional[Callable] = None, max_poll_records: int = 500,
+                 client_id: Optional[str] = None, **kwargs):
+        self.broker = broker
+        self.group_id = group_id
+        self.value_deserializer = value_deserializer
+        self.max_poll_records = max_poll_records
+        LocalConsumer._member_ids += 1
+        self.member_id = client_id or f"local-consumer-{LocalConsumer._member_ids}"
+        self.topics = list(topics)
+        self._generation = -1
+        self._assignment: List[TopicPartition] = []
+        self._positions: Dict[TopicPartition, int] = {}
+        self._rotation = 0
+        self._closed = False
+        self.broker.join_group(self.group_id, self.member_id, self.topics)
+
+    def poll(self, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        """Fetch up to max_records across the assigned partitions."""
+        max_records = max_records or self.max_poll_records
+        deadline = time.monotonic() + timeout_ms / 1000.0
+        while True:
+            self._refresh_assignment()
+            records = self._fetch(max_records)
+            remaining = deadline - time.monotonic()
+            if records or remaining <= 0 or self._closed:
+                return records
+            self.broker.wait_for_data(remaining)
+
+    def commit(self, offsets: Optional[Dict[TopicPartition, Any]] = None):
+        """Commit the consumed positions, or the given offsets, for the group."""
+        if offsets is None:
+            offsets = dict(self._positions)
+        for tp, offset in offsets.items():
+            self.broker.commit(self.group_id, tp, getattr(offset, "offset", offset))
+
+    def committed(self, tp: TopicPartition) -> Optional[int]:
+        """Return the last committed offset of a partition."""
+        return self.broker.committed(self.group_id, tp)
+
+    def seek(self, tp: TopicPartition, offset: int):
+        """Move the fetch position of a partition."""
+        self._positions[tp] = offset
+
+    def position(self, tp: TopicPartition) -> int:
+        """Return the next offset that will be fetched for a partition."""
+        return self._positions[tp]
+
+    def assignment(self) -> set:
+        """Return the partitions currently assigned to this member."""
+        self._refresh_assignment()
+        return set(self._assignment)
+
+    def end_offsets(self, partitions: List[TopicPartition]) -> Dict[TopicPartition, int]:
+        """Return the log end offset of each partition."""
+        return {tp: self.broker.end_offset(tp.topic, tp.partition) for tp in partitions}
+
+    def close(self, autocommit: bool = False):
+        """Leave the consumer group."""
+        if autocommit:
+            self.commit()
+        self._closed = True
+        self.broker.leave_group(self.group_id, self.member_id)
+
+    def _refresh_assignment(self):
+        generation, assigned = self.broker.assignment(self.group_id, self.member_id)
+        if generation == self._generation:
+            return
+        self._generation = generation
+        self._assignment = assigned
+        self._positions = {tp: self.broker.committed(self.group_id, tp) or 0 for tp in assigned}
+
+    def _fetch(self, max_records: int) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        records: Dict[TopicPartition, List[ConsumerRecord]] = {}
+        budget = max_records
+        # Rotate the starting partition so a busy partition cannot starve the others
+        self._rotation = (self._rotation + 1) % max(len(self._assignment), 1)
+        for tp in self._assignment[self._rotation:] + self._assignment[:self._rotation]:
+            if budget <= 0:
+                break
+            fetched = self.broker.fetch(tp.topic, tp.partition, self._positions[tp], budget)
+            if not fetched:
+                continue
+            records[tp] = [
+                ConsumerRecord(tp.topic, tp.partition, offset, timestamp, key,
+                               self.value_deserializer(value) if self.value_deserializer else value)
+                for offset, key, value, timestamp in fetched
+            ]
+            self._positions[tp] = fetched[-1][0] + 1
+            budget -= len(fetched)
+        return records
@@ -0,0 +1,260 @@
+"""
+Log Parser for the Cybersecurity Threat Detection System.
+Parses syslog, sshd, web access and Windows event logs with precompiled templates.
+"""
+
+import calendar
+import json
+import re
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+MONTHS = {name: index for index, name in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+
+# Timestamps repeat for every line logged within the same second, so parses are memoized
+@lru_cache(maxsize=8192)
+def parse_rfc3164_timestamp(value: str) -> Optional[float]:
+    """Parse 'Oct 11 22:14:15' as UTC in the most recent year that is not in the future."""
+    try:
+        month = MONTHS[value[0:3]]
+        day = int(value[4:6])
+        hour, minute, second = int(value[7:9]), int(value[10:12]), int(value[13:15])
+    except (KeyError, ValueError):
+        return None
+    year = time.gmtime().tm_year
+    timestamp = calendar.timegm((year, month, day, hour, minute, second))
+    if timestamp > time.time() + 86400:
+        timestamp = calendar.timegm((year - 1, month, day, hour, minute, second))
+    return float(timestamp)
+
+@lru_cache(maxsize=8192)
+def parse_clf_timestamp(value: str) -> Optional[float]:
+    """Parse an access log timestamp such as '10/Oct/2000:13:55:36 -0700'."""
+    try:
+        day, month, year = int(value[0:2]), MONTHS[value[3:6]], int(value[7:11])
+        hour, minute, second = int(value[12:14]), int(value[15:17]), int(value[18:20])
+        offset = value[21:26]
+        offset_seconds = (int(offset[1:3]) * 3600 + int(offset[3:5]) * 60) * (-1 if offset[0] == "-" else 1) \
+            if offset else 0
+    except (KeyError, ValueError, IndexError):
+        return None
+    return float(calendar.timegm((year, month, day, hour, minute, second)) - offset_seconds)
+
+@lru_cache(maxsize=8192)
+def parse_iso_timestamp(value: str) -> Optional[float]:
+    """Parse an RFC 3339 / ISO 8601 timestamp, treating naive values as UTC."""
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    # fromisoformat before Python 3.11 accepts at most six fractional digits
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+class RegexTemplate:
+    """Log format described by one precompiled regular expression."""
+
+    def __init__(self, name: str, pattern: str, timestamp_parser: Optional[Callable[[str], Optional[float]]] = None,
+                 int_fields: Iterable[str] = (), prefix: Optional[str] = None):
+        self.name = name
+        self.regex = re.compile(pattern)
+        self.timestamp_parser = timestamp_parser
+        self.int_fields = tuple(int_fields)
+        # Cheap first-character check that rejects most non-matching lines before the regex runs
+        self.prefix = prefix
+
+    def parse(self, line: str) -> Optional[Dict[str, Any]]:
+        """Return the template's fields for a line, or None if it does not match."""
+        if self.prefix is not None and not line.startswith(self.prefix):
+            return None
+        match = self.regex.match(line)
+        if match is None:
+            return None
+        fields = {key: value for key, value in match.groupdict().items() if value is not None and value != "-"}
+        for key in self.int_fields:
+            if key in fields:
+                try:
+                    fields[key] = int(fields[key])
+                except ValueError:
+                    del fields[key]
+        if "timestamp" in fields and self.timestamp_parser is not None:
+            fields["timestamp"] = self.timestamp_parser(fields["timestamp"])
+        return fields
+
+class WindowsEventTemplate:
+    """Windows event log records exported as one JSON object per line."""
+
+    name = "windows_event"
+
+    # Security log event IDs that map onto the generic event vocabulary
+    EVENTS = {4624: "successful login", 4625: "failed login", 4720: "user created", 4740: "account locked out"}
+    FIELD_MAP = {
+        "Computer": "host", "ProviderName": "program", "SourceName": "program", "Message": "message",
+        "IpAddress": "source_ip", "IpPort": "source_port", "TargetUserName": "user", "SubjectUserName": "subject_user",
+        "LogonType": "logon_type", "ProcessName": "process", "Channel": "channel", "Level": "level",
+    }
+
+    def parse(self, line: str) -> Optional[Dict[str, Any]]:
+        """Return normalized fields for a Windows event JSON line, or None if it is not one."""
+        if not line.startswith("{"):
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict):
+            return None
+        event_id = record.get("EventID", record.get("EventId", record.get("event_id")))
+        if event_id is None:
+            return None
+        # Event data is either flattened into the record or nested under EventData
+        data = dict(record)
+        if isinstance(record.get("EventData"), dict):
+            data.update(record["EventData"])
+        fields: Dict[str, Any] = {}
+        for key, target in self.FIELD_MAP.items():
+            value = data.get(key)
+            if value not in (None, "", "-"):
+                fields.setdefault(target, value)
+        try:
+            fields["event_id"] = int(event_id)
+        except (TypeError, ValueError):
+            fields["event_id"] = event_id
+        if fields["event_id"] in self.EVENTS:
+            fields["event"] = self.EVENTS[fields["event_id"]]
+        if "source_port" in fields:
+            try:
+                fields["source_port"] = int(fields["source_port"])
+            except (TypeError, ValueError):
+                del fields["source_port"]
+        created = data.get("TimeCreated", data.get("TimeGenerated"))
+        if isinstance(created, dict):
+            created = created.get("SystemTime")
+        if isinstance(created, (int, float)):
+            fields["timestamp"] = float(created)
+        elif isinstance(created, str):
+            fields["timestamp"] = parse_iso_timestamp(created)
+        return fields
+
+SYSLOG_RFC5424 = RegexTemplate(
+    "syslog_rfc5424",
+    r"<(?P<priority>\d{1,3})>1 (?P<timestamp>\S+) (?P<host>\S+) (?P<program>\S+) (?P<pid>\S+) (?P<msgid>\S+) "
+    r"(?:-|(?:\[.*?\])+) ?(?P<message>.*)$",
+    parse_iso_timestamp, int_fields=("priority", "pid"), prefix="<"
+)
+SYSLOG_RFC3164 = RegexTemplate(
+    "syslog_rfc3164",
+    r"(?:<(?P<priority>\d{1,3})>)?(?P<timestamp>[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d) (?P<host>\S+) "
+    r"(?P<program>[^\s\[:]+)(?:\[(?P<pid>\d+)\])?: (?P<message>.*)$",
+    parse_rfc3164_timestamp, int_fields=("priority", "pid")
+)
+# Apache and Nginx share the combined format; the referrer/agent tail is optional for common log format
+ACCESS_COMBINED = RegexTemplate(
+    "access_combined",
+    r'(?P<source_ip>[0-9A-Fa-f.:]+) \S+ (?P<user>\S+) \[(?P<timestamp>[^\]]+)\] '
+    r'"(?P<http_method>[A-Z]+) (?P<url>\S+)(?: (?P<http_version>[^"]*))?" (?P<status>\d{3}) (?P<bytes>\d+|-)'
+    r'(?: "(?P<referrer>[^"]*)" "(?P<user_agent>[^"]*)")?',
+    parse_clf_timestamp, int_fields=("status", "bytes")
+)
+WINDOWS_EVENT = WindowsEventTemplate()
+
+DEFAULT_TEMPLATES = [SYSLOG_RFC5424, SYSLOG_RFC3164, ACCESS_COMBINED, WINDOWS_EVENT]
+
+# sshd authentication messages carried inside syslog records
+SSHD_MESSAGES = [
+    (re.compile(r"Failed (?P<auth_method>\S+) for (?:invalid user )?(?P<user>\S+) from (?P<source_ip>\S+) "
+                r"port (?P<source_port>\d+)"), "failed login"),
+    (re.compile(r"Accepted (?P<auth_method>\S+) for (?P<user>\S+) from (?P<source_ip>\S+) "
+                r"port (?P<source_port>\d+)"), "successful login"),
+    (re.compile(r"Invalid user (?P<user>\S*) from (?P<source_ip>\S+)(?: port (?P<source_port>\d+))?"), "invalid user"),
+    (re.compile(r"Disconnected from (?:authenticating |invalid )?(?:user (?P<user>\S+) )?(?P<source_ip>\S+) "
+                r"port (?P<source_port>\d+)"), "disconnected"),
+]
+MESSAGE_TEMPLATES = {"sshd": SSHD_MESSAGES}
+
+class LogParser:
+    """Normalizes log lines, auto-detecting and caching the format of each source."""
+
+    def __init__(self, templates: Optional[List] = None, keep_raw: bool = False, max_sources: int = 4096):
+        self.templates = templates if templates is not None else list(DEFAULT_TEMPLATES)
+        self.keep_raw = keep_raw
+        self.max_sources = max_sources
+        self.source_templates: Dict[str, Any] = {}
+        self.stats = {"lines": 0, "parsed": 0, "unparsed": 0, "redetected": 0}
+
+    def parse(self, line: str, source: Optional[str] = None) -> Dict[str, Any]:
+        """Normalize one log line into an event dict."""
+        line = line.rstrip("\r\n")
+        self.stats["lines"] += 1
+        key = source or "unknown"
+        template = self.source_templates.get(key)
+        fields = template.parse(line) if template is not None else None
+        if fields is None:
+            template, fields = self._detect(line)
+            if template is not None:
+                if key in self.source_templates:
+                    self.stats["redetected"] += 1
+                elif len(self.source_templates) >= self.max_sources:
+                    self.source_templates.pop(next(iter(self.source_templates)))
+                self.source_templates[key] = template
+
+        if fields is None:
+            self.stats["unparsed"] += 1
+            return {"log": line, "timestamp": None, "source": key}
+
+        self.stats["parsed"] += 1
+        event = {"timestamp": fields.pop("timestamp", None), "source": key, "log_format": template.name}
+        event.update(fields)
+        message_templates = MESSAGE_TEMPLATES.get(event.get("program"))
+        if message_templates and "message" in event:
+            self._parse_message(event, message_templates)
+        if self.keep_raw:
+            event["log"] = line
+        return event
+
+    def _detect(self, line: str):
+        for template in self.templates:
+            fields = template.parse(line)
+            if fields is not None:
+                return template, fields
+        return None, None
+
+    @staticmethod
+    def _parse_message(event: Dict[str, Any], templates: List):
+        message = event["message"]
+        for regex, name in templates:
+            match = regex.match(message)
+            if match is None:
+                continue
+            event["event"] = name
+            for key, value in match.groupdict().items():
+                if value is not None:
+                    event[key] = int(value) if key == "source_port" else value
+            return
+
+# Global parser instance
+_log_parser = LogParser()
+
+def get_log_parser() -> LogParser:
+    """Get the global log parser instance."""
+    return _log_parser
+
+if __name__ == "__main__":
+    parser = LogParser()
+    for sample in [
+        "Oct 11 22:14:15 server sshd[4721]: Failed password for invalid user admin from 203.0.113.9 port 52144 ssh2",
+        '<34>1 2024-03-01T12:00:00.123Z host app 1234 ID47 - Application started',
+        '192.168.1.100 - - [10/Oct/2023:13:55:36 -0700] "GET /login.php HTTP/1.1" 200 2326 "-" "curl/8.0"',
+        '{"EventID": 4625, "Computer": "DC01", "TimeCreated": "2024-03-01T12:00:00Z", "IpAddress": "10.0.0.5"}',
+    ]:
+        print(parser.parse(sample, source="demo-" + sample[:2]))
@@ -0,0 +1,152 @@
+"""
+Fast Packet Parser for the Cybersecurity Threat Detection System.
+Decodes Ethernet/IPv4/IPv6/TCP/UDP headers straight from raw frame bytes without scapy dissection.
+"""
+
+import socket
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+VLAN_ETHERTYPES = (0x8100, 0x88A8, 0x9100)
+
+# Field order of parse_header_fields tuples (normalized fields minus timestamp)
+PACKET_FIELDS = ("source_ip", "destination_ip", "protocol", "length", "payload",
+                 "source_port", "destination_port", "tcp_flags")
+
+PROTO_TCP = 6
+PROTO_UDP = 17
+# IPv6 extension headers that are skipped to reach the transport header
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+IPV6_FRAGMENT_HEADER = 44
+IPV6_AUTH_HEADER = 51
+
+_ETHERTYPE = struct.Struct("!H")
+_IPV4_HEADER = struct.Struct("!BBHHHBB")
+_PORTS = struct.Struct("!HH")
+
+# Same letter order scapy uses when rendering TCP flags
+_TCP_FLAG_LETTERS = "FSRPAUECN"
+TCP_FLAG_STRINGS = tuple(
+    "".join(letter for bit, letter in enumerate(_TCP_FLAG_LETTERS) if value & (1 << bit))
+    for value in range(512)
+)
+
+def parse_packet(data: bytes, timestamp: Optional[float] = None,
+                 linktype: int = LINKTYPE_ETHERNET) -> Optional[Dict[str, Any]]:
+    """Parse a raw frame into normalized fields, or return None if a scapy fallback is needed.
+
+    The payload is a memoryview over ``data`` (no copy) holding the transport payload,
+    or the IP payload for protocols other than TCP/UDP.
+    """
+    fields = parse_header_fields(data, linktype)
+    if fields is None:
+        return None
+    source_ip, destination_ip, protocol, length, payload, source_port, destination_port, tcp_flags = fields
+    return {
+        "timestamp": timestamp,
+        "source_ip": source_ip,
+        "destination_ip": destination_ip,
+        "protocol": protocol,
+        "length": length,
+        "payload": payload,
+        "source_port": source_port,
+        "destination_port": destination_port,
+        "tcp_flags": tcp_flags
+    }
+
+def parse_header_fields(data: bytes, linktype: int = LINKTYPE_ETHERNET) -> Optional[Tuple]:
+    """Parse a raw frame into a tuple of normalized fields in PACKET_FIELDS order, without building a dict."""
+    view = memoryview(data)
+    if linktype == LINKTYPE_ETHERNET:
+        if len(view) < 14:
+            return None
+        offset = 12
+        ethertype = _ETHERTYPE.unpack_from(view, offset)[0]
+        while ethertype in VLAN_ETHERTYPES and len(view) >= offset + 6:
+            offset += 4
+            ethertype = _ETHERTYPE.unpack_from(view, offset)[0]
+        offset += 2
+    elif linktype == LINKTYPE_RAW:
+        if not len(view):
+            return None
+        offset = 0
+        version = view[0] >> 4
+        ethertype = ETHERTYPE_IPV4 if version == 4 else ETHERTYPE_IPV6 if version == 6 else None
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if len(view) < 16:
+            return None
+        offset = 16
+        ethertype = _ETHERTYPE.unpack_from(view, 14)[0]
+    else:
+        return None
+
+    if ethertype == ETHERTYPE_IPV4:
+        return _parse_ipv4(view, offset)
+    if ethertype == ETHERTYPE_IPV6:
+        return _parse_ipv6(view, offset)
+    return None
+
+def _parse_ipv4(view: memoryview, offset: int) -> Optional[Tuple]:
+    if len(view) < offset + 20:
+        return None
+    version_ihl, _, total_length, _, fragment, _, protocol = _IPV4_HEADER.unpack_from(view, offset)
+    if version_ihl >> 4 != 4:
+        return None
+    header_length = (version_ihl & 0x0F) * 4
+    # Ethernet frames may carry trailing padding beyond the IP datagram
+    end = min(len(view), offset + total_length) if total_length else len(view)
+    start = offset + header_length
+    # Non-first fragments carry no transport header
+    has_transport = (fragment & 0x1FFF) == 0
+    return _transport_fields(
+        view,
+        socket.inet_ntoa(view[offset + 12:offset + 16]),
+        socket.inet_ntoa(view[offset + 16:offset + 20]),
+        protocol, start, end, has_transport
+    )
+
+def _parse_ipv6(view: memoryview, offset: int) -> Optional[Tuple]:
+    if len(view) < offset + 40:
+        return None
+    if view[offset] >> 4 != 6:
+        return None
+    payload_length = _ETHERTYPE.unpack_from(view, offset + 4)[0]
+    next_header = view[offset + 6]
+    source_ip = socket.inet_ntop(socket.AF_INET6, view[offset + 8:offset + 24])
+    destination_ip = socket.inet_ntop(socket.AF_INET6, view[offset + 24:offset + 40])
+    end = min(len(view), offset + 40 + payload_length) if payload_length else len(view)
+    start = offset + 40
+    has_transport = True
+    while next_header in IPV6_EXTENSION_HEADERS or next_header in (IPV6_FRAGMENT_HEADER, IPV6_AUTH_HEADER):
+        if start + 8 > end:
+            return None
+        header_type = next_header
+        next_header = view[start]
+        if header_type == IPV6_FRAGMENT_HEADER:
+            has_transport = (_ETHERTYPE.unpack_from(view, start + 2)[0] >> 3) == 0
+            start += 8
+        elif header_type == IPV6_AUTH_HEADER:
+            start += (view[start + 1] + 2) * 4
+        else:
+            start += (view[start + 1] + 1) * 8
+    return _transport_fields(view, source_ip, destination_ip, next_header, start, end, has_transport)
+
+def _transport_fields(view: memoryview, source_ip: str, destination_ip: str, protocol: int,
+                      start: int, end: int, has_transport: bool) -> Tuple:
+    source_port = destination_port = tcp_flags = None
+    if has_transport and protocol == PROTO_TCP and end - start >= 20:
+        source_port, destination_port = _PORTS.unpack_from(view, start)
+        tcp_flags = TCP_FLAG_STRINGS[((view[start + 12] & 0x01) << 8) | view[start + 13]]
+        start += (view[start + 12] >> 4) * 4
+    elif has_transport and protocol == PROTO_UDP and end - start >= 8:
+        source_port, destination_port = _PORTS.unpack_from(view, start)
+        start += 8
+    return (source_ip, destination_ip, protocol, len(view), view[min(start, end):end],
+            source_port, destination_port, tcp_flags)
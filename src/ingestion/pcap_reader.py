@@ -0,0 +1,122 @@
+"""
+PCAP Reader for the Cybersecurity Threat Detection System.
+Streams classic PCAP files record by record and splits them into byte-range shards.
+"""
+
+import os
+import struct
+from collections import namedtuple
+from typing import Iterator, List, Optional, Tuple
+
+PCAP_GLOBAL_HEADER_SIZE = 24
+PCAP_RECORD_HEADER_SIZE = 16
+PCAPNG_MAGIC = 0x0A0D0D0A
+MAX_RECORD_SIZE = 262144
+# Records more than this far from the first packet are treated as misaligned while resyncing
+MAX_TIMESTAMP_SKEW = 365 * 24 * 3600
+
+# magic number -> (byte order, timestamp fraction divisor)
+PCAP_MAGICS = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e9),
+}
+
+PcapHeader = namedtuple("PcapHeader", ["byte_order", "ts_divisor", "snaplen", "linktype"])
+PcapShard = namedtuple("PcapShard", ["path", "index", "start", "end"])
+
+def is_pcapng(path: str) -> bool:
+    """Return True if the file is in pcapng rather than classic PCAP format."""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    return len(magic) == 4 and struct.unpack("<I", magic)[0] == PCAPNG_MAGIC
+
+def read_global_header(path: str) -> PcapHeader:
+    """Parse the classic PCAP global header."""
+    with open(path, "rb") as f:
+        raw = f.read(PCAP_GLOBAL_HEADER_SIZE)
+    if len(raw) < PCAP_GLOBAL_HEADER_SIZE or raw[:4] not in PCAP_MAGICS:
+        raise ValueError(f"Not a classic PCAP file: {path}")
+    byte_order, ts_divisor = PCAP_MAGICS[raw[:4]]
+    snaplen, linktype = struct.unpack(byte_order + "II", raw[16:24])
+    return PcapHeader(byte_order, ts_divisor, snaplen or MAX_RECORD_SIZE, linktype & 0x0FFFFFFF)
+
+def plan_shards(path: str, shard_bytes: int) -> List[PcapShard]:
+    """Split a PCAP file into byte ranges of roughly shard_bytes each."""
+    size = os.path.getsize(path)
+    shards = []
+    start = PCAP_GLOBAL_HEADER_SIZE
+    index = 0
+    while start < size:
+        end = min(size, start + shard_bytes)
+        shards.append(PcapShard(path, index, start, end))
+        start = end
+        index += 1
+    return shards
+
+class PcapRecordReader:
+    """Sequential reader over the records of one byte range of a PCAP file."""
+
+    def __init__(self, path: str, header: Optional[PcapHeader] = None,
+                 start: int = PCAP_GLOBAL_HEADER_SIZE, end: Optional[int] = None,
+                 buffer_size: int = 1 << 20):
+        self.path = path
+        self.header = header or read_global_header(path)
+        self.start = start
+        self.end = os.path.getsize(path) if end is None else end
+        self.buffer_size = buffer_size
+        self._record = struct.Struct(self.header.byte_order + "IIII")
+
+    def __iter__(self) -> Iterator[Tuple[float, int, bytes]]:
+        """Yield (timestamp, original length, captured bytes) for each record starting in range."""
+        with open(self.path, "rb", buffering=self.buffer_size) as f:
+            offset = self.start
+            if offset > PCAP_GLOBAL_HEADER_SIZE:
+                offset = self.find_record_boundary(f, offset)
+                if offset is None:
+                    return
+            f.seek(offset)
+            unpack = self._record.unpack
+            divisor = self.header.ts_divisor
+            while offset < self.end:
+                raw = f.read(PCAP_RECORD_HEADER_SIZE)
+                if len(raw) < PCAP_RECORD_HEADER_SIZE:
+                    return
+                ts_sec, ts_frac, incl_len, orig_len = unpack(raw)
+                data = f.read(incl_len)
+                if len(data) < incl_len:
+                    return
+                yield ts_sec + ts_frac / divisor, orig_len, data
+                offset += PCAP_RECORD_HEADER_SIZE + incl_len
+
+    def find_record_boundary(self, f, offset: int, chain: int = 4) -> Optional[int]:
+        """Scan forward from offset to the first position that starts a chain of valid record headers."""
+        f.seek(PCAP_GLOBAL_HEADER_SIZE)
+        first = f.read(PCAP_RECORD_HEADER_SIZE)
+        reference_ts = self._record.unpack(first)[0] if len(first) == PCAP_RECORD_HEADER_SIZE else 0
+        window = MAX_RECORD_SIZE + chain * (MAX_RECORD_SIZE + PCAP_RECORD_HEADER_SIZE)
+        f.seek(offset)
+        data = f.read(window)
+        file_end = os.path.getsize(self.path)
+        for candidate in range(0, min(len(data), self.end - offset)):
+            if self._valid_chain(data, candidate, chain, offset, file_end, reference_ts):
+                return offset + candidate
+        return None
+
+    def _valid_chain(self, data: bytes, position: int, chain: int, base: int,
+                     file_end: int, reference_ts: int) -> bool:
+        ts_limit = self.header.ts_divisor
+        for _ in range(chain):
+            if base + position == file_end:
+                return True
+            if position + PCAP_RECORD_HEADER_SIZE > len(data):
+                return False
+            ts_sec, ts_frac, incl_len, orig_len = self._record.unpack_from(data, position)
+            if (abs(ts_sec - reference_ts) > MAX_TIMESTAMP_SKEW or ts_frac >= ts_limit or orig_len == 0
+                    or incl_len > self.header.snaplen or incl_len > orig_len or orig_len > MAX_RECORD_SIZE):
+                return False
+            position += PCAP_RECORD_HEADER_SIZE + incl_len
+            if base + position > file_end:
+                return False
+        return True
@@ -0,0 +1,189 @@
+"""
+Wire Format for the Cybersecurity Threat Detection System.
+Versioned compact binary encoding of normalized events for the Kafka path, with JSON as a debug option.
+"""
+
+import json
+import socket
+import struct
+from decimal import Decimal
+from typing import Any, Dict
+from .packet_parser import TCP_FLAG_STRINGS
+from ..utils.event_batch import ALL_FIELDS_PRESENT, FIELD_BITS, FIELDS, field_value_fits
+
+# Version 1 layout (network byte order):
+#   magic u8 | version u8 | present u16 | nulls u16
+#   timestamp f64 | protocol u16 | length u32 | source_port u16 | destination_port u16 | tcp_flags u16
+#   source_ip, destination_ip: family u8 (0 = absent, 4, 6) + 4/16 address bytes
+#   payload: u32 length + raw bytes          (when present and not None)
+#   extras: u32 length + UTF-8 JSON object   (keys outside the fixed schema)
+WIRE_MAGIC = 0xCE  # never the first byte of a JSON document
+WIRE_VERSION = 1
+
+PAYLOAD_TEXT_BIT = 1 << 14
+EXTRAS_BIT = 1 << 15
+
+_HEADER = struct.Struct("!BBHH")
+_FIXED = struct.Struct("!dHIHHH")
+_LENGTH = struct.Struct("!I")
+
+_FAMILY_NONE = 0
+_FAMILY_IPV4 = 4
+_FAMILY_IPV6 = 6
+
+_TCP_FLAG_VALUES = {flags: value for value, flags in enumerate(TCP_FLAG_STRINGS)}
+_UINT_LIMITS = {"protocol": 0xFFFF, "length": 0xFFFFFFFF, "source_port": 0xFFFF, "destination_port": 0xFFFF}
+
+def _json_default(value: Any) -> Any:
+    """Encode raw payload buffers and scapy decimal timestamps for JSON."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # latin-1 maps every byte to one code point, so the payload round-trips losslessly
+        return bytes(value).decode('latin-1')
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_json(event: Dict[str, Any]) -> bytes:
+    """Encode an event as UTF-8 JSON (debug format)."""
+    return json.dumps(event, default=_json_default).encode('utf-8')
+
+def _pack_ip(value: str) -> bytes:
+    try:
+        return bytes((_FAMILY_IPV4,)) + socket.inet_pton(socket.AF_INET, value)
+    except OSError:
+        return bytes((_FAMILY_IPV6,)) + socket.inet_pton(socket.AF_INET6, value)
+
+def _fits_wire(key: str, value: Any) -> bool:
+    if value is None:
+        return True
+    if not field_value_fits(key, value):
+        return False
+    if key in _UINT_LIMITS:
+        return value <= _UINT_LIMITS[key]
+    if key == "tcp_flags":
+        return value in _TCP_FLAG_VALUES
+    if key in ("source_ip", "destination_ip"):
+        try:
+            _pack_ip(value)
+            return True
+        except OSError:
+            return False
+    return True
+
+def encode_event(event: Dict[str, Any]) -> bytes:
+    """Encode a normalized event in the compact binary format."""
+    present = nulls = 0
+    values: Dict[str, Any] = {}
+    extras: Dict[str, Any] = {}
+    for key, value in event.items():
+        bit = FIELD_BITS.get(key)
+        if bit is None or not _fits_wire(key, value):
+            extras[key] = value
+            continue
+        present |= bit
+        if value is None:
+            nulls |= bit
+        else:
+            values[key] = value
+
+    payload = values.get("payload")
+    if isinstance(payload, str):
+        present |= PAYLOAD_TEXT_BIT
+        payload = payload.encode('utf-8', 'surrogatepass')
+    if extras:
+        present |= EXTRAS_BIT
+
+    parts = [
+        _HEADER.pack(WIRE_MAGIC, WIRE_VERSION, present, nulls),
+        _FIXED.pack(
+            float(values.get("timestamp", 0.0)),
+            values.get("protocol", 0),
+            values.get("length", 0),
+            values.get("source_port", 0),
+            values.get("destination_port", 0),
+            _TCP_FLAG_VALUES[values["tcp_flags"]] if "tcp_flags" in values else 0
+        ),
+        _pack_ip(values["source_ip"]) if "source_ip" in values else b"\x00",
+        _pack_ip(values["destination_ip"]) if "destination_ip" in values else b"\x00",
+    ]
+    if payload is not None:
+        parts.append(_LENGTH.pack(len(payload)))
+        parts.append(payload)
+    if extras:
+        encoded_extras = encode_json(extras)
+        parts.append(_LENGTH.pack(len(encoded_extras)))
+        parts.append(encoded_extras)
+    return b"".join(parts)
+
+def _unpack_ip(view: memoryview, offset: int):
+    family = view[offset]
+    if family == _FAMILY_IPV4:
+        return socket.inet_ntop(socket.AF_INET, view[offset + 1:offset + 5]), offset + 5
+    if family == _FAMILY_IPV6:
+        return socket.inet_ntop(socket.AF_INET6, view[offset + 1:offset + 17]), offset + 17
+    return None, offset + 1
+
+def decode_event(data: bytes, text_payloads: bool = True) -> Dict[str, Any]:
+    """Decode a binary event.
+
+    Binary payloads come back as latin-1 text, matching what the JSON path delivers,
+    unless text_payloads is False, in which case they are zero-copy memoryviews.
+    """
+    view = memoryview(data)
+    magic, version, present, nulls = _HEADER.unpack_from(view, 0)
+    if magic != WIRE_MAGIC:
+        raise ValueError("Not a binary-encoded event")
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire format version: {version}")
+    timestamp, protocol, length, source_port, destination_port, tcp_flags = _FIXED.unpack_from(view, _HEADER.size)
+    offset = _HEADER.size + _FIXED.size
+    source_ip, offset = _unpack_ip(view, offset)
+    destination_ip, offset = _unpack_ip(view, offset)
+
+    payload = None
+    if present & FIELD_BITS["payload"] and not nulls & FIELD_BITS["payload"]:
+        size = _LENGTH.unpack_from(view, offset)[0]
+        offset += _LENGTH.size
+        payload = view[offset:offset + size]
+        offset += size
+        if present & PAYLOAD_TEXT_BIT:
+            payload = str(payload, 'utf-8', 'surrogatepass')
+        elif text_payloads:
+            payload = str(payload, 'latin-1')
+
+    event = {
+        "timestamp": timestamp,
+        "source_ip": source_ip,
+        "destination_ip": destination_ip,
+        "protocol": protocol,
+        "length": length,
+        "payload": payload,
+        "source_port": source_port,
+        "destination_port": destination_port,
+        "tcp_flags": TCP_FLAG_STRINGS[tcp_flags],
+    }
+    # Packets normally carry every field, so only sparse events pay for the per-field walk
+    if (present & ALL_FIELDS_PRESENT) != ALL_FIELDS_PRESENT or nulls:
+        decoded = event
+        event = {}
+        for name in FIELDS:
+            bit = FIELD_BITS[name]
+            if present & bit:
+                event[name] = None if nulls & bit else decoded[name]
+    if present & EXTRAS_BIT:
+        size = _LENGTH.unpack_from(view, offset)[0]
+        offset += _LENGTH.size
+        event.update(json.loads(bytes(view[offset:offset + size])))
+    return event
+
+def encode_message(event: Dict[str, Any], wire_format: str = "binary") -> bytes:
+    """Serialize an event for Kafka in the configured wire format."""
+    if wire_format == "json":
+        return encode_json(event)
+    return encode_event(event)
+
+def decode_message(data: bytes) -> Dict[str, Any]:
+    """Deserialize a Kafka message, detecting binary or JSON encoding from the first byte."""
+    if data and data[0] == WIRE_MAGIC:
+        return decode_event(data)
+    return json.loads(data.decode('utf-8'))
@@ -0,0 +1,226 @@
+"""
+Columnar event batches for the Cybersecurity Threat Detection System.
+Stores normalized events as NumPy structured arrays plus a shared payload buffer.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import numpy as np
+
+# Normalized event fields held in fixed columns; anything else lives in per-row extras
+FIELDS = ("timestamp", "source_ip", "destination_ip", "protocol", "length", "payload",
+          "source_port", "destination_port", "tcp_flags")
+FIELD_BITS = {name: 1 << i for i, name in enumerate(FIELDS)}
+ALL_FIELDS_PRESENT = (1 << len(FIELDS)) - 1
+
+EVENT_DTYPE = np.dtype([
+    ("present", "u2"),            # bitmask of FIELDS keys present in the source event
+    ("timestamp", "f8"),          # NaN when None
+    ("source_ip", "i4"),          # index into the batch string table, -1 when None
+    ("destination_ip", "i4"),
+    ("protocol", "i2"),           # -1 when None
+    ("length", "i8"),             # -1 when None
+    ("source_port", "i4"),        # -1 when None
+    ("destination_port", "i4"),   # -1 when None
+    ("tcp_flags", "i4"),          # index into the batch string table, -1 when None
+    ("payload_offset", "i8"),
+    ("payload_length", "i4"),     # -1 when None
+    ("payload_is_text", "?"),
+])
+
+_INT_FIELDS = ("protocol", "length", "source_port", "destination_port")
+# Largest value each integer column holds; larger values stay in extras
+_INT_MAX = {name: int(np.iinfo(EVENT_DTYPE[name]).max) for name in _INT_FIELDS}
+STRING_FIELDS = ("source_ip", "destination_ip", "tcp_flags")
+
+def field_value_fits(key: str, value: Any) -> bool:
+    """Return True if a value can be stored in the fixed column for a normalized field."""
+    if value is None:
+        return True
+    if key in _INT_FIELDS:
+        return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= _INT_MAX[key]
+    if key in STRING_FIELDS:
+        return isinstance(value, str)
+    if key == "timestamp":
+        try:
+            float(value)
+            return True
+        except (TypeError, ValueError, OverflowError):
+            return False
+    return isinstance(value, (str, bytes, bytearray, memoryview))
+
+class EventBatchBuilder:
+    """Accumulates events column by column and freezes them into an EventBatch."""
+
+    def __init__(self):
+        self._rows: List[tuple] = []
+        self._strings: Dict[str, int] = {}
+        self._payloads: List[bytes] = []
+        self._payload_size = 0
+        self._extras: List[Optional[Dict[str, Any]]] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._strings.get(value)
+        if code is None:
+            code = self._strings[value] = len(self._strings)
+        return code
+
+    def _add_payload(self, payload: Any) -> tuple:
+        if payload is None:
+            return 0, -1, False
+        is_text = isinstance(payload, str)
+        data = payload.encode("utf-8", "surrogatepass") if is_text else payload
+        offset = self._payload_size
+        self._payloads.append(data)
+        self._payload_size += len(data)
+        return offset, len(data), is_text
+
+    def append(self, event: Dict[str, Any]):
+        """Add one event dict; values that do not fit their column are kept as extras."""
+        present = 0
+        extras = None
+        values = {}
+        for key, value in event.items():
+            bit = FIELD_BITS.get(key)
+            if bit is None or not field_value_fits(key, value):
+                if extras is None:
+                    extras = {}
+                extras[key] = value
+                continue
+            present |= bit
+            values[key] = value
+        timestamp = values.get("timestamp")
+        payload_offset, payload_length, payload_is_text = self._add_payload(values.get("payload"))
+        self._rows.append((
+            present,
+            float(timestamp) if timestamp is not None else np.nan,
+            self._intern(values.get("source_ip")),
+            self._intern(values.get("destination_ip")),
+            self._int(values.get("protocol")),
+            self._int(values.get("length")),
+            self._int(values.get("source_port")),
+            self._int(values.get("destination_port")),
+            self._intern(values.get("tcp_flags")),
+            payload_offset,
+            payload_length,
+            payload_is_text,
+        ))
+        self._extras.append(extras)
+
+    def append_packet(self, timestamp: Optional[float], fields: tuple):
+        """Add a packet parsed by parse_header_fields without building an intermediate dict."""
+        source_ip, destination_ip, protocol, length, payload, source_port, destination_port, tcp_flags = fields
+        payload_offset, payload_length, payload_is_text = self._add_payload(payload)
+        self._rows.append((
+            ALL_FIELDS_PRESENT,
+            float(timestamp) if timestamp is not None else np.nan,
+            self._intern(source_ip),
+            self._intern(destination_ip),
+            self._int(protocol),
+            length,
+            self._int(source_port),
+            self._int(destination_port),
+            self._intern(tcp_flags),
+            payload_offset,
+            payload_length,
+            payload_is_text,
+        ))
+        self._extras.append(None)
+
+    def build(self) -> "EventBatch":
+        """Freeze the accumulated rows into an EventBatch."""
+        columns = np.array(self._rows, dtype=EVENT_DTYPE) if self._rows else np.zeros(0, dtype=EVENT_DTYPE)
+        strings = [None] * len(self._strings)
+        for value, code in self._strings.items():
+            strings[code] = value
+        return EventBatch(columns, strings, b"".join(self._payloads), self._extras)
+
+    @staticmethod
+    def _int(value: Optional[int]) -> int:
+        return -1 if value is None else int(value)
+
+class EventBatch:
+    """Columnar batch of normalized events with a dict-per-event compatibility view."""
+
+    def __init__(self, columns: np.ndarray, strings: List[str], payload_buffer: bytes,
+                 extras: Optional[List[Optional[Dict[str, Any]]]] = None):
+        self.columns = columns
+        self.strings = strings
+        self.payload_buffer = payload_buffer
+        self.extras = extras if extras is not None else [None] * len(columns)
+        self._payload_view = memoryview(payload_buffer)
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict[str, Any]]) -> "EventBatch":
+        """Build a batch from normalized event dicts."""
+        builder = EventBatchBuilder()
+        for event in events:
+            builder.append(event)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self.event(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self.columns)):
+            yield self.event(index)
+
+    def has_field(self, name: str) -> np.ndarray:
+        """Boolean mask of rows whose source event carried the given fixed field."""
+        return (self.columns["present"] & FIELD_BITS[name]) != 0
+
+    def string_column(self, name: str) -> np.ndarray:
+        """Decode a string-table column into an object array (None where missing)."""
+        table = np.array(self.strings + [None], dtype=object)
+        return table[self.columns[name]]
+
+    def payload(self, index: int) -> Optional[Any]:
+        """Return a row's payload as a zero-copy view, or text if it arrived as text."""
+        row = self.columns[index]
+        length = int(row["payload_length"])
+        if length < 0:
+            return None
+        offset = int(row["payload_offset"])
+        view = self._payload_view[offset:offset + length]
+        return bytes(view).decode("utf-8", "surrogatepass") if row["payload_is_text"] else view
+
+    def event(self, index: int) -> Dict[str, Any]:
+        """Materialize one row as an event dict."""
+        row = self.columns[index]
+        present = int(row["present"])
+        event: Dict[str, Any] = {}
+        for name in FIELDS:
+            if not present & FIELD_BITS[name]:
+                continue
+            if name == "payload":
+                event[name] = self.payload(index)
+            elif name == "timestamp":
+                value = float(row[name])
+                event[name] = None if np.isnan(value) else value
+            elif name in STRING_FIELDS:
+                code = int(row[name])
+                event[name] = None if code < 0 else self.strings[code]
+            else:
+                value = int(row[name])
+                event[name] = None if value < 0 else value
+        extras = self.extras[index]
+        if extras:
+            event.update(extras)
+        return event
+
+    def to_events(self) -> List[Dict[str, Any]]:
+        """Materialize every row as an event dict."""
+        return [self.event(index) for index in range(len(self.columns))]
+
+    def take(self, indices: Sequence[int]) -> "EventBatch":
+        """Return a batch of the selected rows sharing this batch's buffers."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return EventBatch(self.columns[indices], self.strings, self.payload_buffer,
+                          [self.extras[i] for i in indices])
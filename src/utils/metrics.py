@@ -0,0 +1,50 @@
+"""
+Metrics registry for the Cybersecurity Threat Detection System.
+Collects in-process counters and gauges for throughput and health reporting.
+"""
+
+import threading
+from typing import Dict
+
+class MetricsRegistry:
+    """Thread-safe registry of named counters and gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+
+    def increment(self, name: str, value: float = 1):
+        """Increment a counter by the given value."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """Set a gauge to the given value."""
+        with self._lock:
+            self.gauges[name] = value
+
+    def get(self, name: str, default: float = 0) -> float:
+        """Get the current value of a counter or gauge."""
+        with self._lock:
+            if name in self.counters:
+                return self.counters[name]
+            return self.gauges.get(name, default)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Return a copy of all counters and gauges."""
+        with self._lock:
+            return {"counters": dict(self.counters), "gauges": dict(self.gauges)}
+
+    def reset(self):
+        """Clear all counters and gauges."""
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+
+# Global metrics instance
+_metrics = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    """Get the global metrics registry instance."""
+    return _metrics
@@ -0,0 +1,126 @@
+"""
+Test script for the bloom-filtered domain and hash indicator stores.
+Checks filter accuracy, exact lookups against the memory-mapped file, detector integration and memory at scale.
+"""
+
+import hashlib
+import os
+import random
+import tempfile
+import time
+import numpy as np
+from src.detection.bloom_filter import BloomFilter, indicator_digest
+from src.detection.detection_engine import DetectionEngine
+from src.detection.indicator_store import IndicatorStore, domain_candidates, normalize_hash
+from src.detection.ioc_detector import IOCDetector
+from src.utils.event_batch import EventBatch
+
+def test_bloom_filter_has_no_false_negatives_and_meets_its_rate():
+    """Every added value is found, and the observed false-positive rate is near the target."""
+    bloom = BloomFilter(20000, 0.01)
+    values = [f"member{i}.example" for i in range(20000)]
+    bloom.add_digests(np.array([indicator_digest(value) for value in values], dtype="S16"))
+    assert all(value in bloom for value in values)
+    false_positives = sum(1 for i in range(20000) if f"other{i}.example" in bloom)
+    assert false_positives / 20000 < 0.02
+    assert abs(bloom.stats()["expected_false_positive_rate"] - 0.01) < 0.005
+
+    single = BloomFilter(20000, 0.01)
+    for value in values:
+        single.add(value)
+    assert np.array_equal(single.array, bloom.array)
+
+def test_memory_budget_caps_the_filter():
+    """A budget smaller than the target rate needs shrinks the filter and the reported rate rises."""
+    bloom = BloomFilter(100000, 0.0001, max_memory_bytes=32 * 1024)
+    assert bloom.memory_bytes() <= 32 * 1024
+    for i in range(100000):
+        bloom.add(str(i))
+    assert bloom.stats()["expected_false_positive_rate"] > 0.0001
+
+def test_store_exact_lookups_and_persistence():
+    """Store lookups are exact, cover parent domains, and survive reopening from disk."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "domains.idx")
+        domains = [f"bad{i}.example.net" for i in range(5000)] + ["Evil.COM.", "localhost/", "not a domain"]
+        store = IndicatorStore.build(domains, path, "domain", false_positive_rate=0.2, indicator_type="phishing")
+        assert len(store) == 5001
+        with open(path, "rb") as f:
+            keys = f.read()
+        records = [keys[i:i + 16] for i in range(0, len(keys), 16)]
+        assert records == sorted(records)
+
+        store = IndicatorStore(path)
+        assert store.lookup("login.evil.com") == "evil.com"
+        assert store.lookup("https://bad42.example.net/x?y=1") == "bad42.example.net"
+        assert store.lookup("example.net") is None
+        # A loose filter lets misses through to the backing file, which must reject them all
+        misses = [f"good{i}.example.org" for i in range(5000)]
+        assert not any(store.lookup(value) for value in misses)
+        stats = store.stats()
+        assert stats["false_positives"] > 0 and stats["observed_false_positive_rate"] < 0.3
+        store.close()
+
+    assert domain_candidates("a.b.evil.com") == ["a.b.evil.com", "b.evil.com", "evil.com"]
+    assert normalize_hash("D41D8CD98F00B204E9800998ECF8427E") == "d41d8cd98f00b204e9800998ecf8427e"
+    assert normalize_hash("xyz") is None and normalize_hash("g" * 32) is None
+
+def test_detector_and_engine_integration():
+    """Domain and hash hits are reported per event and per batch, with stats exposed by the engine."""
+    with tempfile.TemporaryDirectory() as directory:
+        md5 = hashlib.md5(b"dropper").hexdigest()
+        feed = os.path.join(directory, "hashes.txt")
+        with open(feed, "w") as f:
+            f.write(f"# hash feed\n{md5},first seen 2024\n")
+        domains = IndicatorStore.build(["evil.com"], os.path.join(directory, "domains.idx"), "domain",
+                                       indicator_type="c2_domain", risk_score=90)
+        hashes = IndicatorStore.from_file(feed, os.path.join(directory, "hashes.idx"), "hash")
+
+        engine = DetectionEngine()
+        engine.load_indicator_stores([domains.path, hashes.path])
+        threats = engine.ioc_detector.detect({"dns_query": "cdn.evil.com", "md5": md5.upper(), "url": "/index.html"})
+        assert [(threat["field"], threat["type"], threat["risk_score"], threat["indicator"]) for threat in threats] == \
+            [("dns_query", "c2_domain", 90, "evil.com"), ("md5", "malicious_hash", 80, md5)]
+        assert [store["indicators"] for store in engine.indicator_stats()["stores"]] == [1, 1]
+
+        detector = IOCDetector(feeds=[], stores=[domains.path])
+        events = [{"source_ip": "10.0.0.1", "dns_query": f"host{i}.evil.com" if i % 3 == 0 else "ok.org"} for i in range(12)]
+        assert detector.detect_batch(EventBatch.from_events(events)) == [detector.detect(event) for event in events]
+
+def performance_test():
+    """Measure filter memory and lookup latency for a large domain feed against a Python set."""
+    print("\nTesting Bloom-Filtered Indicator Store at Scale...")
+    count = 2000000
+    with tempfile.TemporaryDirectory() as directory:
+        start_time = time.perf_counter()
+        store = IndicatorStore.build((f"d{i}.bad-example.net" for i in range(count)),
+                                     os.path.join(directory, "domains.idx"), "domain", false_positive_rate=0.001)
+        build = time.perf_counter() - start_time
+        random.seed(3)
+        queries = [f"www.site{random.randint(0, 10 ** 9)}.com" for _ in range(100000)]
+        start_time = time.perf_counter()
+        hits = sum(1 for query in queries if store.lookup(query))
+        lookup = (time.perf_counter() - start_time) / len(queries)
+        stats = store.stats()
+        print(f"{count} domains: build {build:.1f}s, filter {stats['memory_bytes'] / 1e6:.1f} MB "
+              f"({stats['hashes']} hashes), backing file {stats['backing_file_bytes'] / 1e6:.1f} MB on disk")
+        print(f"lookup {lookup * 1e6:.2f} us, {hits} hits, false-positive rate "
+              f"{stats['observed_false_positive_rate']:.5f} (expected {stats['expected_false_positive_rate']:.5f})")
+        store.close()
+
+    sample = {f"d{i}.bad-example.net" for i in range(200000)}
+    set_bytes = sum(len(value) + 49 for value in sample) + len(sample) * 16 * 2
+    print(f"Python set: ~{set_bytes * count / len(sample) / 1e6:.0f} MB estimated for {count} domains")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("BLOOM FILTER INDICATOR STORE TEST SUITE")
+    print("=" * 60)
+
+    test_bloom_filter_has_no_false_negatives_and_meets_its_rate()
+    test_memory_budget_caps_the_filter()
+    test_store_exact_lookups_and_persistence()
+    test_detector_and_engine_integration()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,145 @@
+"""
+Test script for the tiered detection pipeline.
+Checks header heuristics, allowlisting, short-circuits, the latency budget and degraded mode, and measures per-stage costs.
+"""
+
+import time
+from src.detection.detection_engine import DetectionEngine
+from src.detection.detection_pipeline import DetectionPipeline, Stage
+from src.detection.header_detector import HeaderDetector
+from src.ingestion.flow_table import FlowTable
+from src.utils.event_batch import EventBatch
+from test_batch_detection import make_events, trained_engine
+
+def probe_events(count: int, seed: int = 13):
+    """Shared events from three sources, with port 0 and crafted flag combinations mixed in."""
+    return make_events(count, seed, sources=["10.0.0.5", "172.16.0.9", "203.0.113.50"], ports=(0, 80, 443, 22),
+                       flags=("S", "A", "PA", "FA", "", "F", "FPU", "SF"))
+
+def timed_stage(name: str, now: list, risk_score: int = 0) -> Stage:
+    """Stage that advances the fake clock by the event's cost for it and reports one threat."""
+    def run(data, threats):
+        now[0] += data.get(name, 0.0) / 1000.0
+        return threats + [{"type": name, "risk_score": data.get("risk_score", risk_score)}]
+    return Stage(name, run, lambda batch, threat_lists: [threats + [{"type": name}] for threats in threat_lists],
+                 lambda threats: threats + [{"type": f"{name}_fallback"}])
+
+def test_header_heuristics():
+    """Crafted flag combinations and port 0 are flagged, ordinary packets are not, batched or not."""
+    detector = HeaderDetector()
+    assert not detector.detect({"protocol": 6, "tcp_flags": "SA", "destination_port": 443})
+    assert not detector.detect({"protocol": 17, "destination_port": 53}) and not detector.detect({"tcp_flags": ""})
+    for flags in ("", "F", "UPF", "SF", "FSA"):
+        assert detector.detect({"protocol": 6, "tcp_flags": flags, "destination_port": 80})[0]["type"] == "port_scan"
+    assert detector.detect({"protocol": 17, "destination_port": 0})
+    events = probe_events(500)
+    events.append({"protocol": 6, "tcp_flags": "F", "destination_port": 80, "event": "probe"})
+    batched = detector.detect_batch(EventBatch.from_events(events))
+    assert batched == [detector.detect(event) for event in events] and sum(map(bool, batched)) > 250
+
+def test_headers_ignore_flow_summaries():
+    """A completed TCP flow's combined flags ("FSPA") are not a SYN+FIN probe; port 0 still counts."""
+    flows = []
+    table = FlowTable(flows.append, max_flows=10, idle_timeout=15, active_timeout=60)
+    for port in (443, 0):
+        for offset, flags in enumerate(("S", "A", "PA", "FA")):
+            table.add({"timestamp": 100.0 + offset, "source_ip": "10.0.0.1", "destination_ip": "10.0.0.2",
+                       "protocol": 6, "length": 60, "source_port": 40000, "destination_port": port,
+                       "tcp_flags": flags})
+    assert [flow["tcp_flags"] for flow in flows] == ["FSPA", "FSPA"]
+    detector = HeaderDetector()
+    assert detector.detect(flows[0]) == [] and detector.detect_batch(EventBatch.from_events(flows[:1])) == [[]]
+    assert detector.detect(flows[1])[0]["description"] == "Header anomaly: Traffic to reserved port 0"
+    assert detector.detect({"protocol": 6, "tcp_flags": "FSPA", "destination_port": 443})
+
+def test_short_circuit_and_allowlist():
+    """High-risk cheap findings skip the optional stages; allowlisted sources skip detection entirely."""
+    engine = trained_engine(compare=True)
+    threats = engine.detect_threats({"source_ip": "203.0.113.50", "destination_ip": "10.0.0.1", "length": 99999})
+    assert [(threat["type"], threat["classified_type"]) for threat in threats] == [("c2", "c2")]
+    stages = engine.pipeline_stats()["stages"]
+    assert stages["anomaly"]["short_circuit"] == 1 and stages["classification"]["short_circuit"] == 1
+
+    event = {"source_ip": "10.0.0.5", "url": "http://malware.com", "destination_port": 22, "timestamp": 1.0}
+    assert engine.detect_threats(event)
+    engine.update_allowlist(["10.0.0.0/24"])
+    engine.window_detector = DetectionEngine().window_detector
+    assert engine.detect_threats(event) == [] and engine.pipeline_stats()["allowlisted"] == 1
+    events = probe_events(200)
+    batched = engine.detect_threats_batch(events)
+    assert all(threats == [] for event, threats in zip(events, batched) if event["source_ip"] == "10.0.0.5")
+    assert any(batched) and engine.window_stats()["sources"] == 2
+
+def test_batch_matches_per_event():
+    """Batches give each row the threats detect_threats() gives it, short-circuits and headers included."""
+    engine = trained_engine(compare=True)
+    engine.result_cache = None
+    events = probe_events(400, seed=21)
+    batched = engine.detect_threats_batch(events)
+    assert batched == [engine.detect_threats(event) for event in events]
+    types = {threat["type"] for threats in batched for threat in threats}
+    assert {"c2", "port_scan", "anomaly"} <= types
+    stats = engine.pipeline_stats()
+    assert stats["events"] == 800 and stats["short_circuits"] > 0 and not stats["degraded"]
+
+def test_latency_budget_and_degraded_mode():
+    """Optional stages are dropped per event when over budget, and for all events while the pipeline is degraded."""
+    now = [0.0]
+    pipeline = DetectionPipeline({"cheap": timed_stage("cheap", now), "model": timed_stage("model", now)},
+                                 order=["cheap", "model"], optional=["model"], allowlist=[], latency_budget_ms=5.0,
+                                 probe_interval=4, cost_smoothing=0.5, clock=lambda: now[0])
+    threats, complete = pipeline.run({"cheap": 6.0, "risk_score": 10})
+    assert [threat["type"] for threat in threats] == ["cheap", "model_fallback"] and not complete
+    threats, complete = pipeline.run({"cheap": 1.0, "model": 1.0, "risk_score": 95})
+    assert [threat["type"] for threat in threats] == ["cheap", "model_fallback"] and complete
+    assert pipeline.stats()["stages"]["model"]["budget"] == 1 and pipeline.stats()["short_circuits"] == 1
+
+    slow = {"cheap": 1.0, "model": 8.0}
+    assert pipeline.run(slow)[1]
+    assert pipeline.degraded and pipeline.stats()["degraded_episodes"] == 1
+    skipped = [pipeline.run(slow)[1] for _ in range(8)]
+    assert skipped.count(True) == 2 and pipeline.stats()["probes"] == 2
+
+    fast = {"cheap": 1.0, "model": 0.5}
+    for _ in range(16):
+        pipeline.run(fast)
+    stats = pipeline.stats()
+    assert not pipeline.degraded and stats["expected_ms"] <= 4.0 and stats["stages"]["model"]["degraded"] >= 6
+    results, complete = pipeline.run_batch(EventBatch.from_events([fast] * 10))
+    assert complete and all([threat["type"] for threat in threats] == ["cheap", "model"] for threats in results)
+
+def performance_test():
+    """Per-event and batched throughput with short-circuiting against running every stage, with per-stage costs."""
+    print("\nTesting Tiered Detection Pipeline...")
+    events = probe_events(5000, seed=3)
+    for label, risk in (("every stage", 1000), ("tiered", 90)):
+        engine = trained_engine(compare=True)
+        engine.result_cache = None
+        engine.pipeline.short_circuit_risk = risk
+        engine.pipeline.latency_budget_ms = 10.0
+        start_time = time.perf_counter()
+        for event in events:
+            engine.detect_threats(event)
+        per_event = len(events) / (time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+        for start in range(0, len(events), 1000):
+            engine.detect_threats_batch(events[start:start + 1000])
+        batched = len(events) / (time.perf_counter() - start_time)
+        stats = engine.pipeline_stats()
+        costs = {name: round(stage["cost_ms"], 4) for name, stage in stats["stages"].items()}
+        print(f"{label}: {per_event:.0f} events/s per event, {batched:.0f} events/s batched, "
+              f"short-circuits {stats['short_circuits']}, stage ms {costs}")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("DETECTION PIPELINE TEST SUITE")
+    print("=" * 60)
+
+    test_header_heuristics()
+    test_headers_ignore_flow_summaries()
+    test_short_circuit_and_allowlist()
+    test_batch_matches_per_event()
+    test_latency_budget_and_degraded_mode()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,124 @@
+"""
+Test script for columnar EventBatch events.
+Checks the dict compatibility view and that batch-native detectors agree with per-event ones.
+"""
+
+import time
+import tracemalloc
+import scapy.all as scapy
+from src.detection.anomaly_detector import AnomalyDetector
+from src.detection.detection_engine import DetectionEngine
+from src.detection.signature_detector import SignatureDetector
+from src.ingestion.data_normalizer import normalize_packets, normalize_raw_packet
+from src.utils.event_batch import EventBatch
+
+def sample_events():
+    return [
+        {"timestamp": 1.5, "source_ip": "10.0.0.1", "destination_ip": "10.0.0.2", "protocol": 6,
+         "length": 60, "payload": memoryview(b"abc"), "source_port": 1, "destination_port": 80, "tcp_flags": "S"},
+        {"url": "malware.com/download", "source_ip": "192.168.1.100"},
+        {"event": "failed login", "user": "admin", "attempts": 15},
+        {"timestamp": None, "source_ip": None, "destination_ip": None, "protocol": None,
+         "length": 42, "payload": "IP / TCP login.php"},
+        {"protocol": "TCP", "port": 443, "payload": "http://example.com"},
+    ]
+
+def test_view_round_trips_events():
+    """Every row materializes back to the event it was built from."""
+    events = sample_events()
+    batch = EventBatch.from_events(events)
+    assert len(batch) == len(events)
+    for original, view in zip(events, batch):
+        assert set(view) == set(original)
+        for key, value in original.items():
+            actual = view[key]
+            if isinstance(value, memoryview):
+                assert bytes(actual) == bytes(value)
+            else:
+                assert actual == value, key
+
+def test_out_of_range_values_go_to_extras():
+    """Integers too large for their column are kept as extras instead of failing the whole batch."""
+    events = [{"protocol": 70000, "source_ip": "10.0.0.1"}, {"destination_port": 2 ** 31, "source_port": 2 ** 31 - 1},
+              {"length": 2 ** 70, "timestamp": 10 ** 400}, {"protocol": 6, "length": 60}]
+    batch = EventBatch.from_events(events)
+    assert [dict(view) for view in batch] == events
+    assert batch.extras[0] == {"protocol": 70000} and batch.extras[1] == {"destination_port": 2 ** 31}
+    assert batch.extras[2] == {"length": 2 ** 70, "timestamp": 10 ** 400} and not batch.extras[3]
+    engine = DetectionEngine()
+    assert engine.detect_threats_batch(events) == [engine.detect_threats(event) for event in events]
+
+def test_normalize_packets_builds_batch_from_frames():
+    """Raw frames go straight into columns, with scapy fallback rows for other protocols."""
+    frames = [
+        (bytes(scapy.Ether() / scapy.IP(src="1.1.1.1", dst="2.2.2.2") / scapy.TCP(flags="S") / b"hello"), 10.0),
+        (bytes(scapy.Ether() / scapy.ARP()), 11.0),
+    ]
+    batch = normalize_packets(frames)
+    assert batch[0]["source_ip"] == "1.1.1.1"
+    assert bytes(batch[0]["payload"]) == b"hello"
+    assert batch[0]["tcp_flags"] == "S"
+    expected = normalize_raw_packet(frames[1][0], 11.0)
+    assert batch[1]["length"] == expected["length"]
+    assert batch[1]["source_ip"] is None
+
+def test_signature_batch_matches_per_event():
+    """Batch signature detection returns the same threats as per-event detection."""
+    detector = SignatureDetector()
+    batch = EventBatch.from_events(sample_events())
+    assert detector.detect_batch(batch) == [detector.detect(event) for event in batch]
+
+def test_anomaly_batch_matches_per_event():
+    """Batch anomaly scoring agrees with per-event scoring row for row."""
+    detector = AnomalyDetector()
+    training = [{"source_ip": f"10.0.0.{i}", "length": 60 + i % 5} for i in range(200)]
+    detector.train(training)
+    events = training[:20] + [{"source_ip": "10.0.0.250", "length": 90000},
+                              {"source_ip": "a" * 40, "length": 61}]
+    batch = EventBatch.from_events(events)
+    assert detector.detect_batch(batch) == [detector.detect(event) for event in batch]
+
+def performance_test():
+    """Compare memory and signature detection cost of dicts against an EventBatch."""
+    print("\nTesting EventBatch Memory and Detection Cost...")
+    frames = [(bytes(scapy.Ether() / scapy.IP(src=f"10.0.{i % 50}.1", dst="10.1.0.1") /
+                     scapy.TCP(sport=1024 + i % 1000, dport=443, flags="PA") / (b"x" * 64)), float(i))
+              for i in range(2000)] * 25
+
+    tracemalloc.start()
+    events = [normalize_raw_packet(data, ts, copy_payload=True) for data, ts in frames]
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    batch = normalize_packets(frames)
+    batch_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{len(events)} events: dicts {dict_bytes / 1e6:.1f} MB, EventBatch {batch_bytes / 1e6:.1f} MB")
+
+    detector = SignatureDetector()
+    detector.update_signatures([{"type": "malware", "pattern": f"bad-{i}.example", "risk_score": 80}
+                                for i in range(200)])
+    start_time = time.perf_counter()
+    for event in events:
+        detector.detect(event)
+    per_event = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    detector.detect_batch(batch)
+    batched = time.perf_counter() - start_time
+    print(f"signature detection ({len(detector.signatures)} signatures): per-event {len(events) / per_event:.0f} events/s, "
+          f"batch {len(events) / batched:.0f} events/s")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("EVENT BATCH TEST SUITE")
+    print("=" * 60)
+
+    test_view_round_trips_events()
+    test_out_of_range_values_go_to_extras()
+    test_normalize_packets_builds_batch_from_frames()
+    test_signature_batch_matches_per_event()
+    test_anomaly_batch_matches_per_event()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,98 @@
+"""
+Test script for flattened forest inference.
+Checks that flattened forests predict exactly as sklearn does and compares single-row and batch latency.
+"""
+
+import time
+import numpy as np
+from sklearn.ensemble import IsolationForest, RandomForestClassifier
+from src.detection.flat_forest import FlatForest
+from src.detection.threat_classifier import ThreatClassifier
+
+def sample_data(rows: int = 2000, seed: int = 0):
+    rng = np.random.RandomState(seed)
+    X = rng.normal(size=(rows, 7)) * [1, 1, 10, 100, 1000, 1, 5]
+    X[:, 1] = rng.randint(0, 3, size=rows)   # repeated values exercise ties at thresholds
+    y = (X[:, 0] + X[:, 1] > 0.5).astype(int) + (X[:, 3] > 50)
+    return X, y
+
+def test_classifier_matches_sklearn():
+    """Batch and single-row predictions equal RandomForestClassifier.predict, probabilities included."""
+    X, y = sample_data()
+    model = RandomForestClassifier(n_estimators=30, random_state=1).fit(X[:1500], y[:1500])
+    flat = FlatForest.from_sklearn(model)
+    test = X[1500:]
+    assert np.array_equal(flat.predict(test), model.predict(test))
+    assert np.array_equal(flat.predict_proba(test), model.predict_proba(test))
+    assert [flat.predict_one(row) for row in test[:100]] == list(model.predict(test[:100]))
+
+def test_isolation_forest_matches_sklearn():
+    """Scores and outlier labels equal IsolationForest, including feature-subsampled forests."""
+    X, _ = sample_data(seed=3)
+    for options in ({"contamination": 0.1}, {"max_features": 0.5, "max_samples": 100}, {}):
+        model = IsolationForest(random_state=2, **options).fit(X[:1500])
+        flat = FlatForest.from_sklearn(model)
+        test = np.vstack([X[1500:], X[1500:] * 8])
+        assert np.allclose(flat.score_samples(test), model.score_samples(test), rtol=0, atol=1e-12)
+        assert np.array_equal(flat.predict(test), model.predict(test))
+        assert [flat.predict_one(row) for row in test[:200]] == list(model.predict(test[:200]))
+
+def test_arrays_round_trip_and_classifier_integration():
+    """Exported arrays rebuild the same forest, and the threat classifier predicts through it."""
+    X, y = sample_data()
+    model = RandomForestClassifier(n_estimators=10, random_state=4).fit(X, y)
+    flat = FlatForest.from_sklearn(model)
+    rebuilt = FlatForest.from_arrays("classifier", flat.to_arrays())
+    assert np.array_equal(rebuilt.predict(X), model.predict(X))
+
+    classifier = ThreatClassifier()
+    classifier.train()
+    threats = [{"type": "malware", "risk_score": 90, "description": "http://malware.com", "protocol": "TCP",
+                "port": 80, "payload_size": 1500, "request_type": "GET"},
+               {"type": "brute_force", "risk_score": 80, "description": "failed login", "protocol": "SSH",
+                "port": 22, "payload_size": 0, "request_type": ""}]
+    expected = [classifier.threat_types[label] for label in
+                classifier.model.predict(np.vstack([classifier.extract_features(threat) for threat in threats]))]
+    assert [threat["classified_type"] for threat in classifier.classify(threats)] == expected
+    assert classifier.classify(threats[:1])[0]["classified_type"] == expected[0]
+
+def performance_test():
+    """Compare sklearn and flattened inference for single rows and batches."""
+    print("\nTesting Flattened Forest Inference...")
+    X, y = sample_data(20000)
+    for name, model in (("RandomForest(100)", RandomForestClassifier(n_estimators=100, random_state=0).fit(X[:5000], y[:5000])),
+                        ("IsolationForest(100)", IsolationForest(random_state=0).fit(X[:5000]))):
+        flat = FlatForest.from_sklearn(model)
+        rows = X[5000:5200]
+        start_time = time.perf_counter()
+        for row in rows:
+            model.predict(row.reshape(1, -1))
+        sklearn_one = (time.perf_counter() - start_time) / len(rows)
+        start_time = time.perf_counter()
+        for row in rows:
+            flat.predict_one(row)
+        flat_one = (time.perf_counter() - start_time) / len(rows)
+        timings = []
+        for size in (100, 500, 10000):
+            batch = X[10000:10000 + size]
+            start_time = time.perf_counter()
+            model.predict(batch)
+            sklearn_batch = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            flat.predict(batch)
+            flat_batch = time.perf_counter() - start_time
+            timings.append(f"{size} rows {sklearn_batch * 1e3:.1f}/{flat_batch * 1e3:.1f} ms")
+        print(f"{name}: single row sklearn {sklearn_one * 1e6:.0f} us, flat {flat_one * 1e6:.0f} us; "
+              f"batches sklearn/flat {', '.join(timings)}; {flat.memory_bytes() / 1e6:.2f} MB of node arrays")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("FLAT FOREST TEST SUITE")
+    print("=" * 60)
+
+    test_classifier_matches_sklearn()
+    test_isolation_forest_matches_sklearn()
+    test_arrays_round_trip_and_classifier_integration()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
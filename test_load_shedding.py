@@ -0,0 +1,111 @@
+"""
+Test script for adaptive load shedding on live capture.
+Drives the sampler with a simulated queue depth and a slow in-process broker.
+"""
+
+import json
+import time
+import scapy.all as scapy
+from src.ingestion.flow_table import FlowTable
+from src.ingestion.kafka_consumer import KafkaConsumer
+from src.ingestion.load_shedder import LoadShedder
+from src.ingestion.local_broker import LocalBroker, LocalProducer
+from src.ingestion.packet_ingestor import PacketIngestor
+
+def packet(sport=1234, flags="A", dport=80, ts=None):
+    return {"timestamp": time.time() if ts is None else ts, "source_ip": "10.0.0.1", "destination_ip": "10.0.0.2",
+            "protocol": 6, "length": 100, "payload": b"", "source_port": sport,
+            "destination_port": dport, "tcp_flags": flags}
+
+def test_normal_load_keeps_every_packet():
+    """Below the watermark nothing is shed and events are left untouched."""
+    shedder = LoadShedder(queue_depth=lambda: 0.1, check_interval=1)
+    events = [packet() for _ in range(500)]
+    assert all(shedder.admit(event) for event in events)
+    assert not any("sample_rate" in event for event in events)
+    assert not shedder.overloaded
+
+def test_overload_samples_flows_and_keeps_priority():
+    """Under overload the first packets of each flow and priority packets survive, the rest are sampled."""
+    shedder = LoadShedder(queue_depth=lambda: 0.95, check_interval=1, first_packets=5,
+                          max_sample_rate=8, priority_ports=[22])
+    kept = [event for event in (packet() for _ in range(2000)) if shedder.admit(event)]
+    assert shedder.overloaded and shedder.sample_rate == 8
+    assert all("sample_rate" not in event for event in kept[:5])
+    assert all(event["sample_rate"] == 8 for event in kept[-10:])
+    # Rescaled counts approximate the packets actually seen
+    assert abs(sum(event.get("sample_rate", 1) for event in kept) - 2000) < 50
+
+    assert shedder.admit(packet(sport=999, flags="S"))
+    assert shedder.admit(packet(sport=998, dport=22))
+    assert shedder.stats["priority"] == 2
+    assert shedder.stats["shed"] == 2000 - len(kept)
+
+def test_capture_lag_triggers_and_recovery_clears_overload():
+    """Stale capture timestamps trigger sampling, which is lifted once the backlog drains."""
+    depth = {"value": 0.0}
+    shedder = LoadShedder(queue_depth=lambda: depth["value"], check_interval=1, max_lag_ms=1000)
+    shedder.admit(packet(ts=time.time() - 10))
+    assert shedder.overloaded
+    for _ in range(20):
+        shedder.admit(packet())
+    assert not shedder.overloaded and shedder.sample_rate == 1
+    assert not shedder.flow_counts
+
+def test_flow_table_rescales_sampled_packets():
+    """Flow summaries count a sampled packet as sample_rate packets."""
+    flows = []
+    table = FlowTable(flows.append, max_flows=10)
+    table.add(packet(ts=0.0))
+    event = packet(ts=1.0)
+    event["sample_rate"] = 4
+    table.add(event)
+    table.flush()
+    assert flows[0]["packets"] == 5
+    assert flows[0]["bytes"] == 500
+
+class SlowBroker(LocalBroker):
+    """Broker whose cost grows with records, so batching cannot hide a saturated sink."""
+
+    def produce(self, topic, partition, records):
+        time.sleep(0.003 * len(records))
+        return super().produce(topic, partition, records)
+
+def performance_test():
+    """Measure how long a packet burst takes to clear a saturated broker with and without shedding."""
+    print("\nTesting Live Capture Under Overload (saturated broker)...")
+    burst = []
+    for i in range(3000):
+        frame = scapy.Ether() / scapy.IP(src=f"10.0.{i % 20}.1", dst="10.1.0.1") / \
+            scapy.TCP(sport=1024 + i % 20, dport=443, flags="PA") / (b"x" * 64)
+        burst.append(frame)
+    for shedding in (False, True):
+        broker = SlowBroker()
+        producer = LocalProducer(broker, value_serializer=lambda v: json.dumps(v, default=str).encode('utf-8'),
+                                 linger_ms=0, batch_size=1024)
+        consumer = KafkaConsumer(topic="network_traffic", max_in_flight=200, producer=producer)
+        ingestor = PacketIngestor(kafka_topic="network_traffic", consumer=consumer,
+                                  aggregate_flows=False, load_shedding=shedding)
+        if ingestor.load_shedder is not None:
+            ingestor.load_shedder.check_interval = 32
+        start_time = time.time()
+        for frame in burst:
+            frame.time = time.time()
+            ingestor.process_live_packet(frame)
+        elapsed = time.time() - start_time
+        ingestor.close()
+        print(f"shedding={str(shedding):>5}: {len(burst)} packets processed in {elapsed:.2f}s, "
+              f"{consumer.stats['sent']} sent to Kafka, {consumer.stats['blocked']} blocked sends")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("LOAD SHEDDING TEST SUITE")
+    print("=" * 60)
+
+    test_normal_load_keeps_every_packet()
+    test_overload_samples_flows_and_keeps_priority()
+    test_capture_lag_triggers_and_recovery_clears_overload()
+    test_flow_table_rescales_sampled_packets()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,132 @@
+"""
+Equivalence tests for the fast raw-header packet parser.
+Compares parsed fields against full scapy dissection and benchmarks both paths.
+"""
+
+import time
+import scapy.all as scapy
+from src.ingestion.data_normalizer import normalize_packet, normalize_raw_packet
+from src.ingestion.packet_parser import LINKTYPE_ETHERNET, LINKTYPE_RAW, parse_packet
+
+def sample_packets():
+    """Frames covering the header layouts the fast path must handle."""
+    return [
+        scapy.Ether() / scapy.IP(src="192.168.1.1", dst="10.0.0.1") / scapy.TCP(sport=1234, dport=80, flags="S"),
+        scapy.Ether() / scapy.IP(src="192.168.1.1", dst="10.0.0.1") / scapy.TCP(flags="PA") / b"GET /login.php HTTP/1.1\r\n",
+        scapy.Ether() / scapy.IP(src="10.1.1.1", dst="8.8.8.8") / scapy.UDP(sport=5353, dport=53) / scapy.DNS(qd=scapy.DNSQR(qname="example.com")),
+        scapy.Ether() / scapy.IP(src="10.1.1.1", dst="10.1.1.2", options=[scapy.IPOption_RR()]) / scapy.TCP(flags="FA") / b"bye",
+        scapy.Ether() / scapy.IP(src="10.1.1.1", dst="10.1.1.2") / scapy.ICMP() / b"ping",
+        scapy.Ether() / scapy.Dot1Q(vlan=10) / scapy.IP(src="172.16.0.1", dst="172.16.0.2") / scapy.UDP(sport=1, dport=2) / b"vlan",
+        scapy.Ether() / scapy.IP(src="1.1.1.1", dst="2.2.2.2", frag=10) / b"fragment-body",
+        scapy.Ether() / scapy.IPv6(src="2001:db8::1", dst="2001:db8::2") / scapy.TCP(sport=443, dport=50000, flags="SA"),
+        scapy.Ether() / scapy.IPv6(src="fe80::1", dst="ff02::1") / scapy.IPv6ExtHdrHopByHop() / scapy.UDP(sport=546, dport=547) / b"dhcp6",
+        scapy.Ether() / scapy.IPv6(src="2001:db8::1", dst="2001:db8::2") / scapy.IPv6ExtHdrFragment(offset=0) / scapy.UDP(sport=7, dport=9) / b"frag6",
+        scapy.Ether() / scapy.IP(src="10.0.0.1", dst="10.0.0.2") / scapy.TCP(flags=0x1FF),
+    ]
+
+def expected_fields(packet):
+    """Reference field values taken from scapy's dissection of the same bytes."""
+    frame = scapy.Ether(bytes(packet))
+    ip = frame[scapy.IP] if scapy.IP in frame else frame[scapy.IPv6]
+    expected = {
+        "source_ip": ip.src,
+        "destination_ip": ip.dst,
+        "protocol": ip.proto if scapy.IP in frame else ip.nh,
+        "length": len(frame),
+        "source_port": None,
+        "destination_port": None,
+        "tcp_flags": None,
+    }
+    if scapy.IPv6 in frame:
+        # The fast path reports the transport protocol found after any extension headers
+        expected["protocol"] = 6 if scapy.TCP in frame else 17 if scapy.UDP in frame else ip.nh
+    if scapy.TCP in frame:
+        expected.update(source_port=frame[scapy.TCP].sport, destination_port=frame[scapy.TCP].dport,
+                        tcp_flags=str(frame[scapy.TCP].flags))
+        expected["payload"] = bytes(frame[scapy.TCP].payload)
+    elif scapy.UDP in frame:
+        expected.update(source_port=frame[scapy.UDP].sport, destination_port=frame[scapy.UDP].dport)
+        expected["payload"] = bytes(frame[scapy.UDP].payload)
+    else:
+        expected["payload"] = bytes(ip.payload)
+    return expected
+
+def test_fast_parser_matches_scapy():
+    """Every supported frame parses to the same fields scapy reports."""
+    for packet in sample_packets():
+        parsed = parse_packet(bytes(packet), 1700000000.5)
+        assert parsed is not None, packet.summary()
+        for field, value in expected_fields(packet).items():
+            actual = parsed[field].tobytes() if field == "payload" else parsed[field]
+            assert actual == value, f"{packet.summary()}: {field} {actual!r} != {value!r}"
+        assert parsed["timestamp"] == 1700000000.5
+
+def test_shared_fields_match_normalize_packet():
+    """IPv4 events agree with the scapy normalizer on its original fields."""
+    for packet in sample_packets():
+        if scapy.IP not in packet:
+            continue
+        frame = scapy.Ether(bytes(packet))
+        frame.time = 1700000000.25
+        reference = normalize_packet(frame)
+        fast = normalize_raw_packet(bytes(packet), 1700000000.25)
+        for field in ("timestamp", "source_ip", "destination_ip", "protocol", "length"):
+            assert fast[field] == reference[field], f"{packet.summary()}: {field}"
+
+def test_raw_ip_linktype():
+    """LINKTYPE_RAW frames start directly at the IP header."""
+    packet = scapy.IP(src="9.9.9.9", dst="1.1.1.1") / scapy.UDP(sport=10, dport=20) / b"raw"
+    parsed = parse_packet(bytes(packet), linktype=LINKTYPE_RAW)
+    assert parsed["source_ip"] == "9.9.9.9"
+    assert parsed["destination_port"] == 20
+    assert parsed["payload"].tobytes() == b"raw"
+
+def test_payload_is_zero_copy_and_padding_is_trimmed():
+    """Payloads are views into the frame and exclude Ethernet padding."""
+    frame = bytes(scapy.Ether() / scapy.IP(src="1.1.1.1", dst="2.2.2.2") / scapy.UDP() / b"hi") + b"\x00" * 8
+    parsed = parse_packet(frame)
+    assert isinstance(parsed["payload"], memoryview)
+    assert parsed["payload"].obj is frame
+    assert parsed["payload"].tobytes() == b"hi"
+
+def test_unsupported_protocols_fall_back_to_scapy():
+    """Non-IP frames are handed to scapy instead of being dropped."""
+    arp = bytes(scapy.Ether() / scapy.ARP(psrc="10.0.0.1", pdst="10.0.0.2"))
+    assert parse_packet(arp) is None
+    normalized = normalize_raw_packet(arp, 1700000000.0)
+    assert normalized["source_ip"] is None
+    assert normalized["length"] == len(arp)
+    assert parse_packet(b"\x00" * 4, linktype=147) is None
+
+def performance_test():
+    """Microbenchmark the scapy normalizer against the fast header parser."""
+    print("\nTesting Packet Normalization Speed...")
+    frames = [bytes(packet) for packet in sample_packets()[:3]] * 2000
+    start_time = time.perf_counter()
+    for frame in frames:
+        packet = scapy.Ether(frame)
+        packet.time = 1700000000.0
+        normalize_packet(packet)
+    scapy_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for frame in frames:
+        parse_packet(frame, 1700000000.0, LINKTYPE_ETHERNET)
+    fast_time = time.perf_counter() - start_time
+
+    print(f"scapy dissection: {scapy_time / len(frames) * 1e6:.1f} us/packet")
+    print(f"fast parser:      {fast_time / len(frames) * 1e6:.1f} us/packet ({scapy_time / fast_time:.0f}x)")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("PACKET PARSER TEST SUITE")
+    print("=" * 60)
+
+    test_fast_parser_matches_scapy()
+    test_shared_fields_match_normalize_packet()
+    test_raw_ip_linktype()
+    test_payload_is_zero_copy_and_padding_is_trimmed()
+    test_unsupported_protocols_fall_back_to_scapy()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
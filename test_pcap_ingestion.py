@@ -0,0 +1,88 @@
+"""
+Test script for offline PCAP ingestion.
+Checks byte-range sharding against a sequential read and reports packets/s.
+"""
+
+import os
+import tempfile
+import scapy.all as scapy
+from src.ingestion.packet_ingestor import PacketIngestor
+from src.ingestion.pcap_reader import PcapRecordReader, plan_shards
+
+class CollectingConsumer:
+    """Stand-in for KafkaConsumer that keeps sent events in memory."""
+
+    def __init__(self):
+        self.events = []
+
+    def send(self, data):
+        self.events.append(data)
+        return True
+
+    def close(self):
+        pass
+
+def write_sample_pcap(path, count=600, flows=7):
+    packets = []
+    for i in range(count):
+        flow = i % flows
+        packet = (scapy.Ether() /
+                  scapy.IP(src=f"10.0.0.{flow + 1}", dst="192.168.1.1") /
+                  scapy.TCP(sport=1024 + flow, dport=80, seq=i) /
+                  (b"x" * (i % 200)))
+        packet.time = 1700000000 + i * 0.001
+        packets.append(packet)
+    scapy.wrpcap(path, packets)
+
+def test_shards_cover_every_record_exactly_once():
+    """Concatenated shard reads match a single sequential read."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sample.pcap")
+        write_sample_pcap(path)
+        sequential = list(PcapRecordReader(path))
+        sharded = []
+        for shard in plan_shards(path, 4096):
+            sharded.extend(PcapRecordReader(path, start=shard.start, end=shard.end))
+        assert len(sequential) == 600
+        assert sharded == sequential
+
+def test_ingest_pcap_preserves_per_flow_order():
+    """Multi-process ingestion emits every packet with flows in capture order."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sample.pcap")
+        write_sample_pcap(path)
+        consumer = CollectingConsumer()
+        ingestor = PacketIngestor(kafka_topic="network_traffic", consumer=consumer)
+        stats = ingestor.ingest_pcap(path, processes=3, shard_size_mb=0.005)
+
+        assert stats["packets"] == 600
+        assert stats["shards"] > 3
+        by_flow = {}
+        for event in consumer.events:
+            by_flow.setdefault(event["source_ip"], []).append(float(event["timestamp"]))
+        assert len(by_flow) == 7
+        for timestamps in by_flow.values():
+            assert timestamps == sorted(timestamps)
+
+def performance_test():
+    """Report packets/s for sequential and sharded ingestion."""
+    print("\nTesting PCAP Ingestion Throughput...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pcap")
+        write_sample_pcap(path, count=5000)
+        for processes in (1, 4):
+            ingestor = PacketIngestor(kafka_topic="network_traffic", consumer=CollectingConsumer())
+            stats = ingestor.ingest_pcap(path, processes=processes, shard_size_mb=0.25)
+            print(f"processes={processes}: {stats['packets']} packets in {stats['seconds']:.2f}s "
+                  f"({stats['packets_per_second']:.0f} packets/s)")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("PCAP INGESTION TEST SUITE")
+    print("=" * 60)
+
+    test_shards_cover_every_record_exactly_once()
+    test_ingest_pcap_preserves_per_flow_order()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
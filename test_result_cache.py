@@ -0,0 +1,159 @@
+"""
+Test script for the detection result cache.
+Checks fingerprinting, the LRU byte budget and TTL, invalidation on signature and model changes, the shared tier, and repeated-traffic throughput.
+"""
+
+import os
+import random
+import time
+from src.detection.detection_engine import DetectionEngine
+from src.detection.result_cache import LocalRedis, ResultCache, event_fingerprint
+from src.utils.config_loader import get_config, load_config
+from test_batch_detection import comparable, make_events, trained_engine
+
+def repeated_events(count: int, distinct: int, seed: int = 11):
+    """count events drawn from distinct shared events, each with its own timestamp."""
+    rng = random.Random(seed)
+    contents = make_events(distinct, seed)
+    return [dict(rng.choice(contents), timestamp=1700000000.0 + i) for i in range(count)]
+
+def sharing_engine(engine: DetectionEngine, cache: ResultCache) -> DetectionEngine:
+    """Another worker running the same models and indicators as engine."""
+    other = comparable(DetectionEngine(result_cache=cache))
+    other.anomaly_detector = engine.anomaly_detector
+    other.threat_classifier = engine.threat_classifier
+    other.update_ip_indicators([("203.0.113.0/24", {"type": "c2", "risk_score": 95})])
+    return other
+
+def test_fingerprint_ignores_volatile_fields():
+    """Events differing only in an ignored numeric field share a fingerprint; value types and text still count."""
+    event = {"url": "http://malware.com", "destination_port": 80, "timestamp": 1.0}
+    ignored = frozenset(["timestamp"])
+    assert event_fingerprint(event, ignored) == event_fingerprint(dict(event, timestamp=2.0), ignored)
+    assert event_fingerprint(event) != event_fingerprint(dict(event, timestamp=2.0))
+    assert event_fingerprint(event, ignored) != event_fingerprint(dict(event, destination_port="80"), ignored)
+    assert event_fingerprint(dict(event, timestamp="a"), ignored) != event_fingerprint(dict(event, timestamp="b"), ignored)
+    assert event_fingerprint({"payload": b"x"}) == event_fingerprint({"payload": bytearray(b"x")})
+
+def test_lru_budget_and_ttl():
+    """Entries past the byte budget evict the least recently used; expired entries miss; hits are fresh copies."""
+    cache = ResultCache(max_bytes=1000, ttl_seconds=60)
+    for i in range(10):
+        cache.put(bytes([i]) * 16, "t", [{"type": "malware", "risk_score": i}])
+    stats = cache.stats()
+    assert stats["bytes"] <= 1000 and stats["evictions"] == 10 - stats["entries"] > 0
+    assert cache.get(bytes([0]) * 16, "t") is None
+    hit = cache.get(bytes([9]) * 16, "t")
+    assert hit == [{"type": "malware", "risk_score": 9}]
+    hit[0]["risk_score"] = 0
+    assert cache.get(bytes([9]) * 16, "t")[0]["risk_score"] == 9
+
+    cache = ResultCache(max_bytes=1 << 20, ttl_seconds=0.05)
+    cache.put(b"k" * 16, "t", [])
+    assert cache.get(b"k" * 16, "t") == []
+    time.sleep(0.1)
+    assert cache.get(b"k" * 16, "t") is None and cache.stats()["expired"] == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+def test_redis_settings_come_from_storage_config():
+    """The shared tier's TTL is read from storage.redis in the loaded configuration."""
+    config = get_config()
+    saved = config.config
+    try:
+        config.config = load_config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config",
+                                                 "development.yaml"))
+        assert ResultCache().ttl_seconds == config.config["storage"]["redis"]["cache_ttl_seconds"]
+        config.config = {"storage": {"redis": {"cache_ttl_seconds": 42}}}
+        assert ResultCache().ttl_seconds == 42
+    finally:
+        config.config = saved
+
+def test_engine_hits_and_invalidation():
+    """Repeated content hits whatever its timestamp, and signature, indicator or model changes clear the cache."""
+    engine = trained_engine(compare=True)
+    events = repeated_events(300, 30)
+    cache, engine.result_cache = engine.result_cache, None
+    expected = [engine.detect_threats(event) for event in events]
+    engine.result_cache = cache
+    assert [engine.detect_threats(event) for event in events] == expected
+    stats = engine.cache_stats()
+    assert stats["misses"] == 30 and stats["hits"] == 270 and stats["hit_ratio"] == 0.9
+
+    event = {"source_ip": "10.1.1.1", "url": "http://evil-phish.example/a", "timestamp": 1.0}
+    before = len(engine.detect_threats(event))
+    engine.update_signatures([{"type": "phishing", "pattern": "evil-phish", "risk_score": 85}])
+    assert len(engine.detect_threats(dict(event, timestamp=2.0))) == before + 1
+    engine.update_ip_indicators([("10.1.1.0/24", {"type": "c2", "risk_score": 80})])
+    assert len(engine.detect_threats(dict(event, timestamp=3.0))) == before + 2
+
+    token = engine._cache_context()[0]
+    engine.anomaly_detector.train(make_events(300, seed=2))
+    assert engine._cache_context()[0] != token
+    engine.threat_classifier.train([{"length": 60}])
+    assert engine._cache_context()[0] != token and engine.cache_stats()["invalidations"] == 4
+
+def test_shared_tier_between_engines():
+    """A second worker with the same models reuses the first one's results; a failing shared tier is tolerated."""
+    shared = LocalRedis()
+    first = trained_engine(compare=True, result_cache=ResultCache(shared=shared))
+    second = sharing_engine(first, ResultCache(shared=shared))
+    events = repeated_events(50, 10)
+    expected = [first.detect_threats(event) for event in events]
+    assert [second.detect_threats(event) for event in events] == expected
+    assert second.cache_stats()["shared_hits"] == 10 and second.cache_stats()["misses"] == 0
+
+    class Unreachable:
+        def get(self, key):
+            raise ConnectionError("redis down")
+
+        def set(self, key, value, ex=None):
+            raise ConnectionError("redis down")
+
+    third = sharing_engine(first, ResultCache(shared=Unreachable()))
+    assert third.detect_threats(events[0]) == expected[0] and third.detect_threats(events[0]) == expected[0]
+    stats = third.cache_stats()
+    assert stats["shared_errors"] == 2 and stats["misses"] == 1 and stats["hits"] == 1
+
+def test_batch_uses_cache_and_matches_per_event():
+    """Batches dedupe repeated content, reuse cached results and still match detect_threats() event by event."""
+    engine = trained_engine(compare=True)
+    events = repeated_events(500, 40, seed=3)
+    batched = engine.detect_threats_batch(events)
+    stats = engine.cache_stats()
+    assert stats["misses"] == 40 and stats["hits"] == 460
+    assert batched == [engine.detect_threats(event) for event in events]
+    assert engine.detect_threats_batch(events) == batched and engine.cache_stats()["misses"] == 40
+
+def performance_test():
+    """Throughput on traffic where 90% of events repeat earlier content, with and without the cache."""
+    print("\nTesting Result Cache Throughput...")
+    events = repeated_events(20000, 2000, seed=5)
+    for label, cache in (("no cache", None), ("cache", ResultCache())):
+        engine = trained_engine(compare=True)
+        engine.result_cache = cache
+        start_time = time.perf_counter()
+        for event in events[:5000]:
+            engine.detect_threats(event)
+        per_event = 5000 / (time.perf_counter() - start_time)
+        if cache is not None:
+            cache.clear()
+        start_time = time.perf_counter()
+        for start in range(0, len(events), 1000):
+            engine.detect_threats_batch(events[start:start + 1000])
+        batched = len(events) / (time.perf_counter() - start_time)
+        print(f"{label}: {per_event:.0f} events/s per event, {batched:.0f} events/s batched, {engine.cache_stats()}")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("RESULT CACHE TEST SUITE")
+    print("=" * 60)
+
+    test_fingerprint_ignores_volatile_fields()
+    test_lru_budget_and_ttl()
+    test_redis_settings_come_from_storage_config()
+    test_engine_hits_and_invalidation()
+    test_shared_tier_between_engines()
+    test_batch_uses_cache_and_matches_per_event()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,101 @@
+"""
+Test script for the field-scoped signature language.
+Covers each match type, boolean combinations, compile-time errors and batch agreement.
+"""
+
+import time
+from src.detection.signature_compiler import SignatureCompileError, compile_signatures
+from src.detection.signature_detector import SignatureDetector
+from src.utils.event_batch import EventBatch
+
+SIGNATURES = [
+    {"type": "admin_probe", "risk_score": 70,
+     "all": [{"field": "url", "regex": r"^/admin/.*\.php$"}, {"not": {"field": "source_ip", "prefix": "10."}}]},
+    {"type": "shellcode", "field": "payload", "hex": "90909090", "risk_score": 95},
+    {"type": "telnet", "field": "destination_port", "equals": 23, "risk_score": 60},
+    {"type": "scanner", "field": ["user_agent", "url"], "pattern": "SQLMAP", "nocase": True, "risk_score": 75},
+    {"type": "exe_download", "field": "url", "suffix": ".exe", "risk_score": 65},
+    {"type": "not_internal", "not": {"field": "source_ip", "prefix": "10."}, "risk_score": 10},
+]
+
+def types(threats):
+    return [threat["type"] for threat in threats]
+
+def test_field_scoped_conditions():
+    """Conditions only fire on the fields they name, with each match type."""
+    detector = SignatureDetector()
+    detector.update_signatures(SIGNATURES)
+    assert types(detector.detect({"url": "/admin/setup.php", "source_ip": "203.0.113.5"})) == \
+        ["admin_probe", "not_internal"]
+    assert types(detector.detect({"url": "/admin/setup.php", "source_ip": "10.0.0.5"})) == []
+    assert types(detector.detect({"payload": memoryview(b"\x00\x90\x90\x90\x90"), "source_ip": "10.0.0.1"})) == \
+        ["shellcode"]
+    # The same bytes in a field the signature does not name do not match
+    assert types(detector.detect({"note": "\x90\x90\x90\x90", "source_ip": "10.0.0.1"})) == []
+    assert types(detector.detect({"destination_port": 23, "source_ip": "10.0.0.1"})) == ["telnet"]
+    assert types(detector.detect({"user_agent": "sqlmap/1.7", "url": "/setup.exe", "source_ip": "10.1.1.1"})) == \
+        ["scanner", "exe_download"]
+    # Bare patterns keep their any-field behaviour
+    assert types(detector.detect({"whatever": "malware.com", "source_ip": "10.0.0.1"})) == ["malware"]
+
+def test_compile_errors_are_raised_at_update_time():
+    """Invalid signatures are rejected by update_signatures and leave the active set unchanged."""
+    detector = SignatureDetector()
+    before = list(detector.signatures)
+    for bad in [
+        {"type": "x", "risk_score": 1, "field": "url", "regex": "(unclosed"},
+        {"type": "x", "risk_score": 1, "hex": "zz"},
+        {"type": "x", "risk_score": 1, "all": []},
+        {"type": "x", "risk_score": 1, "pattern": "a", "regex": "b"},
+        {"type": "x", "pattern": "a"},
+    ]:
+        try:
+            detector.update_signatures([bad])
+        except SignatureCompileError as e:
+            assert "Signature 3" in str(e)
+        else:
+            raise AssertionError(f"expected SignatureCompileError for {bad}")
+        assert detector.signatures == before
+
+def test_batch_agrees_with_per_event():
+    """Batch detection evaluates columns, payloads and extras exactly like per-event detection."""
+    detector = SignatureDetector()
+    detector.update_signatures(SIGNATURES)
+    events = [
+        {"timestamp": 1.0, "source_ip": "203.0.113.5", "destination_ip": "10.0.0.2", "protocol": 6, "length": 60,
+         "payload": memoryview(b"\x90\x90\x90\x90"), "source_port": 4000, "destination_port": 23, "tcp_flags": "S"},
+        {"timestamp": 2.0, "source_ip": "10.0.0.9", "destination_ip": "10.0.0.2", "protocol": 6, "length": 60,
+         "payload": "GET /login.php", "source_port": 4001, "destination_port": 80, "tcp_flags": "PA"},
+        {"url": "/admin/a.php", "source_ip": "198.51.100.1", "user_agent": "SQLMap"},
+        {"event": "failed login", "source_ip": "10.0.0.1"},
+    ]
+    batch = EventBatch.from_events(events)
+    assert detector.detect_batch(batch) == [detector.detect(event) for event in events]
+
+def performance_test():
+    """Measure per-event cost when most signatures target fields the event does not carry."""
+    print("\nTesting Field-Scoped Signature Evaluation...")
+    signatures = [{"type": "url_ioc", "field": "url", "pattern": f"/path{i}/", "risk_score": 50} for i in range(5000)]
+    signatures += [{"type": "ua_regex", "field": "user_agent", "regex": f"bot{i}[0-9]+", "risk_score": 40}
+                   for i in range(500)]
+    start_time = time.perf_counter()
+    compiled = compile_signatures(signatures)
+    print(f"compiled {len(signatures)} signatures in {(time.perf_counter() - start_time) * 1000:.1f} ms")
+    for name, event in [("packet", {"source_ip": "10.0.0.1", "destination_ip": "10.0.0.2", "payload": "x" * 200}),
+                        ("http", {"url": "/path42/index.html", "user_agent": "Mozilla/5.0"})]:
+        start_time = time.perf_counter()
+        for _ in range(2000):
+            compiled.match_event(event)
+        print(f"{name:>7} event: {(time.perf_counter() - start_time) / 2000 * 1e6:.1f} us/event")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("SIGNATURE COMPILER TEST SUITE")
+    print("=" * 60)
+
+    test_field_scoped_conditions()
+    test_compile_errors_are_raised_at_update_time()
+    test_batch_agrees_with_per_event()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
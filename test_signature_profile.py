@@ -0,0 +1,158 @@
+"""
+Test script for per-signature profiling and profile-driven rule ordering.
+Checks evaluation and hit counts, sampled costs and flags, and that deferred conditions leave results unchanged.
+"""
+
+import random
+import time
+from src.detection.signature_compiler import compile_signatures
+from src.detection.signature_detector import SignatureDetector
+from src.detection.signature_profile import SignatureProfile
+from src.utils.event_batch import EventBatch
+
+# Rescans the rest of the value from every position on a miss
+SLOW_REGEX = r"[a-z0-9/._-]+\?x=[0-9]+;"
+
+def gated_signatures(count: int):
+    """Signatures pairing a cheap substring gate with an expensive regex, plus the shapes that must not be deferred."""
+    signatures = [{"id": f"gated-{i}", "type": f"probe-{i}", "risk_score": 70,
+                   "all": [{"field": "url", "regex": SLOW_REGEX}, {"field": "url", "pattern": f"/app{i}/"}]}
+                  for i in range(count)]
+    signatures.extend([
+        {"id": "either", "type": "either", "risk_score": 60,
+         "any": [{"field": "url", "pattern": "/app0/"}, {"field": "url", "regex": SLOW_REGEX}]},
+        {"id": "negated", "type": "negated", "risk_score": 60,
+         "all": [{"field": "url", "pattern": "/app1/"}, {"not": {"field": "url", "regex": SLOW_REGEX}}]},
+        {"id": "dormant", "type": "dormant", "risk_score": 50, "field": "url", "pattern": "never-seen"},
+    ])
+    return signatures
+
+def make_events(count: int, apps: int, seed: int = 5):
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        path = "/".join(rng.choice(["static", "img", "v2", "docs"]) for _ in range(8))
+        app = rng.randrange(apps * 4)
+        query = f"?x={i};" if rng.random() < 0.5 else f"?y={i}"
+        events.append({"url": f"/app{app}/{path}/page.html{query}", "source_ip": f"10.0.0.{i % 50}",
+                       "protocol": 6, "destination_port": 443})
+    return events
+
+def profiled_detector(signatures, sample_interval: int = 1, **kwargs) -> SignatureDetector:
+    detector = SignatureDetector(profile=SignatureProfile(sample_interval=sample_interval, min_events=50, **kwargs))
+    detector.auto_optimize = False
+    detector.load_sources({"default": None, "api": signatures})
+    return detector
+
+def test_counts_and_flags():
+    """Hits and evaluations are exact for single events and batches; dead, slow and noisy signatures are flagged."""
+    detector = profiled_detector(gated_signatures(2) + [{"id": "html", "type": "web", "field": "url",
+                                                          "suffix": "0;", "risk_score": 10},
+                                                         {"id": "any-url", "type": "web", "field": "url",
+                                                          "prefix": "/app", "risk_score": 10}], slow_us=1.0)
+    events = make_events(200, 2)
+    singles = [detector.detect(event) for event in events]
+    assert detector.detect_batch(EventBatch.from_events(events)) == singles
+    report = detector.profile_report()
+    rows = {row["id"]: row for row in report["signatures"]}
+    assert report["events"] == 400 and report["samples"] == 400
+    for signature_id, kind in (("gated-0", "probe-0"), ("either", "either"), ("negated", "negated")):
+        assert rows[signature_id]["hits"] == 2 * sum(kind in {t["type"] for t in threats} for threats in singles)
+    assert rows["gated-0"]["evaluations"] >= rows["gated-0"]["hits"] > 0
+    assert rows["any-url"]["hits"] == 400 and rows["any-url"]["hit_ratio"] == 1.0
+    assert report["dead"] == ["dormant"] and "any-url" in report["noisy"]
+    assert rows["dormant"]["evaluations"] == 0 and rows["dormant"]["time_ms"] == 0.0
+    assert "gated-0" in report["slow"] and report["signatures"][0]["mean_us"] > rows["html"]["mean_us"]
+    assert detector.profile_report(limit=2)["signatures"] == report["signatures"][:2]
+
+    # Counters follow signature ids across reloads and start from zero for new signatures
+    detector.update_signatures([{"id": "late", "type": "late", "pattern": "/app1/", "risk_score": 20}])
+    detector.detect(events[0])
+    rows = {row["id"]: row for row in detector.profile_report()["signatures"]}
+    assert rows["late"]["events"] == 1 and rows["gated-0"]["events"] == 401
+
+def test_sampling_interval():
+    """Costs come from one event in sample_interval, across call boundaries."""
+    profile = SignatureProfile(sample_interval=10)
+    assert profile.record(25, [], []) == [9, 19] and profile.record(3, [], []) == []
+    assert profile.record(7, [], []) == [1] and profile.record(5, [], []) == [4]
+
+def test_deferral_keeps_results():
+    """Optimizing defers only required regex conditions, orders them last and never changes what matches."""
+    signatures = gated_signatures(20)
+    events = make_events(300, 20, seed=9)
+    reference = SignatureDetector()
+    reference.profile = None
+    reference.load_sources({"default": None, "api": signatures})
+    expected = [reference.detect(event) for event in events]
+
+    detector = profiled_detector(signatures, defer_min_us=0.5)
+    for event in events[:100]:
+        detector.detect(event)
+    version = detector.version
+    assert detector.optimize() and not detector.optimize() and detector.version == version
+    compiled = detector.snapshot.compiled
+    deferred = {detector.snapshot.ids[compiled.leaf_key(leaf)[0]] for leaf in compiled.deferred}
+    assert deferred == {f"gated-{i}" for i in range(20)}
+    assert compiled.expressions[0][1][-1] == ("leaf", next(iter(sorted(compiled.deferred))))
+    assert detector.profile_report()["deferred_conditions"] == 20
+    assert [detector.detect(event) for event in events] == expected
+    assert detector.detect_batch(EventBatch.from_events(events)) == expected
+
+    # Reloads keep measured conditions deferred; rollbacks restore the compiled form of their snapshot
+    detector.update_signatures([{"id": "extra", "type": "extra", "pattern": "/app3/", "risk_score": 5}])
+    assert len(detector.snapshot.compiled.deferred) == 20
+    detector.rollback()
+    assert [detector.detect(event) for event in events] == expected
+
+def test_compiler_refuses_unsafe_deferral():
+    """Conditions under "not", or that can match on their own, stay in the per-field scan."""
+    plan = {0: {0: (100.0, 0.1)}, 1: {1: (100.0, 0.1)}, 2: {0: (100.0, 0.1)}}
+    compiled = compile_signatures([
+        {"type": "alone", "field": "url", "regex": "a+b", "risk_score": 1},
+        {"type": "either", "risk_score": 1, "any": [{"pattern": "x"}, {"field": "url", "regex": "a+b"}]},
+        {"type": "negated", "risk_score": 1, "all": [{"not": {"regex": "a+b"}}, {"pattern": "y"}]},
+    ], plan)
+    assert not compiled.deferred and compiled.match_event({"url": "aab"}) == [0, 1]
+
+def performance_test():
+    """Detection throughput without profiling, with sampled profiling, and after profile-driven deferral."""
+    print("\nTesting Signature Profiling and Deferral...")
+    signatures = gated_signatures(200)
+    events = make_events(3000, 200, seed=2)
+    reference = None
+    for label, profiling, optimized in (("no profiling", False, False), ("profiling", True, False),
+                                        ("profiled + deferred", True, True)):
+        detector = profiled_detector(signatures, sample_interval=100)
+        if not profiling:
+            detector.profile = None
+        elif optimized:
+            for event in events[:1000]:
+                detector.detect(event)
+            detector.optimize()
+        start_time = time.perf_counter()
+        results = [detector.detect(event) for event in events]
+        per_event = len(events) / (time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+        batched = detector.detect_batch(EventBatch.from_events(events))
+        batch_rate = len(events) / (time.perf_counter() - start_time)
+        reference = reference or results
+        assert results == reference and batched == reference
+        print(f"{label}: {per_event:.0f} events/s per event, {batch_rate:.0f} events/s batched, "
+              f"{len(detector.snapshot.compiled.deferred)} deferred conditions")
+    report = detector.profile_report(limit=3)
+    print(f"costliest: {[(row['id'], round(row['mean_us'], 2)) for row in report['signatures']]}, "
+          f"dead {report['dead']}")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("SIGNATURE PROFILE TEST SUITE")
+    print("=" * 60)
+
+    test_counts_and_flags()
+    test_sampling_interval()
+    test_deferral_keeps_results()
+    test_compiler_refuses_unsafe_deferral()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
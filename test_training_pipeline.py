@@ -0,0 +1,132 @@
+"""
+Test script for the out-of-core classifier training pipeline.
+Checks shard streaming, vectorized encoding and sampling, and reports wall time, peak RSS and rows/s.
+"""
+
+import json
+import os
+import random
+import tempfile
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from src.detection.threat_classifier import ThreatClassifier
+from src.detection.training_pipeline import ReservoirSample, StratifiedSample, encode_chunk, load_training_set
+import pandas as pd
+
+DATASET = "src/detection/threat_dataset.json"
+
+def iter_records(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    types = ThreatClassifier().threat_types
+    protocols, ports, requests = ["TCP", "udp", "HTTP", "Telnet", "?"], [22, 80, 443, 3389], ["GET", "post", "SSH", ""]
+    for _ in range(count):
+        protocol, port, request = rng.randrange(5), rng.randrange(4), rng.randrange(4)
+        # Labels follow the categorical fields with 5% noise, like a real feed with some mislabelling
+        label = (protocol * 4 + port + request) % len(types) if rng.random() > 0.05 else rng.randrange(len(types))
+        yield {"risk_score": rng.randint(10, 100), "has_http": rng.randint(0, 1),
+               "description_length": rng.randint(5, 200), "protocol": protocols[protocol], "port": ports[port],
+               "payload_size": rng.randint(0, 5000), "request_type": requests[request], "threat_type": types[label]}
+
+def make_records(count: int, seed: int = 0):
+    return list(iter_records(count, seed))
+
+def write_shards(directory: str, records, shards: int, count: int):
+    size = (count + shards - 1) // shards
+    records = iter(records)
+    for shard in range(shards):
+        with open(os.path.join(directory, f"part-{shard:03d}.jsonl"), "w") as f:
+            for _, record in zip(range(size), records):
+                f.write(json.dumps(record) + "\n")
+
+def test_encoding_matches_classifier_mappings():
+    """Column-wise encoding equals the per-record mapping functions, and unlabelled rows are dropped."""
+    classifier = ThreatClassifier()
+    labels = {t: i for i, t in enumerate(classifier.threat_types)}
+    records = make_records(500) + [{"risk_score": 5, "protocol": "TCP", "threat_type": "not_a_type"}, {"port": 80}]
+    X, y, dropped = encode_chunk(pd.DataFrame.from_records(records), labels)
+    assert dropped == 2 and len(y) == 500
+    expected = np.array([[r["risk_score"], r["has_http"], r["description_length"], classifier.protocol_to_int(r["protocol"]),
+                          r["port"], r["payload_size"], classifier.request_type_to_int(r["request_type"])]
+                         for r in records[:500]], dtype=np.float32)
+    assert np.array_equal(X, expected) and list(y) == [labels[r["threat_type"]] for r in records[:500]]
+
+def test_shards_stream_in_order():
+    """A directory of JSONL shards, a CSV and record lists all produce the same training rows as the JSON array."""
+    labels = {t: i for i, t in enumerate(ThreatClassifier().threat_types)}
+    with open(DATASET) as f:
+        records = json.load(f)
+    X, y, counts = load_training_set(DATASET, labels)
+    assert counts == {"rows_read": len(records), "rows_used": len(records), "rows_dropped": 0, "sampling": "none"}
+    with tempfile.TemporaryDirectory() as directory:
+        write_shards(directory, records, 3, len(records))
+        pd.DataFrame.from_records(records).to_csv(os.path.join(directory, "extra.csv"), index=False)
+        X_dir, y_dir, _ = load_training_set(directory, labels, chunk_rows=4)
+        X_jsonl, y_jsonl, _ = load_training_set(os.path.join(directory, "*.jsonl"), labels, chunk_rows=5)
+    assert np.array_equal(X_dir, np.vstack([X, X])) and np.array_equal(y_dir, np.concatenate([y, y]))
+    assert np.array_equal(X_jsonl, X) and np.array_equal(y_jsonl, y)
+    X_records, y_records, _ = load_training_set(records, labels, chunk_rows=3)
+    assert np.array_equal(X_records, X) and np.array_equal(y_records, y)
+
+def test_sampling_bounds_rows():
+    """Reservoirs keep at most their capacity, sample uniformly, and stratified sampling keeps rare labels."""
+    rng = np.random.RandomState(0)
+    reservoir = ReservoirSample(1000, 1, rng)
+    for start in range(0, 100000, 7000):
+        rows = np.arange(start, min(start + 7000, 100000))
+        reservoir.add(rows.reshape(-1, 1).astype(np.float32), np.zeros(len(rows), dtype=np.int32))
+    X, _ = reservoir.arrays()
+    assert len(X) == 1000 and reservoir.seen == 100000 and len(np.unique(X)) == 1000
+    assert 45000 < X.mean() < 55000 and (X[:, 0] >= 7000).sum() > 900
+
+    stratified = StratifiedSample(200, 1, 2, rng)
+    y = np.zeros(10000, dtype=np.int32)
+    y[:30] = 1
+    stratified.add(np.arange(10000, dtype=np.float32).reshape(-1, 1), y)
+    _, sampled = stratified.arrays()
+    assert (sampled == 1).sum() == 30 and (sampled == 0).sum() == 100
+
+def test_classifier_trains_from_shards_under_budget():
+    """Training from shards over the memory budget samples and reports its run."""
+    classifier = ThreatClassifier()
+    with tempfile.TemporaryDirectory() as directory:
+        write_shards(directory, make_records(5000), 4, 5000)
+        report = classifier.train(directory, memory_budget_mb=0.05)
+    assert classifier.is_trained and report.rows_read == 5000 and report.sampling == "reservoir"
+    assert report.rows_used == int(0.05 * 1024 * 1024) // 32
+    assert report.wall_seconds >= report.fit_seconds > 0 and report.rows_per_second > 0
+    assert report.peak_rss_mb is None or report.peak_rss_mb > 0
+    assert classifier.train([{"length": 60}]) is None and not classifier.is_trained
+    report = classifier.train(DATASET)
+    assert classifier.is_trained and report.sampling == "none"
+
+def performance_test():
+    """Train from one million rows of JSONL shards under two memory budgets; compare serial and parallel fits."""
+    print("\nTesting Out-of-Core Classifier Training...")
+    with tempfile.TemporaryDirectory() as directory:
+        write_shards(directory, iter_records(1000000, seed=1), 8, 1000000)
+        for budget in (4, 16):
+            report = ThreatClassifier().train(directory, memory_budget_mb=budget)
+            print(f"budget {budget} MB: {report.rows_used} of {report.rows_read} rows ({report.sampling}), "
+                  f"read {report.read_seconds:.1f}s + fit {report.fit_seconds:.1f}s, "
+                  f"{report.rows_per_second:.0f} rows/s, peak RSS {report.peak_rss_mb:.0f} MB")
+        labels = {t: i for i, t in enumerate(ThreatClassifier().threat_types)}
+        X, y, _ = load_training_set(directory, labels, memory_budget_mb=4)
+    for n_jobs in (1, -1):
+        start_time = time.perf_counter()
+        RandomForestClassifier(n_estimators=100, max_depth=10, n_jobs=n_jobs).fit(X, y)
+        print(f"fit of {len(y)} rows with n_jobs={n_jobs}: {time.perf_counter() - start_time:.1f}s "
+              f"({os.cpu_count()} cores)")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("TRAINING PIPELINE TEST SUITE")
+    print("=" * 60)
+
+    test_encoding_matches_classifier_mappings()
+    test_shards_stream_in_order()
+    test_sampling_bounds_rows()
+    test_classifier_trains_from_shards_under_budget()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,129 @@
+"""
+Test script for the sliding-window detectors.
+Checks scan, brute force and flood thresholds, window expiry and the key cap, and measures throughput over a million sources.
+"""
+
+import random
+import time
+from src.detection.detection_engine import DetectionEngine
+from src.detection.training_pipeline import peak_rss_mb
+from src.detection.window_detector import WindowDetector
+from src.utils.event_batch import EventBatch
+
+def types(threat_lists):
+    return [threat["type"] for threats in threat_lists for threat in threats]
+
+def test_port_scan_and_brute_force_per_source():
+    """A source sweeping ports or failing logins alerts once per window; ordinary sources never do."""
+    detector = WindowDetector(window_seconds=60, buckets=6)
+    scan = [detector.detect({"timestamp": 1000 + i * 0.2, "source_ip": "198.51.100.7", "destination_ip": "10.0.0.5",
+                             "destination_port": 1 + i, "tcp_flags": "S"}) for i in range(150)]
+    normal = [detector.detect({"timestamp": 1000 + i * 0.2, "source_ip": "10.0.0.9", "destination_ip": "10.0.0.5",
+                               "destination_port": (80, 443, 22)[i % 3], "tcp_flags": "PA", "length": 600})
+              for i in range(150)]
+    assert types(scan) == ["port_scan"] and not any(normal)
+    assert next(i for i, threats in enumerate(scan) if threats) == 99 and scan[99][0]["value"] == 100
+    # Distinct ports are counted exactly up to the threshold, whatever the threshold and however ports are spread
+    for threshold, start, step in ((1000, 1, 1), (1000, 40000, 1), (250, 1024, 7)):
+        sweep = WindowDetector(window_seconds=60, buckets=6, thresholds={"distinct_ports": threshold})
+        first = next(i for i in range(threshold * 2) if sweep.detect(
+            {"timestamp": 1000 + i * 0.01, "source_ip": "198.51.100.8", "destination_port": start + i * step}))
+        assert first == threshold - 1
+    # Ports from windows that have passed are not counted, and repeats in the window count once
+    slow = WindowDetector(window_seconds=60, buckets=6, thresholds={"distinct_ports": 50})
+    assert not any(slow.detect({"timestamp": 1000 + i * 2, "source_ip": "198.51.100.9", "destination_port": i})
+                   for i in range(200))
+    assert not any(slow.detect({"timestamp": 2000 + i * 0.1, "source_ip": "198.51.100.10",
+                                "destination_port": i % 49}) for i in range(500))
+
+    logins = [detector.detect({"timestamp": 2000 + i, "source_ip": "203.0.113.4", "event": "failed login",
+                               "user": "root"}) for i in range(30)]
+    assert types(logins) == ["brute_force"] and logins[9]
+    slow = [detector.detect({"timestamp": 3000 + i * 15, "source_ip": "203.0.113.5", "event": "failed login"})
+            for i in range(30)]
+    web = [detector.detect({"timestamp": 5000 + i, "source_ip": "203.0.113.6", "status": 401, "url": "/login"})
+           for i in range(10)]
+    assert not any(slow) and types(web) == ["brute_force"]
+
+def test_floods_per_destination():
+    """SYN and byte rates above their thresholds over the window flag the destination as a DDoS target."""
+    detector = WindowDetector(window_seconds=10, buckets=5, thresholds={"syn_per_second": 100,
+                                                                       "bytes_per_second": 1000000})
+    syn = [detector.detect({"timestamp": 100 + i / 200, "source_ip": f"10.{i % 250}.{i // 250 % 250}.1",
+                            "destination_ip": "192.0.2.80", "destination_port": 80, "tcp_flags": "S"})
+           for i in range(2000)]
+    assert types(syn) == ["ddos"] and syn[999] and syn[999][0]["metric"] == "syn_per_second"
+    volume = [detector.detect({"timestamp": 200 + i / 1000, "source_ip": "10.9.9.9", "destination_ip": "192.0.2.81",
+                               "destination_port": 443, "tcp_flags": "PA", "length": 1500}) for i in range(8000)]
+    assert types(volume) == ["ddos"] and volume[next(i for i, t in enumerate(volume) if t)][0]["metric"] == "bytes_per_second"
+
+def test_windows_expire_and_keys_are_capped():
+    """Counts fall out of the window as time passes, stale events are ignored, and cold keys are evicted."""
+    detector = WindowDetector(window_seconds=60, buckets=6, max_keys=1000)
+    for i in range(9):
+        detector.detect({"timestamp": 1000 + i, "source_ip": "203.0.113.4", "event": "failed login"})
+    assert not detector.detect({"timestamp": 1070, "source_ip": "203.0.113.4", "event": "failed login"})
+    assert not detector.detect({"timestamp": 900, "source_ip": "203.0.113.4", "event": "failed login"})
+    assert detector.sources.records["203.0.113.4"].second == [0, 0, 0, 0, 0, 1]
+
+    for i in range(5000):
+        detector.detect({"timestamp": 2000, "source_ip": f"10.0.{i // 250}.{i % 250}", "destination_port": 80})
+    assert len(detector.sources) == 1000 and detector.stats()["source_evictions"] == 4001
+    assert "10.0.19.249" in detector.sources.records and "10.0.0.0" not in detector.sources.records
+
+def test_batch_matches_per_event_and_engine_integration():
+    """detect_batch gives the same threats as detect() event by event, extras included, and the engine reports them."""
+    random.seed(3)
+    events = []
+    for i in range(3000):
+        events.append({"timestamp": 1000 + i * 0.01, "source_ip": random.choice(["198.51.100.7", "10.0.0.2"]),
+                       "destination_ip": "10.0.0.5", "protocol": 6, "destination_port": random.randint(1, 2000),
+                       "tcp_flags": random.choice(["S", "PA"]), "length": 60})
+        if i % 10 == 0:
+            events.append({"timestamp": 1000 + i * 0.01, "source_ip": "203.0.113.4", "event": "failed login"})
+    one, batched = WindowDetector(thresholds={"syn_per_second": 20}), WindowDetector(thresholds={"syn_per_second": 20})
+    expected = [one.detect(event) for event in events]
+    assert batched.detect_batch(EventBatch.from_events(events)) == expected
+    assert sorted(set(types(expected))) == ["brute_force", "ddos", "port_scan"]
+
+    engine = DetectionEngine()
+    found = engine.detect_threats_batch(events)
+    assert {threat["type"] for threats in found for threat in threats} >= {"port_scan", "brute_force"}
+    assert engine.window_stats()["sources"] == 3
+
+def performance_test():
+    """Throughput and memory with a million distinct source IPs, with a 100k key cap and uncapped."""
+    print("\nTesting Window Detector Throughput...")
+    random.seed(7)
+    events = [{"timestamp": 1000 + i / 20000, "source_ip": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+               "destination_ip": f"192.0.2.{i % 200}", "protocol": 6, "destination_port": (80, 443, 22)[i % 3],
+               "tcp_flags": "S" if i % 4 == 0 else "PA", "length": 60 + i % 1400} for i in range(1000000)]
+    batches = [EventBatch.from_events(events[start:start + 10000]) for start in range(0, len(events), 10000)]
+    for max_keys in (100000, 1000000):
+        detector = WindowDetector(max_keys=max_keys)
+        rss_before = peak_rss_mb()
+        start_time = time.perf_counter()
+        for batch in batches:
+            detector.detect_batch(batch)
+        elapsed = time.perf_counter() - start_time
+        rss_after = peak_rss_mb()
+        memory = f", peak RSS +{rss_after - rss_before:.0f} MB" if rss_before is not None else ""
+        print(f"max_keys {max_keys}: {len(events) / elapsed:.0f} events/s batched, {detector.stats()}{memory}")
+    detector = WindowDetector()
+    start_time = time.perf_counter()
+    for event in events[:200000]:
+        detector.detect(event)
+    print(f"per-event detect(): {200000 / (time.perf_counter() - start_time):.0f} events/s")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("WINDOW DETECTOR TEST SUITE")
+    print("=" * 60)
+
+    test_port_scan_and_brute_force_per_source()
+    test_floods_per_destination()
+    test_windows_expire_and_keys_are_capped()
+    test_batch_matches_per_event_and_engine_integration()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,78 @@
+"""
+Test script for the compact binary wire format.
+Checks lossless round trips against the JSON encoding and compares size and speed.
+"""
+
+import json
+import time
+import scapy.all as scapy
+from src.ingestion.data_normalizer import normalize_raw_packet
+from src.ingestion.wire_format import (decode_event, decode_message, encode_event, encode_json,
+                                       encode_message)
+
+def sample_events():
+    return [
+        normalize_raw_packet(bytes(scapy.Ether() / scapy.IP(src="10.0.0.1", dst="10.0.0.2") /
+                                   scapy.TCP(sport=1234, dport=80, flags="PA") / b"GET /\xff"), 1.5),
+        normalize_raw_packet(bytes(scapy.Ether() / scapy.IPv6(src="fe80::1", dst="2001:db8::2") /
+                                   scapy.UDP(sport=53, dport=5353) / b"dns"), 2.25),
+        {"url": "malware.com/download", "source_ip": "192.168.1.100", "protocol": "TCP"},
+        {"timestamp": None, "source_ip": None, "destination_ip": None, "protocol": None,
+         "length": 42, "payload": "IP / TCP login.php ✓"},
+        {"source_ip": "not-an-ip", "destination_port": 70000, "event": "failed login"},
+    ]
+
+def test_binary_round_trip_matches_json():
+    """Decoded binary events equal what the JSON path delivers, including None vs absent fields."""
+    for event in sample_events():
+        expected = json.loads(encode_json(event))
+        assert decode_message(encode_message(event, "binary")) == expected
+        assert decode_message(encode_message(event, "json")) == expected
+
+def test_binary_payload_views():
+    """Binary payloads can be decoded as zero-copy views of the message."""
+    event = sample_events()[0]
+    decoded = decode_event(encode_event(event), text_payloads=False)
+    assert isinstance(decoded["payload"], memoryview)
+    assert bytes(decoded["payload"]) == bytes(event["payload"])
+    assert decoded["tcp_flags"] == "PA"
+
+def test_rejects_unknown_version():
+    """A future format version is refused rather than misread."""
+    data = bytearray(encode_event(sample_events()[0]))
+    data[1] = 99
+    try:
+        decode_event(bytes(data))
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError for unsupported version")
+
+def performance_test():
+    """Compare message size and encode/decode cost of binary against JSON."""
+    print("\nTesting Wire Format Size and Speed...")
+    events = [normalize_raw_packet(bytes(scapy.Ether() / scapy.IP(src=f"10.0.{i % 50}.1", dst="10.1.0.1") /
+                                         scapy.TCP(sport=1024 + i, dport=443, flags="PA") / (b"x" * 64)), float(i))
+              for i in range(2000)]
+    for name in ("json", "binary"):
+        start_time = time.perf_counter()
+        messages = [encode_message(event, name) for event in events]
+        encoded = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        for message in messages:
+            decode_message(message)
+        decoded = time.perf_counter() - start_time
+        size = sum(len(message) for message in messages) / len(messages)
+        print(f"{name:>6}: {size:.0f} bytes/event, encode {encoded / len(events) * 1e6:.1f} us, "
+              f"decode {decoded / len(events) * 1e6:.1f} us")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("WIRE FORMAT TEST SUITE")
+    print("=" * 60)
+
+    test_binary_round_trip_matches_json()
+    test_binary_payload_views()
+    test_rejects_unknown_version()
+    performance_test()
+
+    print("\nALL TESTS COMPLETED SUCCESSFULLY!")